@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+memory benchmark for the profile models
+builds many profiles the way the collector does (language names arrive
+as fresh strings from JSON) and reports the footprint per profile
+run with: python benchmarks/models_memory.py [profiles]
+"""
+
+import json
+import sys
+import tracemalloc
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from statsgen.colors import COLORS  # noqa: E402
+from statsgen.models import LanguageStats, ProfileStats  # noqa: E402
+
+
+LANGUAGES_PER_PROFILE = 25
+
+
+@dataclass
+class PlainLanguageStats:
+    """the pre-slots model, kept here as the comparison baseline"""
+    name: str
+    size: int
+    color: str
+    percentage: float = 0.0
+
+
+@dataclass
+class PlainProfileStats:
+    username: str
+    display_name: str
+    stars: int = 0
+    forks: int = 0
+    contributions: int = 0
+    repos_count: int = 0
+    lines_added: int = 0
+    lines_deleted: int = 0
+    views: int = 0
+    languages: List[PlainLanguageStats] = field(default_factory=list)
+
+
+def _payload(count: int) -> str:
+    """a JSON document like the one the collector decodes for each profile"""
+    names = list(COLORS.items())
+    profiles = []
+    for i in range(count):
+        langs = [names[(i + j) % len(names)] for j in range(LANGUAGES_PER_PROFILE)]
+        profiles.append({
+            "login": f"user{i}",
+            "languages": [{"name": n, "color": c, "size": 1000 + j} for j, (n, c) in enumerate(langs)],
+        })
+    return json.dumps(profiles)
+
+
+def _measure(profile_cls, language_cls, payload: str) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data = json.loads(payload)
+
+    profiles = []
+    for entry in data:
+        stats = profile_cls(username=entry["login"], display_name=entry["login"])
+        stats.languages = [
+            language_cls(name=lang["name"], size=lang["size"], color=lang["color"])
+            for lang in entry["languages"]
+        ]
+        profiles.append(stats)
+
+    # drop the decoded document, only what the models still reference remains
+    del data, entry
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (current - before) / len(profiles)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    payload = _payload(count)
+
+    plain = _measure(PlainProfileStats, PlainLanguageStats, payload)
+    compact = _measure(ProfileStats, LanguageStats, payload)
+
+    print(f"profiles: {count:,} x {LANGUAGES_PER_PROFILE} languages")
+    print(f"plain dataclasses: {plain:,.0f} bytes/profile")
+    print(f"slotted + interned: {compact:,.0f} bytes/profile")
+    print(f"saved: {(1 - compact / plain) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+microbenchmarks for aggregation and rendering
+uses synthetic ProfileStats and GraphQL repo pages shaped like the
+recorded API responses, at 10, 1k and 100k repos
+
+run with:
+  python benchmarks/run.py                  compare against the baseline
+  python benchmarks/run.py --save-baseline  record a new baseline
+  python benchmarks/run.py --sizes 10 1000  skip the 100k cases
+
+  python benchmarks/run.py --reference ../base
+                                            compare against another checkout
+
+every run also times a fixed pure-Python calibration loop, and local
+comparisons with baseline.json take each case's speed relative to it;
+that only roughly tracks how each workload's speed varies between
+machines, so it is a guide for local work, not a gate
+
+--reference is what CI gates on: one worker process per checkout (this
+one and the given one, normally the PR's base commit) builds the cases,
+and every case is timed on both in turn, REFERENCE_ROUNDS times each, so
+both sides are measured on the same machine at the same time and need
+no calibration
+
+to regenerate the baseline after an intended speed change, run the
+full suite with --save-baseline on an otherwise idle machine and
+commit benchmarks/baseline.json with the change; a case that has no
+baseline entry fails the comparison until it is recorded
+"""
+
+import argparse
+import gc
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# the tree being timed, --reference runs point this at the other checkout
+ROOT = Path(os.environ.get("STATSGEN_BENCH_ROOT") or Path(__file__).resolve().parent.parent).resolve()
+sys.path.insert(0, str(ROOT))
+
+from statsgen.activity import ContributionCalendar  # noqa: E402
+from statsgen.card_renderer import CardRenderer  # noqa: E402
+from statsgen.colors import COLORS  # noqa: E402
+from statsgen import config_loader  # noqa: E402
+from statsgen.models import LanguageStats, ProfileConfig, ProfileStats  # noqa: E402
+from statsgen.stats_collector import StatsCollector  # noqa: E402
+
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_SIZES = (10, 1_000, 100_000)
+DEFAULT_THRESHOLD = 0.25
+MIN_TIME = 0.2
+ROUNDS = 3
+
+# baseline key of the reference workload speeds are normalized against
+CALIBRATION = "_calibration"
+
+# single-round measurements per side and case when comparing against a
+# reference checkout, the two sides take turns
+REFERENCE_ROUNDS = 5
+
+
+def make_repo_pages(repos: int, seed: int = 42) -> List[Dict]:
+    """GraphQL viewer pages of 100 repos each, like VIEWER_REPOS returns"""
+    rng = random.Random(seed)
+    names = list(COLORS.items())
+    pages = []
+
+    for start in range(0, repos, 100):
+        nodes = []
+        for i in range(start, min(start + 100, repos)):
+            langs = rng.sample(names, 10)
+            nodes.append({
+                "nameWithOwner": f"user/repo-{i}",
+                "isFork": False,
+                "stargazerCount": rng.randint(0, 500),
+                "forkCount": rng.randint(0, 50),
+                "languages": {"edges": [
+                    {"size": rng.randint(100, 500_000), "node": {"name": n, "color": c}}
+                    for n, c in langs
+                ]},
+            })
+        pages.append({"data": {"viewer": {
+            "login": "user",
+            "name": "User",
+            "repositories": {
+                "pageInfo": {"hasNextPage": start + 100 < repos, "endCursor": str(start)},
+                "nodes": nodes,
+            },
+            "repositoriesContributedTo": {"pageInfo": {"hasNextPage": False}, "nodes": []},
+        }}})
+
+    # round-trip through JSON so strings look like freshly decoded ones
+    return json.loads(json.dumps(pages))
+
+
+def make_stats(languages: int, seed: int = 42) -> ProfileStats:
+    """a fully populated ProfileStats with the given number of languages"""
+    rng = random.Random(seed)
+    names = list(COLORS.items())
+    stats = ProfileStats(
+        username="user",
+        display_name="User",
+        stars=rng.randint(0, 10**6),
+        forks=rng.randint(0, 10**5),
+        contributions=rng.randint(0, 10**5),
+        repos_count=rng.randint(0, 1000),
+        lines_added=rng.randint(0, 10**8),
+        lines_deleted=rng.randint(0, 10**8),
+        views=rng.randint(0, 10**6),
+    )
+    stats.languages = [
+        LanguageStats(name=n, size=rng.randint(1, 10**7), color=c)
+        for n, c in rng.sample(names, min(languages, len(names)))
+    ]
+    StatsCollector(None, ProfileConfig("user"))._calculate_percentages(stats)
+    return stats
+
+
+def make_calendar(years: int, seed: int = 42) -> ContributionCalendar:
+    """daily contributions ending today, mostly quiet days like real profiles"""
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=365 * years)
+    return ContributionCalendar.from_days(
+        ((start + timedelta(days=i)).isoformat(), rng.choice((0, 0, 0, 1, 2, 3, 5, 8, 13)))
+        for i in range(365 * years + 1)
+    )
+
+
+def build_cases(sizes: Tuple[int, ...]) -> Dict[str, Callable[[], object]]:
+    """name -> zero-arg callable, one entry per benchmark and size"""
+    cases: Dict[str, Callable[[], object]] = {}
+    renderer = CardRenderer(templates_dir=str(ROOT / "assets" / "templates"))
+    config = ProfileConfig("user")
+
+    for size in sizes:
+        pages = make_repo_pages(size)
+
+        def aggregate(pages=pages):
+            collector = StatsCollector(None, config)
+            stats = ProfileStats(username="user", display_name="user")
+            for page in pages:
+                for repo in page["data"]["viewer"]["repositories"]["nodes"]:
+                    collector._add_repo(stats, repo, collector._languages)
+            return stats
+
+        cases[f"collect_repos_aggregate[{size}]"] = aggregate
+
+    # linguist knows a few hundred languages, so these sizes are language counts
+    for count in (8, 64, len(COLORS)):
+        stats = make_stats(count)
+
+        def percentages(stats=stats):
+            StatsCollector(None, config)._calculate_percentages(stats)
+
+        cases[f"calculate_percentages[{count} langs]"] = percentages
+
+    stats = make_stats(40)
+    top = stats.top_languages
+    cases["render_overview"] = lambda: renderer.render_overview(stats, "dark")
+    cases["render_languages"] = lambda: renderer.render_languages(stats, "dark")
+    cases["build_progress_bar"] = lambda: renderer._build_progress_bar(top)
+    cases["build_language_list"] = lambda: renderer._build_language_list(top)
+    cases["format_number"] = lambda: CardRenderer._format_number(123_456_789)
+
+    calendar = make_calendar(10)
+    stats.calendar = calendar
+
+    def calendar_aggregate():
+        return (
+            calendar.longest_streak(),
+            calendar.current_streak(),
+            calendar.weekly_totals(),
+            calendar.percentiles(),
+        )
+
+    cases["calendar_aggregate[10y]"] = calendar_aggregate
+    cases["render_heatmap"] = lambda: renderer.render_heatmap(stats, "dark")
+
+    # the shipped example config, compiled from YAML vs served from the cache
+    profile_yml = str(ROOT / ".github" / "config" / "profile.yml")
+
+    def config_compile():
+        config_loader._memory.clear()
+        return config_loader.ConfigLoader(profile_yml, cache_dir=None).load()
+
+    cases["config_load[compile]"] = config_compile
+    cases["config_load[cached]"] = lambda: config_loader.ConfigLoader(profile_yml, cache_dir=None).load()
+
+    return cases
+
+
+def calibrate() -> Dict[str, float]:
+    """times a fixed mix of dict, list and string work as the machine's yardstick"""
+    words = [f"lang-{i % 97}" for i in range(2_000)]
+
+    def reference():
+        counts: Dict[str, int] = {}
+        for word in words:
+            counts[word] = counts.get(word, 0) + len(word)
+        return sorted(counts.items(), key=lambda item: item[1])
+
+    return measure(reference)
+
+
+def measure(func: Callable[[], object], rounds: int = ROUNDS) -> Dict[str, float]:
+    """best ops/sec of several runs of at least MIN_TIME seconds, plus memory allocated by one call
+
+    peak_bytes is the high-water mark during the call, retained_bytes what
+    its return value still holds afterwards
+    """
+    func()  # warm caches (templates, interned strings)
+
+    # best of several rounds, so a noisy neighbour doesn't fail the gate
+    best = 0.0
+    for _ in range(rounds):
+        gc.collect()
+        gc.disable()
+        try:
+            ops = 0
+            start = time.perf_counter()
+            elapsed = 0.0
+            batch = 1
+            while elapsed < MIN_TIME:
+                for _ in range(batch):
+                    func()
+                ops += batch
+                batch *= 2
+                elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        best = max(best, ops / elapsed)
+
+    tracemalloc.start()
+    result = func()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+
+    return {"ops_per_sec": best, "peak_bytes": peak, "retained_bytes": retained}
+
+
+def compare(
+    results: Dict,
+    baseline: Dict,
+    threshold: float
+) -> Tuple[List[str], List[str]]:
+    """(names that got slower than the baseline allows, names with no baseline)
+
+    speeds are taken relative to each side's calibration run when both
+    have one, otherwise the absolute ops/sec are compared
+    """
+    scale = 1.0
+    if CALIBRATION in results and CALIBRATION in baseline:
+        scale = results[CALIBRATION]["ops_per_sec"] / baseline[CALIBRATION]["ops_per_sec"]
+
+    regressions = []
+    missing = []
+    for name, result in results.items():
+        if name == CALIBRATION:
+            continue
+        base = baseline.get(name)
+        if not base:
+            missing.append(name)
+            continue
+        if result["ops_per_sec"] < base["ops_per_sec"] * scale * (1 - threshold):
+            regressions.append(name)
+    return regressions, missing
+
+
+class TreeWorker:
+    """a --serve process that times cases of one checkout on request"""
+
+    def __init__(self, root: Path, sizes: List[int]):
+        self.root = root
+        self.proc = subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), "--serve", "--sizes", *map(str, sizes)],
+            # one hash seed for both sides, dict layouts differ between seeds
+            # and that alone moves some cases by tens of percent
+            env=dict(os.environ, STATSGEN_BENCH_ROOT=str(root), PYTHONHASHSEED="0"),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True
+        )
+        line = self.proc.stdout.readline()
+        # the case names, or nothing when the checkout couldn't build them
+        self.cases: Optional[List[str]] = json.loads(line) if line else None
+
+    def measure(self, name: str) -> Dict[str, float]:
+        self.proc.stdin.write(name + "\n")
+        self.proc.stdin.flush()
+        return json.loads(self.proc.stdout.readline())
+
+    def close(self) -> None:
+        self.proc.stdin.close()
+        self.proc.wait()
+
+
+def serve(sizes: List[int]) -> int:
+    """answers case names on stdin with one round of measure() each on stdout"""
+    cases = build_cases(tuple(sizes))
+    print(json.dumps(list(cases)), flush=True)
+    for line in sys.stdin:
+        print(json.dumps(measure(cases[line.strip()], rounds=1)), flush=True)
+    return 0
+
+
+def compare_reference(reference: Path, sizes: List[int], filter_text: str, threshold: float) -> int:
+    """times every case on the reference checkout and this one in turn and gates on the difference
+
+    each case alternates between the two REFERENCE_ROUNDS times, going
+    first on either side in turn, so load changes during the job hit both,
+    and each side keeps its best round
+    """
+    base, head = TreeWorker(reference, sizes), TreeWorker(ROOT, sizes)
+    try:
+        if head.cases is None:
+            print("could not build the benchmark cases")
+            return 1
+        if base.cases is None:
+            print(f"could not build the benchmark cases at {reference}, skipping the comparison")
+            return 0
+
+        names = [name for name in head.cases if filter_text in name]
+        shared = [name for name in names if name in base.cases]
+        print(f"{'benchmark':<40} {'ops/sec':>14} {'base ops/sec':>14} {'vs base':>9}")
+        results: Dict[str, Dict] = {}
+        references: Dict[str, Dict] = {}
+        for name in shared:
+            best = {}
+            for round_index in range(REFERENCE_ROUNDS):
+                order = (base, head) if round_index % 2 == 0 else (head, base)
+                for worker in order:
+                    result = worker.measure(name)
+                    if worker not in best or result["ops_per_sec"] > best[worker]["ops_per_sec"]:
+                        best[worker] = result
+            results[name], references[name] = best[head], best[base]
+
+            ops, base_ops = best[head]["ops_per_sec"], best[base]["ops_per_sec"]
+            print(f"{name:<40} {ops:>14,.1f} {base_ops:>14,.1f} {ops / base_ops * 100 - 100:>+8.1f}%")
+    finally:
+        base.close()
+        head.close()
+
+    new = [name for name in names if name not in base.cases]
+    if new:
+        print(f"\nnot in the reference, not compared: {', '.join(new)}")
+    # both sides ran on this machine just now, so there's nothing to scale
+    regressions, _ = compare(results, references, threshold)
+    if regressions:
+        print(f"\nregressed more than {threshold:.0%} against the reference:")
+        for name in regressions:
+            print(f"  - {name}")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="statsgen microbenchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--filter", default="", help="only run benchmarks containing this text")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH))
+    parser.add_argument(
+        "--reference",
+        default=None,
+        metavar="CHECKOUT",
+        help="compare against another checkout of the repo timed in the same run instead of the baseline"
+    )
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="allowed slowdown before failing (default: 0.25 = 25%%)"
+    )
+    args = parser.parse_args()
+
+    if args.serve:
+        return serve(args.sizes)
+    if args.reference:
+        return compare_reference(Path(args.reference).resolve(), args.sizes, args.filter, args.threshold)
+
+    cases = build_cases(tuple(args.sizes))
+    baseline_path = Path(args.baseline)
+    baseline = {}
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+
+    results = {CALIBRATION: calibrate()}
+    scale = 1.0
+    if CALIBRATION in baseline:
+        scale = results[CALIBRATION]["ops_per_sec"] / baseline[CALIBRATION]["ops_per_sec"]
+    print(f"machine speed vs baseline: {scale:.2f}x")
+
+    print(f"{'benchmark':<40} {'ops/sec':>14} {'peak KiB':>10} {'vs base':>9}")
+    for name, func in cases.items():
+        if args.filter not in name:
+            continue
+        result = measure(func)
+        results[name] = result
+
+        delta = "new"
+        if name in baseline:
+            change = result["ops_per_sec"] / (baseline[name]["ops_per_sec"] * scale) - 1
+            delta = f"{change * 100:+.1f}%"
+        print(
+            f"{name:<40} {result['ops_per_sec']:>14,.1f} "
+            f"{result['peak_bytes'] / 1024:>10,.1f} {delta:>9}"
+        )
+
+    if args.save_baseline:
+        if args.filter and CALIBRATION in baseline:
+            # a partial save joins entries timed against the stored calibration,
+            # so convert to that machine speed instead of replacing it
+            del results[CALIBRATION]
+            for result in results.values():
+                result["ops_per_sec"] /= scale
+        baseline.update(results)
+        baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        print(f"\nbaseline saved to {baseline_path}")
+        return 0
+
+    regressions, missing = compare(results, baseline, args.threshold)
+    if missing:
+        print(f"\nno baseline for {len(missing)} benchmarks, record them with --save-baseline:")
+        for name in missing:
+            print(f"  - {name}")
+    if regressions:
+        print(f"\nregressed more than {args.threshold:.0%}:")
+        for name in regressions:
+            print(f"  - {name}")
+    return 1 if regressions or missing else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
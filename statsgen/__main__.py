@@ -7,12 +7,14 @@ run with: python -m statsgen
 import argparse
 import asyncio
 import sys
+from typing import List, Optional
 
 from .runner import ProfileCardsRunner
+from . import watch, webhook
 
 
-def parse_args():
-    """parses command line arguments"""
+def parse_args(argv: Optional[List[str]] = None):
+    """parses command line arguments, sys.argv unless argv is given"""
     parser = argparse.ArgumentParser(
         prog="statsgen",
         description="Generate beautiful profile cards for your GitHub README"
@@ -43,24 +45,153 @@ def parse_args():
         help="show what would be generated without actually creating files"
     )
 
+    parser.add_argument(
+        "--org",
+        default=None,
+        help="aggregate an organization's repositories instead of your own"
+    )
+
+    parser.add_argument(
+        "--shards",
+        type=int,
+        default=None,
+        help="worker processes for organization mode (default: one per core)"
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue an interrupted run from its last checkpoint"
+    )
+
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="collect and render even if nothing changed since the last run"
+    )
+
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        metavar="SECONDS",
+        help="finish within this many seconds, reusing the last values for whatever is late"
+    )
+
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument(
+        "--record",
+        default=None,
+        metavar="CASSETTE",
+        help="save every API exchange to a cassette file (.json.gz), cassette runs always collect everything and leave .statsgen alone"
+    )
+
+    cassette.add_argument(
+        "--replay",
+        default=None,
+        metavar="CASSETTE",
+        help="serve API responses from a cassette instead of the network"
+    )
+
+    parser.add_argument(
+        "--time-scale",
+        type=float,
+        default=1.0,
+        help="replay speed: 1 keeps recorded latencies and waits, 0 skips them (default: 1)"
+    )
+
+    parser.add_argument(
+        "--render-workers",
+        type=int,
+        default=0,
+        help="processes that render cards, 1 renders inline, as do runs with fewer than 256 cards (default: one per core, at most one per card)"
+    )
+
     parser.add_argument(
         "--version", "-v",
         action="version",
         version="%(prog)s 1.0.0"
     )
 
-    return parser.parse_args()
+    commands = parser.add_subparsers(dest="command")
+
+    webhook_cmd = commands.add_parser(
+        "webhook",
+        help="serve a GitHub webhook endpoint that refreshes cards incrementally"
+    )
+    webhook_cmd.add_argument("--host", default="127.0.0.1", help="address to bind (default: 127.0.0.1)")
+    webhook_cmd.add_argument("--port", type=int, default=8080, help="port to listen on (default: 8080)")
+    webhook_cmd.add_argument(
+        "--secret",
+        default=None,
+        help="webhook secret for signature checks (default: $WEBHOOK_SECRET)"
+    )
+    webhook_cmd.add_argument(
+        "--insecure",
+        action="store_true",
+        help="accept unsigned deliveries when no secret is set (local testing only)"
+    )
+
+    watch_cmd = commands.add_parser(
+        "watch",
+        help="keep running and refresh cards on a schedule instead of from cron"
+    )
+    watch_cmd.add_argument(
+        "--interval",
+        type=float,
+        default=600.0,
+        help="seconds between change probes of the profile (default: 600)"
+    )
+    watch_cmd.add_argument(
+        "--reserve",
+        type=float,
+        default=0.2,
+        help="share of the hourly rate limit never spent, for other tools on the token (default: 0.2)"
+    )
+
+    return parser.parse_args(argv)
 
 
 async def main():
     """main entry point"""
     args = parse_args()
 
+    if args.command == "webhook":
+        success = await webhook.serve(
+            config_path=args.config,
+            output_dir=args.output,
+            theme=args.theme,
+            host=args.host,
+            port=args.port,
+            secret=args.secret,
+            insecure=args.insecure
+        )
+        sys.exit(0 if success else 1)
+
+    if args.command == "watch":
+        success = await watch.watch(
+            config_path=args.config,
+            output_dir=args.output,
+            theme=args.theme,
+            interval=args.interval,
+            reserve=args.reserve
+        )
+        sys.exit(0 if success else 1)
+
     runner = ProfileCardsRunner(
         config_path=args.config,
         output_dir=args.output,
         theme=args.theme,
-        dry_run=args.dry_run
+        dry_run=args.dry_run,
+        organization=args.org,
+        shards=args.shards,
+        resume=args.resume,
+        force=args.force,
+        deadline=args.deadline,
+        record=args.record,
+        replay=args.replay,
+        time_scale=args.time_scale,
+        render_workers=args.render_workers
     )
 
     success = await runner.run()
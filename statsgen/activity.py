@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+daily contribution calendar
+one small unsigned integer per day in an array.array, so a decade of
+history is a few KB, aggregations run over whole arrays and bytes in C
+instead of looping over nested dicts in Python
+"""
+
+import base64
+import zlib
+from array import array
+from bisect import bisect_left
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+# byte -> 1 if non-zero, turns a 'B' array into an activity mask in one call
+_NONZERO = bytes([0] + [1] * 255)
+
+
+def _typecode(peak: int) -> str:
+    """smallest unsigned array type that holds peak"""
+    if peak < 1 << 8:
+        return "B"
+    if peak < 1 << 16:
+        return "H"
+    return "L"
+
+
+class ContributionCalendar:
+    """contribution counts for consecutive days starting at `start`"""
+
+    __slots__ = ("start", "counts")
+
+    def __init__(self, start: date, counts: array):
+        self.start = start
+        self.counts = counts
+
+    @classmethod
+    def from_days(cls, days: Iterable[Tuple[str, int]]) -> Optional["ContributionCalendar"]:
+        """builds a calendar from (ISO date, count) pairs, None when there are none"""
+        parsed: Dict[date, int] = {}
+        for day, count in days:
+            key = date.fromisoformat(day)
+            # overlapping year ranges can report a day twice
+            parsed[key] = max(count, parsed.get(key, 0))
+        if not parsed:
+            return None
+
+        start = min(parsed)
+        span = (max(parsed) - start).days + 1
+        typecode = _typecode(max(parsed.values()))
+        counts = array(typecode, bytes(span * array(typecode).itemsize))
+        for day, count in parsed.items():
+            counts[(day - start).days] = count
+        return cls(start, counts)
+
+    @property
+    def end(self) -> date:
+        return self.start + timedelta(days=len(self.counts) - 1)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self.counts) * self.counts.itemsize
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def total(self) -> int:
+        return sum(self.counts)
+
+    def last(self, days: int) -> "ContributionCalendar":
+        """the trailing `days` days (a copy)"""
+        counts = self.counts[-days:] if days < len(self.counts) else self.counts[:]
+        return ContributionCalendar(self.end - timedelta(days=len(counts) - 1), counts)
+
+    def _mask(self) -> bytes:
+        """one byte per day, 1 where there was any contribution"""
+        if self.counts.typecode == "B":
+            return self.counts.tobytes().translate(_NONZERO)
+        return bytes(map(bool, self.counts))
+
+    def longest_streak(self) -> int:
+        """most consecutive days with contributions"""
+        return max(map(len, self._mask().split(b"\x00")), default=0)
+
+    def current_streak(self) -> int:
+        """consecutive active days up to the last day, or the day before it
+
+        like GitHub, a streak isn't broken until the current day is over
+        """
+        mask = self._mask()
+        if mask.endswith(b"\x00"):
+            mask = mask[:-1]
+        return len(mask) - (mask.rfind(b"\x00") + 1)
+
+    def weekly_totals(self) -> List[int]:
+        """contributions per Sunday-to-Saturday week, the first may be partial"""
+        counts = self.counts
+        # date.weekday() is 0 on Monday, GitHub's calendar weeks start on Sunday
+        first = 7 - (self.start.weekday() + 1) % 7
+        totals = [sum(counts[:first])]
+        totals.extend(sum(counts[i:i + 7]) for i in range(first, len(counts), 7))
+        return totals
+
+    def percentiles(self, points: Sequence[int] = (25, 50, 75)) -> List[int]:
+        """nearest-rank percentiles of the counts on active days"""
+        active = sorted(filter(None, self.counts))
+        if not active:
+            return [0] * len(points)
+        return [active[max(0, -(-p * len(active) // 100) - 1)] for p in points]
+
+    def levels(self) -> bytes:
+        """heatmap intensity 0-4 per day, split at the active-day quartiles"""
+        thresholds = self.percentiles((25, 50, 75))
+        # bucket every distinct count once, then map the days through the table
+        table = {count: 1 + bisect_left(thresholds, count) for count in set(self.counts) if count}
+        if self.counts.typecode == "B":
+            return self.counts.tobytes().translate(bytes(table.get(i, 0) for i in range(256)))
+        return bytes(table.get(count, 0) for count in self.counts)
+
+    def to_json(self) -> Dict[str, str]:
+        """compact form: start date, array type and zlib-compressed counts"""
+        return {
+            "start": self.start.isoformat(),
+            "type": self.counts.typecode,
+            "data": base64.b64encode(zlib.compress(self.counts.tobytes(), 9)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_json(cls, data: Optional[Dict[str, str]]) -> Optional["ContributionCalendar"]:
+        if not data:
+            return None
+        counts = array(data["type"])
+        counts.frombytes(zlib.decompress(base64.b64decode(data["data"])))
+        return cls(date.fromisoformat(data["start"]), counts)
@@ -5,11 +5,13 @@ supports multiple themes and card types
 """
 
 import os
+from collections import defaultdict
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from jinja2 import Environment, FileSystemLoader, select_autoescape
 
+from .activity import ContributionCalendar
 from .models import ProfileStats
 
 
@@ -33,8 +35,13 @@ class CardRenderer:
 
         self._env.filters["format_number"] = self._format_number
 
-    def render_overview(self, stats: ProfileStats, theme: str = "dark") -> str:
-        """renders the overview stats card"""
+    def render_overview(
+        self,
+        stats: ProfileStats,
+        theme: str = "dark",
+        show: Optional[Dict[str, bool]] = None
+    ) -> str:
+        """renders the overview stats card, show hides individual stats"""
         template_name = f"overview-{theme}.svg" if theme != "dark" else "overview.svg"
 
         if not (self.templates_dir / template_name).exists():
@@ -50,7 +57,8 @@ class CardRenderer:
             contributions=self._format_number(stats.contributions),
             lines_changed=self._format_number(stats.lines_changed),
             views=self._format_number(stats.views),
-            repos=self._format_number(stats.repos_count)
+            repos=self._format_number(stats.repos_count),
+            show=defaultdict(lambda: True, show or {})
         )
 
     def render_languages(self, stats: ProfileStats, theme: str = "dark") -> str:
@@ -72,6 +80,72 @@ class CardRenderer:
             languages=languages
         )
 
+    def render_trend(
+        self,
+        stats: ProfileStats,
+        series: Sequence[Tuple[str, int]],
+        metric: str = "stars",
+        theme: str = "dark"
+    ) -> str:
+        """renders a sparkline card for one metric from stored history"""
+        template_name = f"trend-{theme}.svg" if theme != "dark" else "trend.svg"
+
+        if not (self.templates_dir / template_name).exists():
+            template_name = "trend.svg"
+
+        template = self._env.get_template(template_name)
+
+        values = [value for _, value in series]
+        current = values[-1] if values else getattr(stats, metric, 0)
+        delta = current - values[0] if values else 0
+        period = f"{series[0][0]} - {series[-1][0]}" if series else "no history yet"
+        sparkline = self._build_sparkline(values)
+
+        return template.render(
+            title=f"{metric.replace('_', ' ').capitalize()} trend",
+            period=period,
+            current=self._format_number(current),
+            delta=f"{'+' if delta >= 0 else ''}{self._format_number(delta)}",
+            sparkline=sparkline,
+            area=f"0,80 {sparkline} 300,80" if sparkline else ""
+        )
+
+    def render_heatmap(self, stats: ProfileStats, theme: str = "dark", weeks: int = 53) -> str:
+        """renders the contribution heatmap with streak stats"""
+        template_name = f"heatmap-{theme}.svg" if theme != "dark" else "heatmap.svg"
+
+        if not (self.templates_dir / template_name).exists():
+            template_name = "heatmap.svg"
+
+        template = self._env.get_template(template_name)
+
+        calendar = stats.calendar
+        if calendar is None:
+            return template.render(
+                title="Contribution activity",
+                period="no activity data yet",
+                total=0,
+                cells="",
+                current_streak=0,
+                longest_streak=0,
+                best_week=0
+            )
+
+        # the grid ends on the last day and starts on a Sunday `weeks` columns back
+        last_row = (calendar.end.weekday() + 1) % 7
+        window = calendar.last((weeks - 1) * 7 + last_row + 1)
+        weekly = window.weekly_totals()
+
+        return template.render(
+            title="Contribution activity",
+            period=f"{window.start:%b %d, %Y} - {window.end:%b %d, %Y}",
+            total=self._format_number(window.total()),
+            cells=self._build_heatmap(window, weeks),
+            current_streak=self._format_number(calendar.current_streak()),
+            longest_streak=self._format_number(calendar.longest_streak()),
+            best_week=self._format_number(max(weekly, default=0))
+        )
+
     def save(self, content: str, filename: str) -> Path:
         """saves rendered content to file"""
         self.output_dir.mkdir(parents=True, exist_ok=True)
@@ -118,6 +192,39 @@ class CardRenderer:
 
         return "".join(parts)
 
+    def _build_sparkline(self, values: List[int], width: int = 300, height: int = 80) -> str:
+        """converts a series into polyline points scaled to the chart box"""
+        if not values:
+            return ""
+        if len(values) == 1:
+            values = values * 2
+
+        low, high = min(values), max(values)
+        span = (high - low) or 1
+        step = width / (len(values) - 1)
+
+        return " ".join(
+            f"{i * step:.1f},{height - ((v - low) / span) * height:.1f}"
+            for i, v in enumerate(values)
+        )
+
+    def _build_heatmap(self, window: ContributionCalendar, weeks: int, width: int = 300) -> str:
+        """one square per day, Sunday-to-Saturday columns like GitHub's graph"""
+        # squares never get taller than the space above the stats row
+        step = min(8.0, width / weeks)
+        size = step * 0.8
+        first_row = (window.start.weekday() + 1) % 7
+
+        parts = []
+        for i, level in enumerate(window.levels(), start=first_row):
+            col, row = divmod(i, 7)
+            parts.append(
+                f'<rect class="l{level}" x="{col * step:.1f}" y="{row * step:.1f}" '
+                f'width="{size:.1f}" height="{size:.1f}" rx="1"/>'
+            )
+
+        return "".join(parts)
+
     @staticmethod
     def _format_number(n: int) -> str:
         """formats numbers with comma separators"""
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+on-disk checkpoints for long collection runs
+files are replaced atomically so a crash never leaves half a checkpoint
+"""
+
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def write_json_atomic(path: Path, data: Any) -> None:
+    """writes data as JSON next to path and renames it into place"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def read_json(path: Path) -> Optional[Any]:
+    """reads a checkpoint file, returns None when missing or unreadable"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class CollectorCheckpoint:
+    """persists a StatsCollector's partial state between runs
+
+    holds pagination cursors, the repos seen so far, running totals, the
+    language map, per-repo REST results and which phases are finished
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.state: Dict[str, Any] = {}
+
+    def load(self, username: str) -> bool:
+        """loads a checkpoint for username, returns False if there is none"""
+        data = read_json(self.path)
+        if not isinstance(data, dict):
+            return False
+        if data.get("version") != self.VERSION or data.get("username") != username:
+            return False
+        self.state = data
+        return True
+
+    def save(self, username: str, state: Dict[str, Any]) -> None:
+        self.state = {"version": self.VERSION, "username": username, **state}
+        write_json_atomic(self.path, self.state)
+
+    def clear(self) -> None:
+        self.state = {}
+        self.path.unlink(missing_ok=True)
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+in-flight request coalescing (singleflight)
+concurrent identical requests share one HTTP call and its parsed result,
+one group can be shared by several GitHubClients in batch or server use
+"""
+
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+def flight_key(
+    method: str,
+    url: str,
+    params: Optional[Dict] = None,
+    token: Optional[str] = None,
+    body: Any = None
+) -> Tuple:
+    """identity of a request: method, url, params, body and token scope
+
+    the token is hashed so keys can be logged without leaking it, requests
+    made with different tokens never share a result
+    """
+    scope = hashlib.sha256((token or "").encode("utf-8")).hexdigest()[:16]
+    frozen_params = tuple(sorted((params or {}).items()))
+    frozen_body = json.dumps(body, sort_keys=True, default=str) if body is not None else None
+    return (method, url, frozen_params, frozen_body, scope)
+
+
+@dataclass
+class StreamFlight:
+    """a streamed response that more parsers can join until bytes start flowing"""
+    parsers: List[Any] = field(default_factory=list)
+    started: bool = False
+    task: Optional[asyncio.Task] = None
+
+    def feed(self, chunk: bytes) -> None:
+        self.started = True
+        for parser in self.parsers:
+            parser.feed(chunk)
+
+    @property
+    def done(self) -> bool:
+        return all(getattr(parser, "done", False) for parser in self.parsers)
+
+
+class SingleFlight:
+    """deduplicates concurrent calls that share a key
+
+    results are shared between callers, so treat them as read-only
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Task] = {}
+        self._streams: Dict[Hashable, StreamFlight] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """share of calls answered by another caller's request"""
+        return self.coalesced / self.calls if self.calls else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "hit_rate": self.hit_rate,
+        }
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """runs factory() once per key at a time, every caller gets its result"""
+        self.calls += 1
+        task = self._flights.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(factory())
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._forget(self._flights, key, done))
+
+        return await self._wait(task)
+
+    async def stream(
+        self,
+        key: Hashable,
+        parser: Any,
+        factory: Callable[[StreamFlight], Awaitable[Any]]
+    ) -> Any:
+        """like do(), but fans a streamed body out to every joined parser
+
+        a caller can only join while the leader is still waiting for the
+        body (e.g. polling a 202), later callers start their own request
+        """
+        self.calls += 1
+        flight = self._streams.get(key)
+        if flight is not None and not flight.started:
+            self.coalesced += 1
+            flight.parsers.append(parser)
+            return await self._wait(flight.task)
+
+        flight = StreamFlight(parsers=[parser])
+        flight.task = asyncio.ensure_future(factory(flight))
+        self._streams[key] = flight
+        flight.task.add_done_callback(
+            lambda done: self._forget(self._streams, key, flight)
+        )
+        return await self._wait(flight.task)
+
+    async def _wait(self, task: asyncio.Future) -> Any:
+        """awaits a shared task, cancelling it only once every caller gave up
+
+        one caller timing out must not cancel the request for the rest, but
+        a request nobody waits for anymore shouldn't keep polling either
+        """
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters[task] == 1:
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    @staticmethod
+    def _forget(table: Dict, key: Hashable, value: Any) -> None:
+        """drops a finished flight unless a newer one took its key"""
+        if table.get(key) is value:
+            del table[key]
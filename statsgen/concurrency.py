@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+adaptive concurrency control for API requests
+additive increase while latency and errors stay healthy, multiplicative
+decrease on throttling or latency spikes (AIMD, like TCP congestion control)
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+
+@dataclass
+class Slot:
+    """one in-flight request, the caller fills in how it went"""
+    started: float
+    throttled: bool = False
+    failed: bool = False
+
+
+class AdaptiveLimiter:
+    """AIMD limit on in-flight requests
+
+    every healthy response grows the limit by increase/limit, so the limit
+    rises by about `increase` per round trip, throttling (403/429/secondary
+    limits), error bursts or latency spikes multiply it by `decrease`
+    """
+
+    def __init__(
+        self,
+        initial: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_spike: float = 3.0,
+        latency_floor: float = 1.0,
+        error_threshold: float = 0.2,
+        window: int = 50,
+        min_cooldown: float = 1.0,
+        history_size: int = 200
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_spike = latency_spike
+        self.latency_floor = latency_floor
+        self.error_threshold = error_threshold
+        self.min_cooldown = min_cooldown
+
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._in_flight = 0
+        # queued acquirers in arrival order, each woken with its slot already taken
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._latency_ewma: Optional[float] = None
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._last_decrease = 0.0
+
+        self.requests = 0
+        self.throttled = 0
+        self.increases = 0
+        self.decreases = 0
+        self.history: Deque[Tuple[float, int, str]] = deque(maxlen=history_size)
+        self.history.append((time.monotonic(), self.limit, "start"))
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def slot(self) -> "_SlotContext":
+        """async context manager that holds one request slot"""
+        return _SlotContext(self)
+
+    async def acquire(self) -> Slot:
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return Slot(started=time.monotonic())
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # woken and cancelled in the same step, hand the slot on
+                self._in_flight -= 1
+                self._wake()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+        return Slot(started=time.monotonic())
+
+    async def release(self, slot: Slot) -> None:
+        now = time.monotonic()
+        self._record(slot, now - slot.started, now)
+        self._in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        """gives free slots to the longest waiting acquirers, only as many as fit"""
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    def snapshot(self) -> Dict:
+        """current state for metrics and run summaries"""
+        return {
+            "limit": self.limit,
+            "in_flight": self._in_flight,
+            "latency_ewma": self._latency_ewma,
+            "error_rate": self._error_rate(),
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "history": list(self.history),
+        }
+
+    def _record(self, slot: Slot, latency: float, now: float) -> None:
+        self.requests += 1
+        ok = not (slot.throttled or slot.failed)
+        self._outcomes.append(ok)
+
+        if slot.throttled:
+            self.throttled += 1
+            self._decrease(now, "throttled")
+            return
+
+        # slow-but-fine requests (big bodies) under the floor never count as spikes
+        spike = (
+            self._latency_ewma is not None
+            and latency > self.latency_floor
+            and latency > self._latency_ewma * self.latency_spike
+        )
+        if self._latency_ewma is None:
+            self._latency_ewma = latency
+        else:
+            self._latency_ewma = 0.8 * self._latency_ewma + 0.2 * latency
+
+        if spike:
+            self._decrease(now, "latency")
+        elif self._error_rate() > self.error_threshold:
+            self._decrease(now, "errors")
+        elif ok and self._in_flight >= self.limit:
+            # only a saturated limit has shown it can use more room
+            self._increase(now)
+
+    def _error_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return 1 - sum(self._outcomes) / len(self._outcomes)
+
+    def _increase(self, now: float) -> None:
+        before = self.limit
+        self._limit = min(float(self.max_limit), self._limit + self.increase / self._limit)
+        if self.limit != before:
+            self.increases += 1
+            self.history.append((now, self.limit, "increase"))
+            self._wake()
+
+    def _decrease(self, now: float, reason: str) -> None:
+        # one cut per round trip, a burst of failures from the same window
+        # shouldn't collapse the limit several times over
+        cooldown = max(self._latency_ewma or 0.0, self.min_cooldown)
+        if now - self._last_decrease < cooldown:
+            return
+
+        self._last_decrease = now
+        self._limit = max(float(self.min_limit), self._limit * self.decrease)
+        # judge the new limit on fresh outcomes only
+        self._outcomes.clear()
+        self.decreases += 1
+        self.history.append((now, self.limit, reason))
+
+
+class _SlotContext:
+    def __init__(self, limiter: AdaptiveLimiter):
+        self._limiter = limiter
+        self._slot: Optional[Slot] = None
+
+    async def __aenter__(self) -> Slot:
+        self._slot = await self._limiter.acquire()
+        return self._slot
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is not None and not self._slot.throttled:
+            self._slot.failed = True
+        await self._limiter.release(self._slot)
+
+
+def format_history(history: List[Tuple[float, int, str]], limit: int = 10) -> str:
+    """short 'limit(reason)' trail of the most recent changes"""
+    if not history:
+        return ""
+    start = history[0][0]
+    recent = history[-limit:]
+    return " -> ".join(f"{lim}@{ts - start:.0f}s({reason})" for ts, lim, reason in recent)
@@ -1,54 +1,258 @@
 #!/usr/bin/env python3
 """
 loads and validates configuration from YAML files
+a file is parsed (with libyaml when available) and checked against the
+schema once, the compiled result is cached in memory by mtime and on
+disk by content hash, so repeat loads skip YAML entirely
 """
 
+import difflib
+import hashlib
+import json
 import os
+from dataclasses import asdict, fields
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import yaml
 
+from .checkpoint import read_json, write_json_atomic
+from .fetch_plan import TREND_FIELDS
 from .models import ProfileConfig, CardConfig
 
 
+# bump when parsing or validation changes, so old cache entries are ignored
+CACHE_VERSION = 2
+
+_Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# section -> key -> accepted type, lists are lists of strings
+SCHEMA: Dict[str, Dict[str, type]] = {
+    "profile": {"username": str, "organization": str},
+    "display": {"themes": list, "max_languages": int},
+    "collection": {
+        "shards": int,
+        "lines_engine": str,
+        "mirror_dir": str,
+        "author_emails": list,
+    },
+    "filters": {"exclude_repos": list, "exclude_languages": list, "exclude_forks": bool},
+    "history": {"path": str, "keep_daily_days": int},
+}
+
+# card -> its options besides enabled and style
+CARD_OPTIONS: Dict[str, Dict[str, type]] = {
+    "overview": {
+        "show_stars": bool,
+        "show_forks": bool,
+        "show_contributions": bool,
+        "show_lines_changed": bool,
+        "show_views": bool,
+        "show_repos": bool,
+    },
+    "languages": {},
+    "trend": {"metric": str, "days": int},
+    "heatmap": {"weeks": int},
+}
+
+CARD_KEYS: Dict[str, type] = {"enabled": bool, "style": str}
+
+# key path -> allowed values (every item, for lists)
+CHOICES: Dict[Tuple[str, ...], Tuple[str, ...]] = {
+    ("display", "themes"): ("dark", "light"),
+    ("collection", "lines_engine"): ("api", "git"),
+    ("cards", "trend", "metric"): tuple(TREND_FIELDS),
+}
+
+_TYPE_NAMES = {str: "a string", int: "an integer", bool: "true or false", list: "a list", dict: "a mapping"}
+
+# path -> (mtime_ns, size), env it used and the compiled config as JSON,
+# kept as text so every load builds its own objects, env values are
+# stored as digests (see _env_digests)
+_memory: Dict[str, Tuple[Tuple[int, int], Dict[str, str], str]] = {}
+
+
+class ConfigError(Exception):
+    """invalid configuration, every problem is reported as file:line: message"""
+
+    def __init__(self, path: str, problems: List[Tuple[Optional[int], str]]):
+        self.path = str(path)
+        self.problems = problems
+        super().__init__("\n".join(
+            f"{self.path}:{line}: {message}" if line else f"{self.path}: {message}"
+            for line, message in problems
+        ))
+
+
 class ConfigLoader:
     """handles loading profile configuration from various sources"""
 
-    def __init__(self, config_path: str = ".github/config/profile.yml"):
+    def __init__(
+        self,
+        config_path: str = ".github/config/profile.yml",
+        cache_dir: Optional[str] = ".statsgen/config-cache"
+    ):
         self.config_path = Path(config_path)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        # environment variables the file refers to, and their values
+        self._env: Dict[str, str] = {}
+        # config field -> variable its value came from
+        self._env_fields: Dict[str, str] = {}
 
     def load(self) -> ProfileConfig:
         """loads config from file, falls back to env vars if file doesn't exist"""
-        if self.config_path.exists():
-            return self._load_from_file()
-        return self._load_from_env()
+        try:
+            stat = self.config_path.stat()
+        except FileNotFoundError:
+            return self._load_from_env()
 
-    def _load_from_file(self) -> ProfileConfig:
-        """parses YAML config file"""
-        with open(self.config_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        key = str(self.config_path.resolve())
+        cached = _memory.get(key)
+        if cached is not None and cached[0] == stamp and _env_matches(cached[1]):
+            return _from_dict(json.loads(cached[2]))
 
-        profile = data.get("profile", {})
-        display = data.get("display", {})
-        filters = data.get("filters", {})
-        cards = data.get("cards", {})
+        raw = self.config_path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        entry = self._read_cache(digest)
+        values = _with_env(entry) if entry is not None else None
+        config = _from_dict(values) if values is not None else None
+        if config is None:
+            config = self._load_from_file(raw)
+            values = asdict(config)
+            # the cache directory is uploaded with the workflow cache, so
+            # ${VAR} values never go in: fields filled from the environment
+            # are read again on load, and the env check compares digests
+            entry = {
+                "version": CACHE_VERSION,
+                "digest": digest,
+                "env": _env_digests(self._env),
+                "env_fields": self._env_fields,
+                "config": {
+                    name: "" if name in self._env_fields else value
+                    for name, value in values.items()
+                },
+            }
+            self._write_cache(digest, entry)
 
-        username = self._resolve_env(profile.get("username", ""))
+        _memory[key] = (stamp, entry["env"], json.dumps(values))
+        return config
+
+    def _read_cache(self, digest: str) -> Optional[Dict]:
+        """the compiled entry for this file content, if cached and still valid"""
+        if self.cache_dir is None:
+            return None
+        entry = read_json(self.cache_dir / f"{digest[:32]}.json")
+        if (
+            not isinstance(entry, dict)
+            or entry.get("version") != CACHE_VERSION
+            or entry.get("digest") != digest
+            or not _env_matches(entry.get("env", {}))
+        ):
+            return None
+        return entry
+
+    def _write_cache(self, digest: str, entry: Dict) -> None:
+        if self.cache_dir is None:
+            return
+        try:
+            write_json_atomic(self.cache_dir / f"{digest[:32]}.json", entry)
+        except OSError:
+            # a read-only checkout still loads, just without the disk cache
+            pass
+
+    def _load_from_file(self, raw: bytes) -> ProfileConfig:
+        """parses and validates YAML config, raises ConfigError with line numbers"""
+        data, lines = self._parse(raw)
+        problems = self._validate(data, lines)
+        if problems:
+            raise ConfigError(self.config_path, problems)
+
+        profile = _section(data, "profile")
+        display = _section(data, "display")
+        filters = _section(data, "filters")
+        cards = _section(data, "cards")
+        history = _section(data, "history")
+        collection = _section(data, "collection")
+
+        username = self._resolve_env(profile.get("username", ""), "username")
         if not username:
-            username = os.getenv("GITHUB_REPOSITORY_OWNER", "")
+            username = self._getenv("GITHUB_REPOSITORY_OWNER", "username")
 
         return ProfileConfig(
             username=username,
+            organization=self._resolve_env(profile.get("organization", ""), "organization"),
+            shards=collection.get("shards", 0),
+            lines_engine=collection.get("lines_engine", "api"),
+            mirror_dir=collection.get("mirror_dir", ".statsgen/mirrors"),
+            author_emails=collection.get("author_emails", []),
             themes=display.get("themes", ["dark", "light"]),
             max_languages=display.get("max_languages", 8),
             exclude_repos=filters.get("exclude_repos", []),
             exclude_languages=filters.get("exclude_languages", []),
             exclude_forks=filters.get("exclude_forks", False),
-            overview_card=self._parse_card_config(cards.get("overview", {})),
-            languages_card=self._parse_card_config(cards.get("languages", {}))
+            overview_card=self._parse_card_config(cards.get("overview") or {}),
+            languages_card=self._parse_card_config(cards.get("languages") or {}),
+            trend_card=self._parse_card_config(cards.get("trend") or {"enabled": False}),
+            heatmap_card=self._parse_card_config(cards.get("heatmap") or {"enabled": False}),
+            history_path=history.get("path", ".statsgen/history.db"),
+            history_keep_days=history.get("keep_daily_days", 90)
         )
 
+    def _parse(self, raw: bytes) -> Tuple[Any, Dict[Tuple, int]]:
+        """YAML document plus the line every mapping key and list item is on"""
+        loader = _Loader(raw)
+        try:
+            node = loader.get_single_node()
+            data = loader.construct_document(node) if node is not None else {}
+        except yaml.MarkedYAMLError as e:
+            mark = e.problem_mark or e.context_mark
+            raise ConfigError(
+                self.config_path,
+                [(mark.line + 1 if mark else None, e.problem or e.context or "invalid YAML")]
+            ) from None
+        except yaml.YAMLError as e:
+            raise ConfigError(self.config_path, [(None, str(e))]) from None
+        finally:
+            loader.dispose()
+
+        lines: Dict[Tuple, int] = {}
+        if node is not None:
+            _node_lines(node, (), lines)
+        return data, lines
+
+    def _validate(self, data: Any, lines: Dict[Tuple, int]) -> List[Tuple[Optional[int], str]]:
+        """checks keys, types and choices, returns every problem found"""
+        problems: List[Tuple[Optional[int], str]] = []
+
+        def report(path: Tuple, message: str) -> None:
+            while path and path not in lines:
+                path = path[:-1]
+            problems.append((lines.get(path, 1 if path else None), message))
+
+        if data is None:
+            return problems
+        if not isinstance(data, dict):
+            report((), "expected a mapping of sections at the top level")
+            return problems
+
+        for section, body in data.items():
+            if section == "cards":
+                if _check_type(report, ("cards",), body, dict):
+                    for card, options in body.items():
+                        if card not in CARD_OPTIONS:
+                            _unknown(report, ("cards", card), card, CARD_OPTIONS, "cards")
+                        elif _check_type(report, ("cards", card), options, dict):
+                            schema = {**CARD_KEYS, **CARD_OPTIONS[card]}
+                            _check_section(report, ("cards", card), options, schema)
+            elif section in SCHEMA:
+                if _check_type(report, (section,), body, dict):
+                    _check_section(report, (section,), body, SCHEMA[section])
+            else:
+                _unknown(report, (section,), section, {**SCHEMA, "cards": None}, "the top level")
+
+        return problems
+
     def _load_from_env(self) -> ProfileConfig:
         """builds config from environment variables"""
         username = os.getenv("GITHUB_REPOSITORY_OWNER", os.getenv("GITHUB_ACTOR", ""))
@@ -65,6 +269,7 @@ class ConfigLoader:
 
         return ProfileConfig(
             username=username,
+            organization=os.getenv("STATSGEN_ORG", ""),
             exclude_repos=exclude_repos,
             exclude_languages=exclude_langs,
             exclude_forks=exclude_forks
@@ -72,15 +277,116 @@ class ConfigLoader:
 
     def _parse_card_config(self, data: dict) -> CardConfig:
         """converts dict to CardConfig"""
+        data = {k: v for k, v in data.items() if v is not None}
         return CardConfig(
             enabled=data.get("enabled", True),
             style=data.get("style", "default"),
             options={k: v for k, v in data.items() if k not in ("enabled", "style")}
         )
 
-    def _resolve_env(self, value: str) -> str:
+    def _resolve_env(self, value: str, field: str) -> str:
         """resolves ${VAR} patterns to environment variables"""
         if value.startswith("${") and value.endswith("}"):
             var_name = value[2:-1]
-            return os.getenv(var_name, "")
+            return self._getenv(var_name, field)
         return value
+
+    def _getenv(self, name: str, field: str) -> str:
+        """reads a variable for a field and remembers it, cached configs are only valid for the same values"""
+        self._env[name] = os.getenv(name, "")
+        self._env_fields[field] = name
+        return self._env[name]
+
+
+def _section(data: Optional[Dict], name: str) -> Dict:
+    """one section with empty (null) values dropped, so they take their defaults"""
+    body = (data or {}).get(name) or {}
+    return {key: value for key, value in body.items() if value is not None}
+
+
+def _node_lines(node: yaml.Node, path: Tuple, lines: Dict[Tuple, int]) -> None:
+    """records 1-based line numbers of keys and items below node"""
+    if isinstance(node, yaml.MappingNode):
+        for key_node, value_node in node.value:
+            child = path + (key_node.value,)
+            lines[child] = key_node.start_mark.line + 1
+            _node_lines(value_node, child, lines)
+    elif isinstance(node, yaml.SequenceNode):
+        for index, item in enumerate(node.value):
+            child = path + (index,)
+            lines[child] = item.start_mark.line + 1
+            _node_lines(item, child, lines)
+
+
+def _check_type(report, path: Tuple, value: Any, expected: type) -> bool:
+    """reports value unless it's of the expected type, null always passes"""
+    if value is None:
+        return False
+    # bool is an int subclass, but `days: true` is still a mistake
+    if isinstance(value, expected) and not (isinstance(value, bool) and expected is not bool):
+        return True
+    report(path, f"{'.'.join(map(str, path))} should be {_TYPE_NAMES[expected]}, got {type(value).__name__}")
+    return False
+
+
+def _check_section(report, path: Tuple, body: Dict, schema: Dict[str, type]) -> None:
+    """checks every key of one mapping against its schema and choices"""
+    for key, value in body.items():
+        if key not in schema:
+            _unknown(report, path + (key,), key, schema, ".".join(path))
+            continue
+        if not _check_type(report, path + (key,), value, schema[key]):
+            continue
+
+        items = list(enumerate(value)) if schema[key] is list else [(None, value)]
+        choices = CHOICES.get(path + (key,))
+        for index, item in items:
+            item_path = path + (key,) if index is None else path + (key, index)
+            if index is not None and not isinstance(item, str):
+                report(item_path, f"{'.'.join(map(str, path + (key,)))} should only contain strings")
+            elif choices and item not in choices:
+                report(item_path, f"{item!r} is not one of {', '.join(choices)}")
+
+
+def _unknown(report, path: Tuple, key: Any, known: Dict, where: str) -> None:
+    """reports a key the schema doesn't have, suggesting the closest match"""
+    message = f"unknown key {key!r} in {where}"
+    close = difflib.get_close_matches(str(key), list(known), n=1)
+    if close:
+        message += f", did you mean {close[0]!r}?"
+    report(path, message)
+
+
+def _env_digest(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def _env_digests(env: Dict[str, str]) -> Dict[str, str]:
+    """variable -> sha256 of its value, enough to tell whether it changed"""
+    return {name: _env_digest(value) for name, value in env.items()}
+
+
+def _env_matches(env: Dict[str, str]) -> bool:
+    return all(_env_digest(os.getenv(name, "")) == digest for name, digest in env.items())
+
+
+def _with_env(entry: Dict) -> Optional[Dict]:
+    """a cached entry's config with its environment fields read again"""
+    values = entry.get("config")
+    if not isinstance(values, dict):
+        return None
+    return {**values, **{
+        field: os.getenv(name, "") for field, name in entry.get("env_fields", {}).items()
+    }}
+
+
+def _from_dict(data: Dict) -> Optional[ProfileConfig]:
+    """rebuilds a cached ProfileConfig, None when the cache is from older code"""
+    try:
+        values = dict(data)
+        for item in fields(ProfileConfig):
+            if item.type is CardConfig and item.name in values:
+                values[item.name] = CardConfig(**values[item.name])
+        return ProfileConfig(**values)
+    except TypeError:
+        return None
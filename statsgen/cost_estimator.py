@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+dry-run planner that predicts what a full collection will cost
+one cheap GraphQL query gives repo counts, contribution years and the
+current rate limit, everything else is derived from how the collector pages
+"""
+
+import math
+from dataclasses import dataclass
+from typing import List
+
+from .github_client import GitHubClient
+from .fetch_plan import FetchPlan
+from .models import ProfileConfig
+from .org_collector import ORG_CONCURRENCY, shard_concurrency, shard_count
+from .queries import ORG_PLAN, VIEWER_PLAN, YEARS_PER_QUERY
+
+
+PAGE_SIZE = 100
+
+# REST core budget for an authenticated token, per hour
+REST_LIMIT = 5000
+
+
+@dataclass
+class CostEstimate:
+    """predicted API usage and wall time for a full run"""
+    repos: int = 0
+    contribution_years: int = 0
+    graphql_requests: int = 0
+    graphql_points: int = 0
+    rest_requests: int = 0
+    expected_retries: int = 0
+    wall_seconds: float = 0.0
+    concurrency: int = 1
+    rate_limit: int = 0
+    rate_remaining: int = 0
+    rate_reset_at: str = ""
+
+    @property
+    def fits_budget(self) -> bool:
+        """true when the GraphQL points fit in what is left this hour"""
+        return self.graphql_points <= self.rate_remaining
+
+    def summary(self) -> List[str]:
+        """human readable plan lines"""
+        lines = [
+            f"repositories: {self.repos:,}",
+            f"contribution years: {self.contribution_years}",
+            f"graphql requests: {self.graphql_requests:,} (~{self.graphql_points:,} points)",
+            f"rest requests: {self.rest_requests:,} (+~{self.expected_retries:,} retries for 202)",
+            f"rest budget: {self.rest_requests + self.expected_retries:,} of {REST_LIMIT:,}/hour",
+            f"expected wall time: ~{_format_duration(self.wall_seconds)} at concurrency {self.concurrency}",
+            f"graphql rate limit: {self.rate_remaining:,}/{self.rate_limit:,} remaining",
+        ]
+        if not self.fits_budget:
+            lines.append(f"warning: not enough points left, limit resets at {self.rate_reset_at}")
+        return lines
+
+
+class CostEstimator:
+    """predicts requests, rate limit points and wall time without collecting"""
+
+    def __init__(
+        self,
+        client: GitHubClient,
+        config: ProfileConfig,
+        latency: float = 0.4,
+        retry_ratio: float = 0.3,
+        retries_per_miss: int = 2,
+        retry_delay: float = 2.0
+    ):
+        self.client = client
+        self.config = config
+        self.latency = latency
+        self.retry_ratio = retry_ratio
+        self.retries_per_miss = retries_per_miss
+        self.retry_delay = retry_delay
+        self.plan = FetchPlan.from_config(config)
+
+    async def estimate(self) -> CostEstimate:
+        """runs the planning query and derives the cost of a full run"""
+        if self.config.organization:
+            return await self._estimate_org()
+        return await self._estimate_viewer()
+
+    async def _estimate_viewer(self) -> CostEstimate:
+        result = await self.client.graphql(VIEWER_PLAN)
+        data = result.get("data") or {}
+        viewer = data.get("viewer") or {}
+
+        owned = viewer.get("repositories", {}).get("totalCount", 0)
+        contributed = 0
+        if not self.config.exclude_forks:
+            contributed = viewer.get("repositoriesContributedTo", {}).get("totalCount", 0)
+        years = viewer.get("contributionsCollection", {}).get("contributionYears", [])
+
+        # owned and contributed repos are paged together in one query
+        repo_pages = 0
+        if "repos" in self.plan.phases:
+            repo_pages = max(1, math.ceil(max(owned, contributed) / PAGE_SIZE))
+        # the years lookup plus one query per batch of contribution years
+        contribution_queries = 0
+        if "contributions" in self.plan.phases:
+            contribution_queries = 1 + math.ceil(len(years) / YEARS_PER_QUERY)
+
+        estimate = CostEstimate(
+            repos=max(0, owned + contributed - len(self.config.exclude_repos)),
+            contribution_years=len(years),
+            graphql_requests=repo_pages + contribution_queries,
+            graphql_points=repo_pages * self._page_points(2) + contribution_queries,
+            # the per-repo sweeps run as wide as the client's limiter, which
+            # starts here and only grows while GitHub keeps up
+            concurrency=self.client.limiter.limit,
+        )
+        # mirrors count lines with git, the API only lists the emails to match
+        self._apply_rest(estimate, api_lines=self.config.lines_engine != "git")
+        self._apply_rate_limit(estimate, data)
+        return estimate
+
+    async def _estimate_org(self) -> CostEstimate:
+        result = await self.client.graphql(
+            ORG_PLAN, {"login": self.config.organization}
+        )
+        data = result.get("data") or {}
+        org = data.get("organization") or {}
+
+        total = org.get("repositories", {}).get("totalCount", 0)
+        repo_pages = max(1, math.ceil(total / PAGE_SIZE))
+        # shards split one ORG_CONCURRENCY budget, they don't each get their own
+        shards = min(shard_count(self.config.shards), max(1, total))
+
+        estimate = CostEstimate(
+            repos=max(0, total - len(self.config.exclude_repos)),
+            graphql_requests=repo_pages,
+            graphql_points=repo_pages * self._page_points(1),
+            concurrency=shards * shard_concurrency(shards, ORG_CONCURRENCY),
+        )
+        self._apply_rest(estimate)
+        self._apply_rate_limit(estimate, data)
+        return estimate
+
+    def _page_points(self, connections: int) -> int:
+        """GitHub's cost formula: connection requests needed, divided by 100
+
+        each repo connection is one request plus one languages
+        connection per repo node on the page when languages are wanted
+        """
+        per_repo = 1 if self.plan.include_languages else 0
+        requests = connections * (1 + PAGE_SIZE * per_repo)
+        return max(1, round(requests / 100))
+
+    def _apply_rest(self, estimate: CostEstimate, api_lines: bool = True) -> None:
+        """adds the per-repo contributor and traffic sweeps and their timing"""
+        phases = self.plan.phases
+        contributors = "code_stats" in phases and api_lines
+        sweeps = contributors + ("traffic" in phases)
+        estimate.rest_requests = estimate.repos * sweeps
+        if "code_stats" in phases and not api_lines and not self.config.author_emails:
+            estimate.rest_requests += 1
+
+        # only stats/contributors answers 202 while GitHub computes it
+        if contributors:
+            estimate.expected_retries = math.ceil(
+                estimate.repos * self.retry_ratio * self.retries_per_miss
+            )
+
+        rest_seconds = (
+            estimate.rest_requests * self.latency
+            + estimate.expected_retries * (self.latency + self.retry_delay)
+        )
+        estimate.wall_seconds = (
+            estimate.graphql_requests * self.latency
+            + rest_seconds / estimate.concurrency
+        )
+
+    def _apply_rate_limit(self, estimate: CostEstimate, data: dict) -> None:
+        rate = data.get("rateLimit") or {}
+        estimate.rate_limit = rate.get("limit", 0)
+        estimate.rate_remaining = rate.get("remaining", 0)
+        estimate.rate_reset_at = rate.get("resetAt", "")
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{secs:02d}s"
+    return f"{secs}s"
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+time budget for best-effort collection
+the run's deadline is split into phase slices weighted by how much work
+each phase usually is, and every request gets at most its own slice, so
+one stuck repo can't eat the time meant for the rest
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+
+# relative share of the remaining time each phase gets
+PHASE_WEIGHTS: Dict[str, float] = {
+    "probe": 0.5,
+    "repos": 1.0,
+    "contributions": 1.0,
+    "code_stats": 4.0,
+    "traffic": 2.0,
+}
+
+# returned by Deadline.run() when the request didn't finish in its slice
+TIMED_OUT = object()
+
+
+class Deadline:
+    """wall-clock budget for one collection
+
+    `reserve` seconds are kept back for rendering and writing cards, time a
+    phase doesn't use rolls over to the phases after it
+    """
+
+    def __init__(
+        self,
+        seconds: float,
+        request_timeout: float = 30.0,
+        reserve: float = 5.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.request_timeout = request_timeout
+        self._clock = clock
+        self._end = clock() + max(0.0, seconds - reserve)
+        self._phase_end = self._end
+        self.timeouts = 0
+
+    def remaining(self) -> float:
+        return max(0.0, self._end - self._clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def start_phase(self, phase: str, pending: Iterable[str]) -> float:
+        """opens phase's slice out of the remaining phases' share, returns its length"""
+        weights = [PHASE_WEIGHTS.get(name, 1.0) for name in pending]
+        share = PHASE_WEIGHTS.get(phase, 1.0) / sum(weights) if weights else 1.0
+        budget = self.remaining() * share
+        self._phase_end = self._clock() + budget
+        return budget
+
+    def phase_remaining(self) -> float:
+        """what's left of the current phase's slice"""
+        return max(0.0, self._phase_end - self._clock())
+
+    def slice(self) -> float:
+        """time the next request may take: its own cap, or what's left of the phase"""
+        return max(0.0, min(self.request_timeout, self._phase_end - self._clock()))
+
+    async def run(self, awaitable: Awaitable[Any]) -> Any:
+        """awaits one request within its slice, TIMED_OUT if it didn't make it"""
+        try:
+            return await asyncio.wait_for(awaitable, self.slice())
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return TIMED_OUT
+
+
+def describe_stale(stale: Dict[str, int], repos: int, taken_at: Optional[str]) -> str:
+    """one line naming figures that came from the previous snapshot"""
+    parts = []
+    for name, count in sorted(stale.items()):
+        parts.append(f"{name} ({count} of {repos} repos)" if count else name)
+    source = f"snapshot from {taken_at}" if taken_at else "no snapshot, left at zero"
+    return f"stale: {', '.join(parts)} [{source}]"
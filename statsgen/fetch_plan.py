@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+derives the minimal set of API work from the enabled cards
+each card field declares the stats it needs, the plan turns those
+into collector phases and GraphQL fields
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Set, Tuple
+
+from .models import ProfileConfig
+
+
+# overview card option -> (template key, stats fields it needs)
+OVERVIEW_FIELDS: Dict[str, Tuple[str, FrozenSet[str]]] = {
+    "show_stars": ("stars", frozenset({"stars"})),
+    "show_forks": ("forks", frozenset({"forks"})),
+    "show_contributions": ("contributions", frozenset({"contributions"})),
+    "show_lines_changed": ("lines_changed", frozenset({"lines_changed"})),
+    "show_views": ("views", frozenset({"views"})),
+    "show_repos": ("repos", frozenset({"repos_count"})),
+}
+
+LANGUAGES_FIELDS = frozenset({"languages"})
+
+HEATMAP_FIELDS = frozenset({"calendar"})
+
+# trend metric -> stats fields it needs
+TREND_FIELDS: Dict[str, FrozenSet[str]] = {
+    "stars": frozenset({"stars"}),
+    "forks": frozenset({"forks"}),
+    "contributions": frozenset({"contributions"}),
+    "repos_count": frozenset({"repos_count"}),
+    "lines_added": frozenset({"lines_changed"}),
+    "lines_deleted": frozenset({"lines_changed"}),
+    "views": frozenset({"views"}),
+}
+
+ALL_FIELDS = frozenset({
+    "stars", "forks", "contributions", "repos_count",
+    "lines_changed", "views", "languages", "calendar",
+})
+
+# contributions belong to a user, an organization has no calendar to read
+# them from, so org runs neither collect nor show them
+ORG_UNSUPPORTED = frozenset({"contributions", "calendar"})
+
+# fields that are read off repository nodes, so they need the repo listing
+_REPO_FIELDS = frozenset({"stars", "forks", "repos_count", "languages"})
+
+
+@dataclass
+class FetchPlan:
+    """which stats to collect, and therefore which phases and query fields to run"""
+    fields: FrozenSet[str] = field(default_factory=lambda: ALL_FIELDS)
+
+    @classmethod
+    def from_config(cls, config: ProfileConfig) -> "FetchPlan":
+        """collects the requirements of every enabled card"""
+        needed: Set[str] = set()
+
+        if config.overview_card.enabled:
+            for option, (_, requires) in OVERVIEW_FIELDS.items():
+                if config.overview_card.options.get(option, True):
+                    needed |= requires
+
+        if config.languages_card.enabled:
+            needed |= LANGUAGES_FIELDS
+
+        if config.heatmap_card.enabled:
+            needed |= HEATMAP_FIELDS
+
+        if config.trend_card.enabled:
+            metric = config.trend_card.options.get("metric", "stars")
+            needed |= TREND_FIELDS.get(metric, frozenset())
+
+        if config.organization:
+            needed -= ORG_UNSUPPORTED
+
+        return cls(fields=frozenset(needed))
+
+    def needs(self, name: str) -> bool:
+        return name in self.fields
+
+    @property
+    def phases(self) -> Tuple[str, ...]:
+        """collector phases to run, in order"""
+        phases = []
+        # code stats and traffic iterate the repo list, so they need it too
+        if self.fields & (_REPO_FIELDS | {"lines_changed", "views"}):
+            phases.append("repos")
+        if self.needs("contributions") or self.needs("calendar"):
+            phases.append("contributions")
+        if self.needs("lines_changed"):
+            phases.append("code_stats")
+        if self.needs("views"):
+            phases.append("traffic")
+        return tuple(phases)
+
+    def narrow(self, stale: FrozenSet[str]) -> "FetchPlan":
+        """plan that only refreshes stale fields
+
+        repo listing fields come with the listing the other phases need
+        anyway, and views are a rolling window, so both always refresh
+        """
+        return FetchPlan(fields=self.fields & (stale | _REPO_FIELDS | {"views"}))
+
+    @property
+    def include_languages(self) -> bool:
+        """whether the repos query should request language edges"""
+        return self.needs("languages")
+
+
+def overview_visibility(config: ProfileConfig) -> Dict[str, bool]:
+    """template key -> shown, for the overview card"""
+    return {
+        key: bool(config.overview_card.options.get(option, True))
+        and not (config.organization and requires & ORG_UNSUPPORTED)
+        for option, (key, requires) in OVERVIEW_FIELDS.items()
+    }
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+cheap change detection between runs
+one small query (a page per 100 repos) summarizes what the cards depend
+on, comparing it with the last run's fingerprint tells which stats can
+have moved, or that nothing did and the run can stop early
+"""
+
+import hashlib
+from dataclasses import asdict, dataclass
+from datetime import date
+from pathlib import Path
+from typing import Dict, FrozenSet, Optional
+
+from .checkpoint import read_json, write_json_atomic
+from .fetch_plan import ALL_FIELDS
+from .github_client import GitHubClient
+from .models import ProfileConfig
+from .queries import FINGERPRINT, year_range
+
+
+# fingerprint component -> stats fields that may change when it does
+COMPONENT_FIELDS: Dict[str, FrozenSet[str]] = {
+    "repos": frozenset({"repos_count", "stars", "forks", "languages", "lines_changed", "views"}),
+    "pushed_at": frozenset({"languages", "lines_changed", "contributions", "calendar"}),
+    "stars": frozenset({"stars"}),
+    "forks": frozenset({"forks"}),
+    "contributions": frozenset({"contributions", "calendar"}),
+    "config": ALL_FIELDS,
+}
+
+
+@dataclass
+class Fingerprint:
+    """summary of everything the cards are built from"""
+    repos: int = 0
+    pushed_at: str = ""
+    stars: int = 0
+    forks: int = 0
+    contributions: int = 0
+    config: str = ""
+
+    def stale_fields(self, previous: "Fingerprint") -> FrozenSet[str]:
+        """stats fields that may differ from the run previous was taken in"""
+        stale = set()
+        for name, fields in COMPONENT_FIELDS.items():
+            if getattr(self, name) != getattr(previous, name):
+                stale |= fields
+        return frozenset(stale)
+
+
+def config_digest(config: ProfileConfig) -> str:
+    """changes whenever any setting that shapes the cards does"""
+    return hashlib.sha256(repr(config).encode("utf-8")).hexdigest()[:16]
+
+
+async def probe(
+    client: GitHubClient,
+    config: ProfileConfig,
+    pushed: Optional[Dict[str, str]] = None
+) -> Fingerprint:
+    """builds the current fingerprint, counting repos the way the collector does
+
+    pass a dict as pushed to also get every repo's last push time
+    """
+    fingerprint = Fingerprint(config=config_digest(config))
+    owned_cursor = contrib_cursor = None
+    variables = year_range(date.today().year)
+    first_page = True
+
+    while True:
+        result = await client.graphql(FINGERPRINT, {
+            **variables,
+            "ownedCursor": owned_cursor,
+            "contribCursor": contrib_cursor,
+            "withContributions": first_page,
+        })
+        first_page = False
+        viewer = result.get("data", {}).get("viewer", {})
+
+        owned = viewer.get("repositories", {})
+        contrib = viewer.get("repositoriesContributedTo", {})
+        if "contributionsCollection" in viewer:
+            fingerprint.contributions = (
+                viewer["contributionsCollection"]
+                .get("contributionCalendar", {})
+                .get("totalContributions", 0)
+            )
+
+        connections = [owned]
+        fingerprint.repos = owned.get("totalCount", 0)
+        if not config.exclude_forks:
+            connections.append(contrib)
+            fingerprint.repos += contrib.get("totalCount", 0)
+
+        for connection in connections:
+            for repo in connection.get("nodes", []):
+                fingerprint.stars += repo.get("stargazerCount", 0)
+                fingerprint.forks += repo.get("forkCount", 0)
+                fingerprint.pushed_at = max(fingerprint.pushed_at, repo.get("pushedAt") or "")
+                if pushed is not None and repo.get("nameWithOwner"):
+                    pushed[repo["nameWithOwner"]] = repo.get("pushedAt") or ""
+
+        has_more_owned = owned.get("pageInfo", {}).get("hasNextPage", False)
+        has_more_contrib = contrib.get("pageInfo", {}).get("hasNextPage", False)
+        if not (has_more_owned or has_more_contrib):
+            return fingerprint
+
+        # an exhausted connection keeps its last cursor and returns no more nodes
+        owned_cursor = owned.get("pageInfo", {}).get("endCursor") or owned_cursor
+        contrib_cursor = contrib.get("pageInfo", {}).get("endCursor") or contrib_cursor
+
+
+def load_fingerprint(path: str) -> Optional[Fingerprint]:
+    """reads the fingerprint of the last successful run, if any"""
+    data = read_json(Path(path))
+    if not isinstance(data, dict):
+        return None
+    try:
+        return Fingerprint(**data)
+    except TypeError:
+        return None
+
+
+def save_fingerprint(path: str, fingerprint: Fingerprint) -> None:
+    write_json_atomic(Path(path), asdict(fingerprint))
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+lines changed from local git mirrors
+keeps a bare mirror per repo, fetches only new objects each run and sums
+the author's additions/deletions with `git log --numstat` from the last
+processed commit, so numbers are exact and cost no API quota
+"""
+
+import asyncio
+import base64
+import hashlib
+import os
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .checkpoint import read_json, write_json_atomic
+from .processes import pool_context
+
+
+STATE_FILE = "state.json"
+
+
+@dataclass
+class MirrorJob:
+    """work unit sent to a worker process"""
+    repo: str
+    url: str
+    path: str
+    authors: List[str]
+    token: Optional[str] = None
+    since: str = ""
+    added: int = 0
+    deleted: int = 0
+    commits: int = 0
+    # wall-clock time (time.time()) by which every git call must be done
+    until: Optional[float] = None
+
+
+@dataclass
+class MirrorResult:
+    """author totals of a repo up to head
+
+    commits counts the author's commits, 0 means none of the patterns
+    matched, which usually means the user commits under another email
+    """
+    repo: str
+    head: str = ""
+    added: int = 0
+    deleted: int = 0
+    commits: int = 0
+    error: str = ""
+
+
+def author_patterns(username: str, emails: Iterable[str] = ()) -> List[str]:
+    """fixed-string --author patterns for the user's commit identities
+
+    git ORs repeated --author options, the noreply forms cover commits made
+    through the web UI and accounts that hide their email
+    """
+    patterns = [
+        f"<{username}@users.noreply.github.com>",
+        f"+{username}@users.noreply.github.com>",
+    ]
+    patterns.extend(f"<{email}>" for email in emails)
+    return patterns
+
+
+def _remaining(until: Optional[float]) -> Optional[float]:
+    """seconds left before until, raises TimeoutExpired once it has passed"""
+    if until is None:
+        return None
+    left = until - time.time()
+    if left <= 0:
+        raise subprocess.TimeoutExpired("git", 0)
+    return left
+
+
+def _git(
+    args: List[str],
+    cwd: Optional[str] = None,
+    token: Optional[str] = None,
+    until: Optional[float] = None
+) -> str:
+    """runs git and returns stdout, raises CalledProcessError on failure
+
+    git is killed and TimeoutExpired raised if it's still running at until
+    """
+    env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+    if token:
+        # passed through the environment so it never lands in argv or the mirror's config
+        basic = base64.b64encode(f"x-access-token:{token}".encode("utf-8")).decode("ascii")
+        env.update({
+            "GIT_CONFIG_COUNT": "1",
+            "GIT_CONFIG_KEY_0": "http.extraHeader",
+            "GIT_CONFIG_VALUE_0": f"Authorization: Basic {basic}",
+        })
+    return subprocess.run(
+        ["git", *args],
+        cwd=cwd,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+        timeout=_remaining(until)
+    ).stdout
+
+
+def count_numstat(
+    path: str,
+    rev_range: str,
+    authors: List[str],
+    until: Optional[float] = None
+) -> List[int]:
+    """streams `git log --numstat` for rev_range and sums the author's lines
+
+    returns [added, deleted, commits], merges are skipped like the
+    contributors API does, binary files (reported as '-') count nothing,
+    a walk still running at until is killed
+    """
+    args = ["git", "log", "--numstat", "--format=%x00", "--no-merges", "--no-renames", "--fixed-strings"]
+    args.extend(f"--author={pattern}" for pattern in authors)
+    args.append(rev_range)
+
+    added = deleted = commits = 0
+    # stderr goes to a file, a pipe nobody reads could fill up and stall git
+    with tempfile.TemporaryFile() as stderr:
+        timeout = _remaining(until)
+        killed = threading.Event()
+        with subprocess.Popen(
+            args, cwd=path, stdout=subprocess.PIPE, stderr=stderr, text=True, errors="replace"
+        ) as proc:
+            # the read loop blocks on git's output, so a timer does the killing
+            def kill():
+                killed.set()
+                proc.kill()
+
+            killer = threading.Timer(timeout, kill) if timeout is not None else None
+            if killer is not None:
+                killer.start()
+            try:
+                for line in proc.stdout:
+                    if line.startswith("\0"):
+                        commits += 1
+                        continue
+                    a, _, rest = line.partition("\t")
+                    d, _, _ = rest.partition("\t")
+                    if a.isdigit() and d.isdigit():
+                        added += int(a)
+                        deleted += int(d)
+            finally:
+                if killer is not None:
+                    killer.cancel()
+        if killed.is_set():
+            raise subprocess.TimeoutExpired(args, timeout)
+        if proc.returncode:
+            stderr.seek(0)
+            message = stderr.read().decode("utf-8", "replace")
+            raise subprocess.CalledProcessError(proc.returncode, args, stderr=message)
+    return [added, deleted, commits]
+
+
+def sync_repo(job: MirrorJob) -> MirrorResult:
+    """process pool entry point: clone or fetch the mirror, then count new commits"""
+    try:
+        if Path(job.path, "HEAD").exists():
+            _git(["fetch", "--prune", "--quiet"], cwd=job.path, token=job.token, until=job.until)
+        else:
+            Path(job.path).parent.mkdir(parents=True, exist_ok=True)
+            _git(["clone", "--mirror", "--quiet", job.url, job.path], token=job.token, until=job.until)
+
+        try:
+            head = _git(["rev-parse", "--verify", "--quiet", "HEAD"], cwd=job.path, until=job.until).strip()
+        except subprocess.CalledProcessError:
+            return MirrorResult(job.repo)  # empty repository
+
+        if head == job.since:
+            return MirrorResult(job.repo, head, job.added, job.deleted, job.commits)
+
+        added, deleted, commits = 0, 0, 0
+        rev_range = head
+        if job.since and _is_ancestor(job.path, job.since, head, job.until):
+            added, deleted, commits = job.added, job.deleted, job.commits
+            rev_range = f"{job.since}..{head}"
+        # otherwise history was rewritten (or this is the first run), start over
+
+        new_added, new_deleted, new_commits = count_numstat(job.path, rev_range, job.authors, job.until)
+        return MirrorResult(
+            job.repo, head, added + new_added, deleted + new_deleted, commits + new_commits
+        )
+    except subprocess.TimeoutExpired:
+        return MirrorResult(job.repo, error="out of time")
+    except (OSError, subprocess.CalledProcessError) as e:
+        message = (getattr(e, "stderr", None) or str(e)).strip()
+        return MirrorResult(job.repo, error=message.splitlines()[-1] if message else type(e).__name__)
+
+
+def _is_ancestor(path: str, commit: str, head: str, until: Optional[float] = None) -> bool:
+    try:
+        _git(["merge-base", "--is-ancestor", commit, head], cwd=path, until=until)
+        return True
+    except subprocess.CalledProcessError:
+        return False
+
+
+class MirrorEngine:
+    """computes per-repo lines changed from bare mirrors under cache_dir
+
+    state.json remembers the last processed commit and running totals of
+    every repo, so each run only walks commits pushed since the previous one
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = ".statsgen/mirrors",
+        username: str = "",
+        emails: Iterable[str] = (),
+        token: Optional[str] = None,
+        workers: int = 0,
+        base_url: str = "https://github.com",
+        timeout: Optional[float] = None
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.authors = author_patterns(username, emails)
+        # totals only hold for the identities they were counted with
+        self.authors_key = hashlib.sha256("\n".join(sorted(self.authors)).encode("utf-8")).hexdigest()[:16]
+        self.token = token
+        self.workers = workers or os.cpu_count() or 1
+        self.base_url = base_url.rstrip("/")
+        # seconds each count() may take, repos not done by then report an error
+        self.timeout = timeout
+        self.state: Dict[str, List] = read_json(self.cache_dir / STATE_FILE) or {}
+
+    def url(self, repo: str) -> str:
+        return f"{self.base_url}/{repo}.git"
+
+    def path(self, repo: str) -> Path:
+        return self.cache_dir / f"{repo}.git"
+
+    def count(self, repos: Iterable[str]) -> Dict[str, MirrorResult]:
+        """syncs every repo across the process pool and saves the new state"""
+        until = time.time() + self.timeout if self.timeout is not None else None
+        jobs = []
+        for repo in sorted(set(repos)):
+            entry = self.state.get(repo, [])
+            # other identities, or entries from before commits were counted, start over
+            if len(entry) == 5 and entry[4] == self.authors_key:
+                since, added, deleted, commits, _ = entry
+            else:
+                since, added, deleted, commits = "", 0, 0, 0
+            jobs.append(MirrorJob(
+                repo=repo,
+                url=self.url(repo),
+                path=str(self.path(repo)),
+                authors=self.authors,
+                token=self.token,
+                since=since,
+                added=added,
+                deleted=deleted,
+                commits=commits,
+                until=until
+            ))
+        if not jobs:
+            return {}
+
+        # count_async runs this on an executor thread next to the client's session
+        with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs)), mp_context=pool_context()) as pool:
+            results = list(pool.map(sync_repo, jobs))
+
+        for result in results:
+            if not result.error:
+                self.state[result.repo] = [
+                    result.head, result.added, result.deleted, result.commits, self.authors_key
+                ]
+        write_json_atomic(self.cache_dir / STATE_FILE, self.state)
+
+        return {result.repo: result for result in results}
+
+    async def count_async(self, repos: Iterable[str]) -> Dict[str, MirrorResult]:
+        """count() off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.count, list(repos))
@@ -4,20 +4,38 @@ GitHub API client with rate limiting and retry logic
 handles both GraphQL and REST endpoints
 """
 
-import asyncio
 import os
-from typing import Any, Dict, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Union
 
 import aiohttp
 
+from .coalescing import SingleFlight, StreamFlight, flight_key
+from .concurrency import AdaptiveLimiter, Slot
+from .queries import Query
+from .transport import AiohttpTransport
+
 
 class RateLimitError(Exception):
     """raised when we hit GitHub's rate limit"""
     pass
 
 
+@dataclass
+class RateLimit:
+    """one resource's hourly budget as of the last response"""
+    limit: int
+    remaining: int
+    reset: float
+
+
 class GitHubClient:
-    """async client for GitHub API with automatic retry and rate limit handling"""
+    """async client for GitHub API with automatic retry and rate limit handling
+
+    in-flight requests are bounded by an AdaptiveLimiter that starts at
+    max_concurrent and grows or shrinks with GitHub's responses, the
+    transport (live by default) can record or replay every exchange
+    """
 
     GRAPHQL_ENDPOINT = "https://api.github.com/graphql"
     REST_ENDPOINT = "https://api.github.com"
@@ -27,51 +45,122 @@ class GitHubClient:
         token: Optional[str] = None,
         session: Optional[aiohttp.ClientSession] = None,
         max_concurrent: int = 10,
-        retry_count: int = 3
+        retry_count: int = 3,
+        max_limit: int = 64,
+        coalescer: Optional[SingleFlight] = None,
+        transport=None
     ):
         self.token = token or os.getenv("GH_TOKEN") or os.getenv("ACCESS_TOKEN")
         self._session = session
         self._owns_session = session is None
-        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._limiter = AdaptiveLimiter(initial=max_concurrent, max_limit=max_limit)
         self._retry_count = retry_count
+        self._flights = coalescer or SingleFlight()
+        self._transport = transport or AiohttpTransport()
+        # resource ("core", "graphql", ...) -> budget from the latest headers
+        self.rate_limits: Dict[str, RateLimit] = {}
 
     async def __aenter__(self):
         if self._owns_session:
             self._session = aiohttp.ClientSession()
+        await self._transport.open(self._session)
         return self
 
     async def __aexit__(self, *args):
+        await self._transport.close()
         if self._owns_session and self._session:
             await self._session.close()
 
+    @property
+    def limiter(self) -> AdaptiveLimiter:
+        return self._limiter
+
+    def concurrency_metrics(self) -> Dict:
+        """current concurrency limit, counters and limit history"""
+        return self._limiter.snapshot()
+
+    def coalescing_metrics(self) -> Dict:
+        """how many calls were answered by an identical in-flight request"""
+        return self._flights.stats()
+
     def _headers(self, use_bearer: bool = True) -> Dict[str, str]:
         """builds auth headers"""
         prefix = "Bearer" if use_bearer else "token"
         return {"Authorization": f"{prefix} {self.token}"}
 
-    async def graphql(self, query: str, variables: Optional[Dict] = None) -> Dict:
+    def _note_rate_limit(self, resp: aiohttp.ClientResponse) -> None:
+        """remembers the budget GitHub reports with every response"""
+        headers = resp.headers
+        try:
+            limit = RateLimit(
+                limit=int(headers["X-RateLimit-Limit"]),
+                remaining=int(headers["X-RateLimit-Remaining"]),
+                reset=float(headers["X-RateLimit-Reset"])
+            )
+        except (KeyError, ValueError):
+            return
+        self.rate_limits[headers.get("X-RateLimit-Resource", "core")] = limit
+
+    def _check_throttle(self, resp: aiohttp.ClientResponse, slot: Slot) -> Optional[float]:
+        """marks throttled responses, returns seconds to wait before retrying
+
+        raises RateLimitError when the primary hourly budget is used up,
+        secondary limits (403 with Retry-After, or 429) are retried after a pause
+        """
+        self._note_rate_limit(resp)
+        if resp.status not in (403, 429):
+            return None
+
+        slot.throttled = True
+        if resp.headers.get("X-RateLimit-Remaining") == "0":
+            raise RateLimitError("GitHub API rate limit exceeded")
+
+        retry_after = resp.headers.get("Retry-After")
+        if retry_after is None and resp.status == 403:
+            # a plain 403 without retry hints is treated as before
+            raise RateLimitError("GitHub API rate limit exceeded")
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return 60.0
+
+    async def graphql(
+        self,
+        query: Union[str, Query],
+        variables: Optional[Dict] = None
+    ) -> Dict:
         """executes a GraphQL query with retry logic"""
-        payload = {"query": query}
+        payload = {"query": str(query)}
         if variables:
             payload["variables"] = variables
 
-        async with self._semaphore:
-            for attempt in range(self._retry_count):
-                try:
-                    async with self._session.post(
+        # static queries are keyed by digest instead of their full text
+        body = {"query": getattr(query, "digest", payload["query"]), "variables": variables}
+        key = flight_key("POST", self.GRAPHQL_ENDPOINT, token=self.token, body=body)
+        return await self._flights.do(key, lambda: self._graphql(payload))
+
+    async def _graphql(self, payload: Dict) -> Dict:
+        """sends one GraphQL payload, retrying errors and secondary limits"""
+        for attempt in range(self._retry_count):
+            wait = 2 ** attempt
+            try:
+                async with self._limiter.slot() as slot:
+                    async with self._transport.request(
+                        "POST",
                         self.GRAPHQL_ENDPOINT,
                         headers=self._headers(use_bearer=True),
                         json=payload
                     ) as resp:
-                        if resp.status == 403:
-                            raise RateLimitError("GitHub API rate limit exceeded")
-                        return await resp.json()
-                except aiohttp.ClientError:
-                    if attempt < self._retry_count - 1:
-                        await asyncio.sleep(2 ** attempt)
-                        continue
+                        retry_after = self._check_throttle(resp, slot)
+                        if retry_after is None:
+                            return await resp.json()
+                        wait = retry_after
+            except aiohttp.ClientError:
+                if attempt >= self._retry_count - 1:
                     raise
-        return {}
+            if attempt < self._retry_count - 1:
+                await self._transport.sleep(wait)
+        raise RateLimitError("GitHub API secondary rate limit persisted")
 
     async def rest(self, path: str, params: Optional[Dict] = None) -> Any:
         """makes a REST API call with retry for 202 (processing) responses
@@ -79,41 +168,122 @@ class GitHubClient:
         handles special cases:
         - 202: GitHub is computing stats, retry after delay
         - 204: No content (empty repo, no contributors), return empty
-        - 403: Rate limit exceeded
+        - 403/429: Rate limit exceeded, or a secondary limit to wait out
         """
         url = f"{self.REST_ENDPOINT}/{path.lstrip('/')}"
+        key = flight_key("GET", url, params, token=self.token)
+        return await self._flights.do(key, lambda: self._rest(url, path, params))
 
-        async with self._semaphore:
-            for _ in range(30):
-                async with self._session.get(
+    async def _rest(self, url: str, path: str, params: Optional[Dict]) -> Any:
+        """one REST call including 202 polling and secondary limit retries"""
+        throttles = 0
+
+        for _ in range(30):
+            async with self._limiter.slot() as slot:
+                async with self._transport.request(
+                    "GET",
                     url,
                     headers=self._headers(use_bearer=False),
                     params=params
                 ) as resp:
-                    if resp.status == 202:
+                    wait = self._check_throttle(resp, slot)
+                    if wait is None and resp.status == 202:
                         # GitHub is still computing stats, wait and retry
-                        await asyncio.sleep(2)
-                        continue
-                    if resp.status == 204:
-                        # No content - empty repo or no data available
-                        # Return empty list for endpoints that return arrays
-                        # Return empty dict for endpoints that return objects
-                        return [] if "stats" in path or "contributors" in path else {}
-                    if resp.status == 403:
-                        raise RateLimitError("GitHub API rate limit exceeded")
-                    if resp.status == 404:
-                        # resource not found, return empty
-                        return {} if "views" in path else []
-
-                    # check content type before parsing JSON
-                    content_type = resp.headers.get("Content-Type", "")
-                    if "application/json" not in content_type:
-                        # not JSON content, return empty
-                        return {}
-
-                    # try to parse JSON, handle empty responses gracefully
-                    try:
-                        return await resp.json()
-                    except Exception:
-                        return {}
+                        wait = 2
+                    if wait is None:
+                        return await self._read_rest(resp, path)
+
+            if slot.throttled:
+                throttles += 1
+                if throttles >= self._retry_count:
+                    raise RateLimitError("GitHub API secondary rate limit persisted")
+            # the slot is released while we wait
+            await self._transport.sleep(wait)
         return {}
+
+    async def _read_rest(self, resp, path: str) -> Any:
+        """decodes a final REST response"""
+        if resp.status == 204:
+            # No content - empty repo or no data available
+            # Return empty list for endpoints that return arrays
+            # Return empty dict for endpoints that return objects
+            return [] if "stats" in path or "contributors" in path else {}
+        if resp.status == 404:
+            # resource not found, return empty
+            return {} if "views" in path else []
+
+        # check content type before parsing JSON
+        content_type = resp.headers.get("Content-Type", "")
+        if "application/json" not in content_type:
+            # not JSON content, return empty
+            return {}
+
+        # try to parse JSON, handle empty responses gracefully
+        try:
+            return await resp.json()
+        except Exception:
+            return {}
+
+    async def rest_stream(
+        self,
+        path: str,
+        parser,
+        params: Optional[Dict] = None,
+        chunk_size: int = 64 * 1024
+    ) -> bool:
+        """streams a REST response body into parser.feed() chunk by chunk
+
+        same status handling as rest(), but the body is never materialized,
+        returns True when a JSON body was fed to the parser, concurrent
+        calls for the same path share one download
+        """
+        url = f"{self.REST_ENDPOINT}/{path.lstrip('/')}"
+        key = flight_key("GET", url, params, token=self.token)
+        return await self._flights.stream(
+            key,
+            parser,
+            lambda flight: self._rest_stream(url, params, flight, chunk_size)
+        )
+
+    async def _rest_stream(
+        self,
+        url: str,
+        params: Optional[Dict],
+        flight: StreamFlight,
+        chunk_size: int
+    ) -> bool:
+        """one streamed REST call, chunks go to every parser in the flight"""
+        throttles = 0
+
+        for _ in range(30):
+            async with self._limiter.slot() as slot:
+                async with self._transport.request(
+                    "GET",
+                    url,
+                    headers=self._headers(use_bearer=False),
+                    params=params
+                ) as resp:
+                    wait = self._check_throttle(resp, slot)
+                    if wait is None and resp.status == 202:
+                        wait = 2
+                    if wait is None:
+                        # only a finished 200 carries stats, error bodies would read as zeros
+                        if resp.status != 200:
+                            return False
+
+                        content_type = resp.headers.get("Content-Type", "")
+                        if "application/json" not in content_type:
+                            return False
+
+                        async for chunk in resp.content.iter_chunked(chunk_size):
+                            flight.feed(chunk)
+                            if flight.done:
+                                break
+                        return True
+
+            if slot.throttled:
+                throttles += 1
+                if throttles >= self._retry_count:
+                    raise RateLimitError("GitHub API secondary rate limit persisted")
+            await self._transport.sleep(wait)
+        return False
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+append-only SQLite history of collected profile stats
+every run adds a snapshot keyed by date so trend cards can be
+rendered from local data without extra API calls
+"""
+
+import sqlite3
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .fetch_plan import TREND_FIELDS
+from .models import ProfileStats
+
+
+METRICS = (
+    "stars",
+    "forks",
+    "contributions",
+    "repos_count",
+    "lines_added",
+    "lines_deleted",
+    "views",
+)
+
+# metrics are NULL on runs whose cards didn't need them collected
+_SNAPSHOTS = """
+CREATE TABLE IF NOT EXISTS {table} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    day TEXT NOT NULL,
+    stars INTEGER,
+    forks INTEGER,
+    contributions INTEGER,
+    repos_count INTEGER,
+    lines_added INTEGER,
+    lines_deleted INTEGER,
+    views INTEGER
+);
+"""
+
+_SCHEMA = _SNAPSHOTS.format(table="snapshots") + """
+CREATE INDEX IF NOT EXISTS idx_snapshots_user_day ON snapshots (username, day, id);
+
+CREATE TABLE IF NOT EXISTS language_sizes (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (snapshot_id, name)
+) WITHOUT ROWID;
+"""
+
+# VACUUM only once this share of the file is free pages, rewriting the
+# whole database after every small compaction costs more than it saves
+VACUUM_FREE_RATIO = 0.25
+
+
+class HistoryStore:
+    """stores one row per run and answers date range queries over it"""
+
+    def __init__(self, db_path: str = ".statsgen/history.db"):
+        self.db_path = Path(db_path)
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def open(self) -> None:
+        """opens the database and creates tables if needed"""
+        if self._conn is not None:
+            return
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.db_path))
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        self._conn.execute("PRAGMA foreign_keys=ON")
+
+    def _migrate(self) -> None:
+        """rebuilds snapshots from older databases whose metric columns were NOT NULL"""
+        columns = self._conn.execute("PRAGMA table_info(snapshots)").fetchall()
+        if not any(name in METRICS and notnull for _, name, _, notnull, _, _ in columns):
+            return
+
+        # foreign keys are still off here, so dropping the old table keeps language rows
+        fields = ", ".join(METRICS)
+        with self._conn:
+            self._conn.execute(_SNAPSHOTS.format(table="snapshots_new"))
+            self._conn.execute(
+                f"INSERT INTO snapshots_new (id, username, day, {fields}) "
+                f"SELECT id, username, day, {fields} FROM snapshots"
+            )
+            self._conn.execute("DROP TABLE snapshots")
+            self._conn.execute("ALTER TABLE snapshots_new RENAME TO snapshots")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def record(
+        self,
+        stats: ProfileStats,
+        day: Optional[date] = None,
+        fields: Optional[Iterable[str]] = None
+    ) -> int:
+        """appends a snapshot of stats and its language sizes, returns row id
+
+        fields are the stats the run collected (FetchPlan.fields), metrics
+        outside them are stored as NULL rather than as a misleading zero
+        """
+        day = day or date.today()
+        collected = frozenset(fields) if fields is not None else None
+        values = [
+            getattr(stats, metric)
+            if collected is None or TREND_FIELDS[metric] <= collected
+            else None
+            for metric in METRICS
+        ]
+        languages = stats.languages if collected is None or "languages" in collected else []
+
+        with self._conn:
+            cursor = self._conn.execute(
+                f"INSERT INTO snapshots (username, day, {', '.join(METRICS)}) "
+                f"VALUES (?, ?, {', '.join('?' for _ in METRICS)})",
+                [stats.username, day.isoformat(), *values]
+            )
+            snapshot_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO language_sizes (snapshot_id, name, size) VALUES (?, ?, ?)",
+                [(snapshot_id, lang.name, lang.size) for lang in languages]
+            )
+        return snapshot_id
+
+    def series(
+        self,
+        username: str,
+        metric: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> List[Tuple[str, int]]:
+        """returns (day, value) pairs for a metric, latest recorded value per day
+
+        unknown metrics have no history, so they get an empty series
+        """
+        if metric not in METRICS:
+            return []
+
+        start_key = (start or date.min).isoformat()
+        end_key = (end or date.max).isoformat()
+
+        rows = self._conn.execute(
+            f"""
+            SELECT s.day, s.{metric} FROM snapshots s
+            JOIN (
+                SELECT MAX(id) AS id FROM snapshots
+                WHERE username = ? AND day BETWEEN ? AND ? AND {metric} IS NOT NULL
+                GROUP BY day
+            ) latest ON latest.id = s.id
+            ORDER BY s.day
+            """,
+            (username, start_key, end_key)
+        )
+        return [(day, value) for day, value in rows]
+
+    def language_series(
+        self,
+        username: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+    ) -> Dict[str, List[Tuple[str, int]]]:
+        """returns per-language (day, size) pairs, latest snapshot per day"""
+        start_key = (start or date.min).isoformat()
+        end_key = (end or date.max).isoformat()
+
+        rows = self._conn.execute(
+            """
+            SELECT s.day, l.name, l.size FROM snapshots s
+            JOIN (
+                SELECT MAX(id) AS id FROM snapshots
+                WHERE username = ? AND day BETWEEN ? AND ?
+                GROUP BY day
+            ) latest ON latest.id = s.id
+            JOIN language_sizes l ON l.snapshot_id = s.id
+            ORDER BY s.day
+            """,
+            (username, start_key, end_key)
+        )
+
+        series: Dict[str, List[Tuple[str, int]]] = {}
+        for day, name, size in rows:
+            series.setdefault(name, []).append((day, size))
+        return series
+
+    def compact(self, username: str, keep_daily_days: int = 90, today: Optional[date] = None) -> int:
+        """downsamples old history, returns number of snapshots removed
+
+        snapshots newer than keep_daily_days keep their latest row per day,
+        older ones are reduced to the latest row of each ISO week
+        """
+        today = today or date.today()
+        cutoff = (today - timedelta(days=keep_daily_days)).isoformat()
+
+        rows = self._conn.execute(
+            "SELECT id, day FROM snapshots WHERE username = ? ORDER BY day, id",
+            (username,)
+        ).fetchall()
+
+        keep: Dict[Tuple, int] = {}
+        for snapshot_id, day in rows:
+            if day < cutoff:
+                year, week, _ = date.fromisoformat(day).isocalendar()
+                bucket = ("w", year, week)
+            else:
+                bucket = ("d", day)
+            keep[bucket] = snapshot_id
+
+        survivors = set(keep.values())
+        doomed = [(snapshot_id,) for snapshot_id, _ in rows if snapshot_id not in survivors]
+
+        with self._conn:
+            self._conn.executemany("DELETE FROM snapshots WHERE id = ?", doomed)
+        if doomed:
+            self._vacuum_if_sparse()
+        return len(doomed)
+
+    def _vacuum_if_sparse(self) -> bool:
+        """reclaims free pages once enough of the file is unused"""
+        pages = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        free = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not pages or free / pages < VACUUM_FREE_RATIO:
+            return False
+        self._conn.execute("VACUUM")
+        return True
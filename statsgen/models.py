@@ -4,20 +4,69 @@ data models for profile statistics
 using dataclasses for clean, typed data structures
 """
 
+import sys
 from dataclasses import dataclass, field
 from typing import Dict, List, Optional
 
+from .activity import ContributionCalendar
 
-@dataclass
+# how many languages the languages card shows
+TOP_LANGUAGES = 8
+
+
+@dataclass(slots=True)
 class LanguageStats:
-    """stats for a single programming language"""
+    """stats for a single programming language
+
+    slotted and with interned name/color, so thousands of profiles share
+    one copy of every language string
+    """
     name: str
     size: int
     color: str
     percentage: float = 0.0
 
+    def __post_init__(self):
+        self.name = sys.intern(self.name)
+        self.color = sys.intern(self.color)
 
-@dataclass
+
+class LanguageList(list):
+    """list of LanguageStats that counts its own mutations
+
+    the version covers the items too, once ranked they're treated as
+    values, so a size changes by replacing the item (languages[i] = ...)
+    rather than by editing it in place
+    """
+
+    __slots__ = ("version",)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.version = 0
+
+    def __reduce__(self):
+        return (LanguageList, (list(self),))
+
+
+def _counting(method):
+    """wraps a list mutator so it bumps LanguageList.version"""
+    def wrapper(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+
+    wrapper.__name__ = method.__name__
+    return wrapper
+
+
+for _name in (
+    "append", "extend", "insert", "remove", "pop", "clear",
+    "sort", "reverse", "__setitem__", "__delitem__", "__iadd__", "__imul__",
+):
+    setattr(LanguageList, _name, _counting(getattr(list, _name)))
+
+
+@dataclass(slots=True)
 class ProfileStats:
     """aggregated profile statistics"""
     username: str
@@ -29,7 +78,32 @@ class ProfileStats:
     lines_added: int = 0
     lines_deleted: int = 0
     views: int = 0
-    languages: List[LanguageStats] = field(default_factory=list)
+    languages: List[LanguageStats] = field(default_factory=LanguageList)
+    calendar: Optional[ContributionCalendar] = None
+    # the list and version the cached ranking was built from, holding the
+    # list itself means a new list can't be mistaken for it by a reused id
+    _top_source: Optional[LanguageList] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    _top_version: int = field(default=-1, init=False, repr=False, compare=False)
+    _top_cache: List[LanguageStats] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+
+    def __getstate__(self):
+        # the top-N cache is cheap to rebuild, don't ship it to other processes
+        return {
+            name: getattr(self, name)
+            for name in self.__dataclass_fields__
+            if not name.startswith("_top")
+        }
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._top_source = None
+        self._top_version = -1
+        self._top_cache = []
 
     @property
     def lines_changed(self) -> int:
@@ -38,8 +112,30 @@ class ProfileStats:
 
     @property
     def top_languages(self) -> List[LanguageStats]:
-        """returns top 8 languages by size"""
-        return sorted(self.languages, key=lambda x: x.size, reverse=True)[:8]
+        """returns top 8 languages by size, cached until languages change"""
+        languages = self.languages
+        if not isinstance(languages, LanguageList):
+            # collectors assign plain lists, adopt them so later edits are counted
+            languages = self.languages = LanguageList(languages)
+
+        if languages is not self._top_source or languages.version != self._top_version:
+            self._top_cache = sorted(
+                languages, key=lambda x: x.size, reverse=True
+            )[:TOP_LANGUAGES]
+            self._top_source = languages
+            self._top_version = languages.version
+        return list(self._top_cache)
+
+
+@dataclass(slots=True)
+class RepoStats:
+    """per-repository numbers behind the profile totals"""
+    name: str
+    stars: int = 0
+    forks: int = 0
+    lines_added: int = 0
+    lines_deleted: int = 0
+    views: int = 0
 
 
 @dataclass
@@ -54,6 +150,11 @@ class CardConfig:
 class ProfileConfig:
     """complete profile configuration"""
     username: str
+    organization: str = ""
+    shards: int = 0
+    lines_engine: str = "api"
+    mirror_dir: str = ".statsgen/mirrors"
+    author_emails: List[str] = field(default_factory=list)
     themes: List[str] = field(default_factory=lambda: ["dark", "light"])
     max_languages: int = 8
     exclude_repos: List[str] = field(default_factory=list)
@@ -61,3 +162,7 @@ class ProfileConfig:
     exclude_forks: bool = False
     overview_card: CardConfig = field(default_factory=CardConfig)
     languages_card: CardConfig = field(default_factory=CardConfig)
+    trend_card: CardConfig = field(default_factory=lambda: CardConfig(enabled=False))
+    heatmap_card: CardConfig = field(default_factory=lambda: CardConfig(enabled=False))
+    history_path: str = ".statsgen/history.db"
+    history_keep_days: int = 90
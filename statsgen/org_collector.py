@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+organization-scale collection
+pages organization.repositories in the main process and shards the
+per-repo REST sweeps across a process pool, one event loop per worker
+"""
+
+import asyncio
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .checkpoint import read_json, write_json_atomic
+from .github_client import GitHubClient
+from .models import LanguageStats, ProfileConfig, ProfileStats
+from .processes import pool_context
+from .queries import ORG_REPOS
+from .stats_collector import CHECKPOINT_EVERY, StatsCollector
+from .streaming import ContributorStatsParser
+
+
+# every shard shares one token, so these are totals across all of them,
+# each shard's limiter starts at and grows up to its share
+ORG_CONCURRENCY = 10
+ORG_MAX_CONCURRENCY = 64
+
+
+def shard_count(shards: int, concurrency: int = ORG_CONCURRENCY) -> int:
+    """shards a run uses, 0 means one per core"""
+    # more shards than request slots would leave some with nothing to run
+    return max(1, min(shards or os.cpu_count() or 1, concurrency))
+
+
+def shard_concurrency(shards: int, concurrency: int = ORG_CONCURRENCY) -> int:
+    """request slots each of `shards` shards gets out of the total"""
+    return max(1, concurrency // shards)
+
+
+@dataclass
+class ShardJob:
+    """work unit sent to a worker process"""
+    index: int
+    repos: List[str]
+    token: Optional[str]
+    checkpoint_path: str
+    include_code_stats: bool = True
+    include_traffic: bool = True
+    max_concurrent: int = 10
+    max_limit: int = 64
+
+
+class OrgStatsCollector(StatsCollector):
+    """aggregates every repository of an organization using a process pool"""
+
+    def __init__(
+        self,
+        client: GitHubClient,
+        config: ProfileConfig,
+        organization: str,
+        shards: int = 0,
+        checkpoint_dir: str = ".statsgen/checkpoints",
+        resume: bool = False,
+        concurrency: int = ORG_CONCURRENCY,
+        max_concurrency: int = ORG_MAX_CONCURRENCY
+    ):
+        super().__init__(client, config)
+        self.organization = organization
+        self.shards = shard_count(shards, concurrency)
+        self.concurrency = concurrency
+        self.max_concurrency = max(concurrency, max_concurrency)
+        self.checkpoint_dir = Path(checkpoint_dir) / organization
+        self.resume = resume
+
+    async def collect(self) -> ProfileStats:
+        """lists the org's repos, fans the REST work out to shards and merges"""
+        stats = ProfileStats(
+            username=self.organization,
+            display_name=self.organization
+        )
+
+        phases = self.plan.phases
+        if "repos" in phases:
+            await self._collect_repos(stats)
+        if "code_stats" in phases or "traffic" in phases:
+            await self._collect_sharded(stats)
+
+        self._calculate_percentages(stats)
+
+        return stats
+
+    async def _collect_repos(self, stats: ProfileStats) -> None:
+        """pages organization.repositories, aggregating stars, forks and languages"""
+        cursor = None
+        languages_map = {}
+
+        while True:
+            result = await self.client.graphql(
+                ORG_REPOS,
+                {
+                    "login": self.organization,
+                    "cursor": cursor,
+                    "withLanguages": self.plan.include_languages,
+                }
+            )
+            org = (result.get("data") or {}).get("organization") or {}
+            stats.display_name = org.get("name") or org.get("login", self.organization)
+
+            repos = org.get("repositories", {})
+            for repo in repos.get("nodes", []):
+                if repo and self.config.exclude_forks and repo.get("isFork"):
+                    continue
+                self._add_repo(stats, repo, languages_map)
+
+            page_info = repos.get("pageInfo", {})
+            if not page_info.get("hasNextPage", False):
+                break
+            cursor = page_info.get("endCursor", cursor)
+
+        stats.repos_count = len(self._repos)
+        stats.languages = list(languages_map.values())
+
+    async def _collect_sharded(self, stats: ProfileStats) -> None:
+        """runs one collector per shard in its own process and merges the parts"""
+        jobs = self._shard_jobs()
+        if not jobs:
+            return
+
+        if not self.resume:
+            # a fresh run must not pick up results left by an older one
+            for job in jobs:
+                Path(job.checkpoint_path).unlink(missing_ok=True)
+
+        print(
+            f"collecting {len(self._repos)} repos across {len(jobs)} shards "
+            f"({jobs[0].max_concurrent} concurrent requests each)"
+        )
+
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=len(jobs), mp_context=pool_context()) as pool:
+            parts = await asyncio.gather(
+                *(loop.run_in_executor(pool, run_shard, job) for job in jobs)
+            )
+
+        for part in parts:
+            merge_stats(stats, part)
+
+        # every shard finished, the checkpoints are no longer needed
+        for job in jobs:
+            Path(job.checkpoint_path).unlink(missing_ok=True)
+
+    def _shard_jobs(self) -> List[ShardJob]:
+        """one job per non-empty shard, each with its share of the request budget"""
+        shards = [(index, repos) for index, repos in enumerate(self._shard_repos()) if repos]
+        return [
+            ShardJob(
+                index=index,
+                repos=repos,
+                token=self.client.token,
+                checkpoint_path=str(self._checkpoint_path(index)),
+                include_code_stats=self.plan.needs("lines_changed"),
+                include_traffic=self.plan.needs("views"),
+                max_concurrent=shard_concurrency(len(shards), self.concurrency),
+                max_limit=shard_concurrency(len(shards), self.max_concurrency),
+            )
+            for index, repos in shards
+        ]
+
+    def _shard_repos(self) -> List[List[str]]:
+        """assigns repos to shards by a stable hash so resumes hit the same shard"""
+        shards: List[List[str]] = [[] for _ in range(self.shards)]
+        for name in sorted(self._repos):
+            shards[zlib.crc32(name.encode("utf-8")) % self.shards].append(name)
+        return shards
+
+    def _checkpoint_path(self, index: int) -> Path:
+        return self.checkpoint_dir / f"shard-{index}-of-{self.shards}.json"
+
+
+def merge_stats(stats: ProfileStats, part: ProfileStats) -> None:
+    """adds a partial result into stats, merging languages by name"""
+    stats.stars += part.stars
+    stats.forks += part.forks
+    stats.contributions += part.contributions
+    stats.lines_added += part.lines_added
+    stats.lines_deleted += part.lines_deleted
+    stats.views += part.views
+
+    languages: Dict[str, LanguageStats] = {lang.name: lang for lang in stats.languages}
+    for lang in part.languages:
+        if lang.name in languages:
+            languages[lang.name].size += lang.size
+        else:
+            languages[lang.name] = LanguageStats(name=lang.name, size=lang.size, color=lang.color)
+    stats.languages = list(languages.values())
+
+
+def run_shard(job: ShardJob) -> ProfileStats:
+    """process pool entry point, runs the shard on a fresh event loop"""
+    return asyncio.run(_collect_shard(job))
+
+
+async def _collect_shard(job: ShardJob) -> ProfileStats:
+    """sums lines changed and views for the shard's repos, checkpointing as it goes"""
+    checkpoint_path = Path(job.checkpoint_path)
+    done: Dict[str, List[int]] = (read_json(checkpoint_path) or {}).get("repos", {})
+    pending = [repo for repo in job.repos if repo not in done]
+    unsaved = 0
+
+    async def collect_repo(client: GitHubClient, repo: str) -> None:
+        nonlocal unsaved
+
+        # org totals count every contributor, not a single author
+        parser = ContributorStatsParser(None)
+        if job.include_code_stats:
+            await client.rest_stream(f"/repos/{repo}/stats/contributors", parser)
+
+        views = 0
+        if job.include_traffic:
+            result = await client.rest(f"/repos/{repo}/traffic/views")
+            if isinstance(result, dict):
+                views = sum(view.get("count", 0) for view in result.get("views", []))
+
+        done[repo] = [parser.additions, parser.deletions, views]
+        unsaved += 1
+        if unsaved >= CHECKPOINT_EVERY:
+            write_json_atomic(checkpoint_path, {"repos": done})
+            unsaved = 0
+
+    try:
+        async with GitHubClient(
+            token=job.token,
+            max_concurrent=job.max_concurrent,
+            max_limit=job.max_limit
+        ) as client:
+            await asyncio.gather(*(collect_repo(client, repo) for repo in pending))
+    finally:
+        if unsaved:
+            write_json_atomic(checkpoint_path, {"repos": done})
+
+    part = ProfileStats(username="", display_name="")
+    for repo in job.repos:
+        if repo not in done:
+            continue
+        added, deleted, views = done[repo]
+        part.lines_added += added
+        part.lines_deleted += deleted
+        part.views += views
+    return part
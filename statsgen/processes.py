@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+"""
+process start-up for the worker pools
+pools are created after the aiohttp session, its connector and executor
+threads are live, forking then copies locks other threads may be holding,
+so workers start from a clean forkserver (or spawn where there is none)
+"""
+
+import multiprocessing
+from multiprocessing.context import BaseContext
+
+
+def pool_context() -> BaseContext:
+    """multiprocessing context for ProcessPoolExecutor(mp_context=...)"""
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
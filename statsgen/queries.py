@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+static GraphQL queries used by the collectors
+everything that changes between requests (cursors, years, page sizes)
+is passed as variables, so each query text is built once at import and
+can be hashed for response caching
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import List
+
+
+REPO_FIELDS = """
+fragment LanguageEdges on LanguageConnection {
+  edges { size node { name color } }
+}
+
+fragment RepoFields on Repository {
+  nameWithOwner
+  isFork
+  stargazerCount
+  forkCount
+  languages(first: 10, orderBy: {field: SIZE, direction: DESC}) @include(if: $withLanguages) {
+    ...LanguageEdges
+  }
+}
+"""
+
+RATE_LIMIT_FIELDS = """
+fragment RateLimitFields on RateLimit {
+  cost
+  limit
+  remaining
+  resetAt
+}
+"""
+
+
+@dataclass(frozen=True)
+class Query:
+    """a named GraphQL document with a stable digest"""
+    name: str
+    text: str
+    digest: str = field(init=False, compare=False)
+
+    def __post_init__(self):
+        text = " ".join(self.text.split())
+        object.__setattr__(self, "text", text)
+        object.__setattr__(self, "digest", hashlib.sha256(text.encode("utf-8")).hexdigest())
+
+    def __str__(self) -> str:
+        return self.text
+
+
+VIEWER_REPOS = Query("ViewerRepos", """
+query ViewerRepos(
+  $ownedCursor: String,
+  $contribCursor: String,
+  $pageSize: Int = 100,
+  $withLanguages: Boolean = true
+) {
+  viewer {
+    login
+    name
+    repositories(first: $pageSize, orderBy: {field: UPDATED_AT, direction: DESC}, isFork: false, after: $ownedCursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes { ...RepoFields }
+    }
+    repositoriesContributedTo(first: $pageSize, includeUserRepositories: false, orderBy: {field: UPDATED_AT, direction: DESC}, contributionTypes: [COMMIT, PULL_REQUEST, REPOSITORY, PULL_REQUEST_REVIEW], after: $contribCursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes { ...RepoFields }
+    }
+  }
+}
+""" + REPO_FIELDS)
+
+ORG_REPOS = Query("OrgRepos", """
+query OrgRepos(
+  $login: String!,
+  $cursor: String,
+  $pageSize: Int = 100,
+  $withLanguages: Boolean = true
+) {
+  organization(login: $login) {
+    login
+    name
+    repositories(first: $pageSize, after: $cursor, orderBy: {field: UPDATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes { ...RepoFields }
+    }
+  }
+}
+""" + REPO_FIELDS)
+
+CONTRIBUTION_YEARS = Query("ContributionYears", """
+query ContributionYears {
+  viewer { login name contributionsCollection { contributionYears } }
+}
+""")
+
+# calendars of a few years share one request, each year is an aliased
+# contributionsCollection (y0, y1, ...) that a partial batch switches off
+YEARS_PER_QUERY = 4
+
+YEARLY_CONTRIBUTIONS = Query("YearlyContributions", """
+query YearlyContributions($withDays: Boolean = false, %s) {
+  viewer {
+    %s
+  }
+}
+fragment YearFields on ContributionsCollection {
+  contributionCalendar {
+    totalContributions
+    weeks @include(if: $withDays) {
+      contributionDays { date contributionCount }
+    }
+  }
+}
+""" % (
+    ", ".join(
+        f"$from{i}: DateTime, $to{i}: DateTime, $has{i}: Boolean = false"
+        for i in range(YEARS_PER_QUERY)
+    ),
+    " ".join(
+        f"y{i}: contributionsCollection(from: $from{i}, to: $to{i}) "
+        f"@include(if: $has{i}) {{ ...YearFields }}"
+        for i in range(YEARS_PER_QUERY)
+    ),
+))
+
+VIEWER_PLAN = Query("ViewerPlan", """
+query ViewerPlan {
+  viewer {
+    login
+    repositories(isFork: false) { totalCount }
+    repositoriesContributedTo(includeUserRepositories: false, contributionTypes: [COMMIT, PULL_REQUEST, REPOSITORY, PULL_REQUEST_REVIEW]) { totalCount }
+    contributionsCollection { contributionYears }
+  }
+  rateLimit { ...RateLimitFields }
+}
+""" + RATE_LIMIT_FIELDS)
+
+ORG_PLAN = Query("OrgPlan", """
+query OrgPlan($login: String!) {
+  organization(login: $login) {
+    repositories { totalCount }
+  }
+  rateLimit { ...RateLimitFields }
+}
+""" + RATE_LIMIT_FIELDS)
+
+FINGERPRINT = Query("Fingerprint", """
+query Fingerprint(
+  $ownedCursor: String,
+  $contribCursor: String,
+  $from: DateTime!,
+  $to: DateTime!,
+  $withContributions: Boolean = true
+) {
+  viewer {
+    repositories(first: 100, isFork: false, after: $ownedCursor) {
+      totalCount
+      pageInfo { hasNextPage endCursor }
+      nodes { ...ProbeFields }
+    }
+    repositoriesContributedTo(first: 100, includeUserRepositories: false, contributionTypes: [COMMIT, PULL_REQUEST, REPOSITORY, PULL_REQUEST_REVIEW], after: $contribCursor) {
+      totalCount
+      pageInfo { hasNextPage endCursor }
+      nodes { ...ProbeFields }
+    }
+    contributionsCollection(from: $from, to: $to) @include(if: $withContributions) {
+      contributionCalendar { totalContributions }
+    }
+  }
+}
+
+fragment ProbeFields on Repository {
+  nameWithOwner
+  pushedAt
+  stargazerCount
+  forkCount
+}
+""")
+
+
+def year_range(year: int) -> dict:
+    """from/to variables covering one calendar year"""
+    return {
+        "from": f"{year}-01-01T00:00:00Z",
+        "to": f"{year + 1}-01-01T00:00:00Z",
+    }
+
+
+def year_batches(years: List[int]) -> List[dict]:
+    """variables for YEARLY_CONTRIBUTIONS, one dict per batch of years"""
+    batches = []
+    for start in range(0, len(years), YEARS_PER_QUERY):
+        variables = {}
+        for slot, year in enumerate(years[start:start + YEARS_PER_QUERY]):
+            window = year_range(year)
+            variables[f"from{slot}"] = window["from"]
+            variables[f"to{slot}"] = window["to"]
+            variables[f"has{slot}"] = True
+        batches.append(variables)
+    return batches
@@ -4,15 +4,28 @@ main runner that orchestrates the entire card generation process
 """
 
 import asyncio
+import os
 import sys
+import tempfile
+from datetime import date, timedelta
 from pathlib import Path
-from typing import List, Optional
+from typing import FrozenSet, List, Optional, Tuple
 
-from .config_loader import ConfigLoader
+from .concurrency import format_history
+from .deadline import Deadline, describe_stale
+from .config_loader import ConfigError, ConfigLoader
 from .github_client import GitHubClient
 from .stats_collector import StatsCollector
-from .card_renderer import CardRenderer
-from .models import ProfileConfig
+from .org_collector import OrgStatsCollector
+from .checkpoint import CollectorCheckpoint
+from .cost_estimator import CostEstimator
+from .fetch_plan import FetchPlan
+from .fingerprint import Fingerprint, load_fingerprint, probe, save_fingerprint
+from .history import HistoryStore
+from .models import ProfileConfig, ProfileStats
+from .render_pool import RenderPool, card_jobs
+from .snapshot import Snapshot, load_snapshot, save_snapshot
+from .transport import Cassette, RecordingTransport, ReplayTransport
 
 
 class ProfileCardsRunner:
@@ -23,74 +36,333 @@ class ProfileCardsRunner:
         config_path: str = ".github/config/profile.yml",
         output_dir: str = "cards",
         theme: str = "all",
-        dry_run: bool = False
+        dry_run: bool = False,
+        organization: Optional[str] = None,
+        shards: Optional[int] = None,
+        resume: bool = False,
+        checkpoint_dir: str = ".statsgen/checkpoints",
+        snapshot_path: str = ".statsgen/snapshot.json",
+        fingerprint_path: str = ".statsgen/fingerprint.json",
+        force: bool = False,
+        deadline: Optional[float] = None,
+        record: Optional[str] = None,
+        replay: Optional[str] = None,
+        time_scale: float = 1.0,
+        render_workers: int = 0
     ):
         self.config_path = config_path
         self.output_dir = output_dir
         self.theme = theme
         self.dry_run = dry_run
+        self.organization = organization
+        self.shards = shards
+        self.resume = resume
+        self.checkpoint_dir = checkpoint_dir
+        self.snapshot_path = snapshot_path
+        self.fingerprint_path = fingerprint_path
+        self.force = force
+        self.deadline = deadline
+        self.record = record
+        self.replay = replay
+        self.time_scale = time_scale
+        self.render_workers = render_workers
 
     async def run(self) -> bool:
         """executes the full generation pipeline"""
         print("statsgen - Profile Cards Generator")
         print("=" * 40)
 
-        config = self._load_config()
+        if self.record and self.replay:
+            print("error: --record and --replay can't be used together")
+            return False
+
+        try:
+            config = self._load_config()
+        except ConfigError as e:
+            print(f"error: invalid configuration\n{e}")
+            return False
         if not config.username:
             print("error: no username found in config or environment")
             return False
 
-        print(f"generating cards for: {config.username}")
+        if self.organization is not None:
+            config.organization = self.organization
+        if self.shards is not None:
+            config.shards = self.shards
+
+        print(f"generating cards for: {config.organization or config.username}")
 
         themes = self._resolve_themes(config)
         print(f"themes: {', '.join(themes)}")
 
+        plan = FetchPlan.from_config(config)
+        print(f"phases: {', '.join(plan.phases) or 'none'}")
+        wants_contributions = config.heatmap_card.enabled or (
+            config.overview_card.enabled
+            and config.overview_card.options.get("show_contributions", True)
+        )
+        if config.organization and wants_contributions:
+            print("note: organizations have no contribution calendar, contributions are left off the cards")
+
+        card_paths = self._card_paths(config, themes)
+
         if self.dry_run:
             print("\n[dry run] would generate:")
-            for t in themes:
-                print(f"  - {self.output_dir}/overview{'-' + t if t != 'dark' else ''}.svg")
-                print(f"  - {self.output_dir}/languages{'-' + t if t != 'dark' else ''}.svg")
+            for path in card_paths:
+                print(f"  - {path}")
+            await self._print_plan(config)
             return True
 
-        async with GitHubClient() as client:
-            collector = StatsCollector(client, config)
+        if not (self.record or self.replay):
+            return await self._generate(config, themes, plan, card_paths)
+
+        # cassette runs must neither read nor advance the real run's state:
+        # snapshot, fingerprint, checkpoints and history live in a scratch
+        # directory, so every cassette run is a full collection
+        if config.organization:
+            print("error: organization shards use their own clients, --record and --replay cover single profiles")
+            return False
+        if config.lines_engine == "git":
+            print("note: git mirrors aren't recorded, lines changed come from the API")
+            config.lines_engine = "api"
+        with tempfile.TemporaryDirectory(prefix="statsgen-cassette-") as state:
+            self.checkpoint_dir = os.path.join(state, "checkpoints")
+            self.snapshot_path = os.path.join(state, "snapshot.json")
+            self.fingerprint_path = os.path.join(state, "fingerprint.json")
+            config.history_path = os.path.join(state, "history.db")
+            return await self._generate(config, themes, plan, card_paths)
 
-            print("\nfetching stats from GitHub...")
-            stats = await collector.collect()
+    async def _generate(
+        self,
+        config: ProfileConfig,
+        themes: List[str],
+        plan: FetchPlan,
+        card_paths: List[Path]
+    ) -> bool:
+        """probes, collects and renders, or stops early when nothing changed"""
+        # started before the probe, so the probe's time counts too
+        deadline = Deadline(self.deadline) if self.deadline else None
 
-            print(f"\nprofile: {stats.display_name}")
-            print(f"stars: {stats.stars:,}")
-            print(f"forks: {stats.forks:,}")
-            print(f"contributions: {stats.contributions:,}")
-            print(f"repos: {stats.repos_count}")
-            print(f"lines changed: {stats.lines_changed:,}")
-            print(f"views (14 days): {stats.views:,}")
-            print(f"languages: {len(stats.languages)}")
+        async with self._client() as client:
+            checkpoint = CollectorCheckpoint(
+                f"{self.checkpoint_dir}/{config.username}.json"
+            )
 
-            renderer = CardRenderer(output_dir=self.output_dir)
+            if config.organization:
+                collector = OrgStatsCollector(
+                    client,
+                    config,
+                    config.organization,
+                    shards=config.shards,
+                    checkpoint_dir=self.checkpoint_dir,
+                    resume=self.resume
+                )
+                if self.deadline:
+                    print("note: --deadline isn't applied to sharded organization runs")
+            else:
+                if self.resume and checkpoint.load(config.username):
+                    done = ", ".join(checkpoint.state.get("phases_done", [])) or "none"
+                    print(f"resuming from checkpoint (finished phases: {done})")
+                    fingerprint = None
+                elif self.record or self.replay:
+                    # the probe's query covers the current year, a cassette
+                    # recorded in an earlier one couldn't answer it
+                    fingerprint = None
+                else:
+                    fingerprint = await self._probe(client, config, plan, deadline)
 
-            print("\ngenerating cards...")
-            for t in themes:
-                suffix = f"-{t}" if t != "dark" else ""
+                snapshot = load_snapshot(self.snapshot_path)
+                collector = StatsCollector(
+                    client,
+                    config,
+                    checkpoint=checkpoint,
+                    plan=plan,
+                    deadline=deadline,
+                    fallback=snapshot
+                )
+                missing = any(not path.exists() for path in card_paths)
+                if (
+                    fingerprint is not None
+                    and not missing
+                    and not self._narrow(collector, fingerprint, snapshot)
+                ):
+                    print("\nnothing changed since the last run, cards are up to date")
+                    # the trend still gets today's point, carried over from the snapshot
+                    self._record_history(config, snapshot.stats, plan.fields)
+                    return True
 
-                overview = renderer.render_overview(stats, t)
-                overview_path = renderer.save(overview, f"overview{suffix}.svg")
-                print(f"  created: {overview_path}")
+            render_pool = RenderPool(
+                output_dir=self.output_dir,
+                workers=max(1, min(self.render_workers or os.cpu_count() or 1, len(card_paths))),
+                expected_jobs=len(card_paths)
+            )
+            # the workers spawn and compile templates while collection waits on the network
+            with render_pool:
+                print("\nfetching stats from GitHub...")
+                stats = await collector.collect()
+                checkpoint.clear()
 
-                languages = renderer.render_languages(stats, t)
-                lang_path = renderer.save(languages, f"languages{suffix}.svg")
-                print(f"  created: {lang_path}")
+                # the webhook receiver applies deltas on top of this, org runs
+                # keep their per-repo code stats in the shards so they're skipped
+                if not config.organization:
+                    save_snapshot(self.snapshot_path, Snapshot(stats, collector.repo_stats()))
+                    # a stale run must not look up to date to the next probe
+                    if fingerprint is not None and not collector.stale:
+                        save_fingerprint(self.fingerprint_path, fingerprint)
+
+                print(f"\nprofile: {stats.display_name}")
+                print(f"stars: {stats.stars:,}")
+                print(f"forks: {stats.forks:,}")
+                print(f"contributions: {stats.contributions:,}")
+                print(f"repos: {stats.repos_count}")
+                print(f"lines changed: {stats.lines_changed:,}")
+                print(f"views (14 days): {stats.views:,}")
+                print(f"languages: {len(stats.languages)}")
+                if collector.stale:
+                    taken_at = collector.fallback.taken_at if collector.fallback else None
+                    print(describe_stale(collector.stale, stats.repos_count, taken_at))
+
+                metrics = client.concurrency_metrics()
+                print(
+                    f"concurrency: limit {metrics['limit']} after {metrics['requests']} requests "
+                    f"({metrics['throttled']} throttled, {metrics['decreases']} cuts)"
+                )
+                if metrics["decreases"]:
+                    print(f"  limit history: {format_history(metrics['history'])}")
+
+                flights = client.coalescing_metrics()
+                if flights["coalesced"]:
+                    print(
+                        f"coalesced: {flights['coalesced']} of {flights['calls']} calls "
+                        f"({flights['hit_rate']:.0%}) shared an in-flight request"
+                    )
+
+                series = self._record_history(config, stats, plan.fields)
+
+                print("\ngenerating cards...")
+                report = await render_pool.render(card_jobs(config, stats, series, themes))
+                for path in sorted(report.paths):
+                    print(f"  created: {path}")
+                print(report.summary())
 
         print("\n" + "=" * 40)
         print("done! cards are ready in the output folder")
 
         return True
 
+    async def _probe(
+        self,
+        client: GitHubClient,
+        config: ProfileConfig,
+        plan: FetchPlan,
+        deadline: Optional[Deadline]
+    ) -> Optional[Fingerprint]:
+        """the current fingerprint, None if the probe didn't fit its share of the deadline"""
+        if deadline is None:
+            return await probe(client, config)
+
+        budget = deadline.start_phase("probe", ("probe",) + plan.phases)
+        try:
+            return await asyncio.wait_for(probe(client, config), budget)
+        except asyncio.TimeoutError:
+            print(f"fingerprint probe ran out of time after {budget:.1f}s, collecting everything")
+            return None
+
+    def _narrow(
+        self,
+        collector: StatsCollector,
+        fingerprint: Fingerprint,
+        snapshot: Optional[Snapshot]
+    ) -> bool:
+        """compares against the last run's fingerprint, returns False if nothing changed
+
+        when only some stats may have moved, the collector's plan is cut
+        down to those (plus views, which age out daily) and the rest is
+        taken from the last snapshot
+        """
+        previous = load_fingerprint(self.fingerprint_path)
+        if self.force or previous is None or snapshot is None:
+            return True
+
+        plan = collector.plan
+        stale = fingerprint.stale_fields(previous) & plan.fields
+        # views are a rolling window the fingerprint can't see, they always refresh
+        if not stale and not plan.needs("views"):
+            return False
+
+        narrowed = plan.narrow(stale)
+        collector.plan = narrowed
+        collector.reuse(snapshot, plan.fields - narrowed.fields)
+        print(f"changed since last run: {', '.join(sorted(stale)) or 'nothing, refreshing views only'}")
+        print(f"refreshing phases: {', '.join(narrowed.phases) or 'none'}")
+        return True
+
+    async def _print_plan(self, config: ProfileConfig) -> None:
+        """estimates API usage and wall time of a full run"""
+        async with self._client() as client:
+            if not client.token:
+                print("\n[dry run] no token set, skipping cost estimate")
+                return
+
+            estimate = await CostEstimator(client, config).estimate()
+
+        print("\n[dry run] estimated cost of a full run:")
+        for line in estimate.summary():
+            print(f"  {line}")
+
+    def _client(self) -> GitHubClient:
+        """API client, recording to or replaying from a cassette when asked"""
+        if self.replay:
+            print(f"replaying API responses from {self.replay}")
+            return GitHubClient(transport=ReplayTransport(Cassette.load(self.replay), self.time_scale))
+        if self.record:
+            print(f"recording API responses to {self.record}")
+            return GitHubClient(transport=RecordingTransport(self.record))
+        return GitHubClient()
+
     def _load_config(self) -> ProfileConfig:
         """loads configuration from file or environment"""
         loader = ConfigLoader(self.config_path)
         return loader.load()
 
+    def _record_history(
+        self,
+        config: ProfileConfig,
+        stats: ProfileStats,
+        fields: FrozenSet[str]
+    ) -> List[Tuple[str, int]]:
+        """appends this run to the history store and returns the trend series"""
+        metric = config.trend_card.options.get("metric", "stars")
+        days = config.trend_card.options.get("days", 90)
+
+        with HistoryStore(config.history_path) as history:
+            history.record(stats, fields=fields)
+            removed = history.compact(stats.username, config.history_keep_days)
+            if removed:
+                print(f"history: compacted {removed} old snapshots")
+
+            if not config.trend_card.enabled:
+                return []
+            start = date.today() - timedelta(days=days)
+            return history.series(stats.username, metric, start=start)
+
+    def _card_paths(self, config: ProfileConfig, themes: List[str]) -> List[Path]:
+        """output files of every enabled card"""
+        cards = [
+            name for name, card in (
+                ("overview", config.overview_card),
+                ("languages", config.languages_card),
+                ("trend", config.trend_card),
+                ("heatmap", config.heatmap_card),
+            )
+            if card.enabled
+        ]
+        return [
+            Path(self.output_dir) / f"{name}{'-' + t if t != 'dark' else ''}.svg"
+            for t in themes
+            for name in cards
+        ]
+
     def _resolve_themes(self, config: ProfileConfig) -> List[str]:
         """determines which themes to generate"""
         if self.theme == "all":
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+last collected stats kept on disk
+the snapshot holds the profile totals plus the per-repo numbers behind
+them, so later runs can apply deltas instead of collecting from scratch
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional
+
+from .checkpoint import read_json, write_json_atomic
+from .activity import ContributionCalendar
+from .models import LanguageStats, ProfileStats, RepoStats
+
+
+SNAPSHOT_VERSION = 1
+
+
+@dataclass
+class Snapshot:
+    """profile totals and per-repo breakdown from one collection"""
+    stats: ProfileStats
+    repos: Dict[str, RepoStats] = field(default_factory=dict)
+    taken_at: str = ""
+
+
+def save_snapshot(path: str, snapshot: Snapshot) -> None:
+    """writes the snapshot as JSON, replacing the previous one atomically"""
+    stats = snapshot.stats
+    write_json_atomic(Path(path), {
+        "version": SNAPSHOT_VERSION,
+        "taken_at": snapshot.taken_at or datetime.now(timezone.utc).isoformat(),
+        "stats": {
+            "username": stats.username,
+            "display_name": stats.display_name,
+            "stars": stats.stars,
+            "forks": stats.forks,
+            "contributions": stats.contributions,
+            "repos_count": stats.repos_count,
+            "lines_added": stats.lines_added,
+            "lines_deleted": stats.lines_deleted,
+            "views": stats.views,
+            "languages": [
+                [lang.name, lang.size, lang.color, lang.percentage]
+                for lang in stats.languages
+            ],
+            "calendar": stats.calendar.to_json() if stats.calendar else None,
+        },
+        "repos": {
+            name: [repo.stars, repo.forks, repo.lines_added, repo.lines_deleted, repo.views]
+            for name, repo in snapshot.repos.items()
+        },
+    })
+
+
+def load_snapshot(path: str) -> Optional[Snapshot]:
+    """reads a snapshot, returns None when missing or from another version"""
+    data = read_json(Path(path))
+    if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+        return None
+
+    raw = data.get("stats", {})
+    stats = ProfileStats(
+        username=raw.get("username", ""),
+        display_name=raw.get("display_name", ""),
+        stars=raw.get("stars", 0),
+        forks=raw.get("forks", 0),
+        contributions=raw.get("contributions", 0),
+        repos_count=raw.get("repos_count", 0),
+        lines_added=raw.get("lines_added", 0),
+        lines_deleted=raw.get("lines_deleted", 0),
+        views=raw.get("views", 0),
+        languages=[
+            LanguageStats(name=name, size=size, color=color, percentage=percentage)
+            for name, size, color, percentage in raw.get("languages", [])
+        ],
+        calendar=ContributionCalendar.from_json(raw.get("calendar")),
+    )
+    repos = {
+        name: RepoStats(name, *values)
+        for name, values in data.get("repos", {}).items()
+    }
+    return Snapshot(stats=stats, repos=repos, taken_at=data.get("taken_at", ""))
@@ -4,87 +4,221 @@ collects GitHub profile statistics using the API client
 aggregates data from repos, contributions, and traffic
 """
 
-from typing import List, Optional, Set
+import asyncio
+import itertools
+from typing import Awaitable, Callable, Dict, FrozenSet, Iterable, List, Optional, Set
 
 from .github_client import GitHubClient
-from .models import ProfileStats, LanguageStats, ProfileConfig
+from .activity import ContributionCalendar
+from .models import ProfileStats, LanguageStats, ProfileConfig, RepoStats
 from .colors import get_color
+from .streaming import ContributorStatsParser
+from .git_mirror import MirrorEngine
+from .checkpoint import CollectorCheckpoint
+from .deadline import TIMED_OUT, Deadline
+from .fetch_plan import FetchPlan
+from .snapshot import Snapshot
+from .queries import (
+    CONTRIBUTION_YEARS, VIEWER_REPOS, YEARLY_CONTRIBUTIONS, YEARS_PER_QUERY, year_batches
+)
+
+
+# how many per-repo REST results are collected between checkpoint writes
+CHECKPOINT_EVERY = 25
 
 
 class StatsCollector:
     """fetches and aggregates GitHub profile statistics"""
 
-    def __init__(self, client: GitHubClient, config: ProfileConfig):
+    def __init__(
+        self,
+        client: GitHubClient,
+        config: ProfileConfig,
+        checkpoint: Optional[CollectorCheckpoint] = None,
+        plan: Optional[FetchPlan] = None,
+        deadline: Optional[Deadline] = None,
+        fallback: Optional[Snapshot] = None
+    ):
         self.client = client
         self.config = config
+        self.checkpoint = checkpoint
+        self.plan = plan or FetchPlan.from_config(config)
+        self.deadline = deadline
+        self.fallback = fallback
+        # figure -> repos filled from the fallback snapshot (0 = the whole figure)
+        self.stale: Dict[str, int] = {}
         self._repos: Set[str] = set()
+        self._repo_counts: Dict[str, List[int]] = {}
+        self._languages: Dict[str, LanguageStats] = {}
+        self._cursors: Dict[str, Optional[str]] = {"owned": None, "contrib": None}
+        self._code_stats: Dict[str, List[int]] = {}
+        self._traffic: Dict[str, int] = {}
+        self._phases_done: Set[str] = set()
+        self._reused_contributions = 0
+        self._reused_calendar: Optional[ContributionCalendar] = None
 
     async def collect(self) -> ProfileStats:
-        """fetches all stats and returns aggregated ProfileStats"""
+        """fetches all stats and returns aggregated ProfileStats
+
+        with a checkpoint attached, progress is saved after every page and
+        every few repos, and a loaded checkpoint skips work already done,
+        with a deadline, whatever doesn't finish in time comes from the
+        fallback snapshot and is listed in self.stale
+        """
         stats = ProfileStats(
             username=self.config.username,
             display_name=self.config.username
         )
+        stats.contributions = self._reused_contributions
+        stats.calendar = self._reused_calendar
+        self._restore_checkpoint(stats)
+
+        timed_out: Set[str] = set()
+        try:
+            pending = [phase for phase in self.plan.phases if phase not in self._phases_done]
+            for index, phase in enumerate(pending):
+                if not await self._run_phase(phase, stats, pending[index:]):
+                    timed_out.add(phase)
+                    if phase == "repos":
+                        # later phases walk the repo list, complete it first
+                        self._fill_repos(stats)
+                    continue
+                self._phases_done.add(phase)
+                self._save_checkpoint(stats)
+        except BaseException:
+            # rate limits, timeouts and cancellation all keep what we have
+            self._save_checkpoint(stats)
+            raise
+
+        if self.deadline is not None:
+            self._fill_gaps(stats, timed_out)
 
-        await self._collect_repos(stats)
-        await self._collect_contributions(stats)
-        await self._collect_code_stats(stats)
-        await self._collect_traffic(stats)
+        stats.repos_count = len(self._repos)
+        stats.languages = list(self._languages.values())
+        stats.lines_added = sum(added for added, _ in self._code_stats.values())
+        stats.lines_deleted = sum(deleted for _, deleted in self._code_stats.values())
+        stats.views = sum(self._traffic.values())
 
         self._calculate_percentages(stats)
 
         return stats
 
+    async def _run_phase(self, phase: str, stats: ProfileStats, pending: List[str]) -> bool:
+        """runs one phase within its slice of the deadline, False if it was cut off"""
+        collect = getattr(self, f"_collect_{phase}")(stats)
+        if self.deadline is None:
+            await collect
+            return True
+
+        budget = self.deadline.start_phase(phase, pending)
+        try:
+            await asyncio.wait_for(collect, budget)
+            return True
+        except asyncio.TimeoutError:
+            print(f"  {phase} ran out of time after {budget:.1f}s")
+            return False
+
+    async def _request(self, awaitable):
+        """awaits one per-repo request, within its time slice when there's a deadline"""
+        if self.deadline is None:
+            return await awaitable
+        return await self.deadline.run(awaitable)
+
+    async def _sweep(self, repos: Iterable[str], fetch: Callable[[str], Awaitable[None]]) -> None:
+        """runs fetch for every repo, keeping as many outstanding as the limiter admits
+
+        a request's deadline slice starts as soon as it's created, so repos
+        are started only when a slot is free rather than queued all at once,
+        the limit is read again after every completion as it adapts
+        """
+        pending = iter(repos)
+        running: Set[asyncio.Task] = set()
+        try:
+            while True:
+                room = self.client.limiter.limit - len(running)
+                for repo in itertools.islice(pending, max(0, room)):
+                    running.add(asyncio.ensure_future(fetch(repo)))
+                if not running:
+                    return
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+        except BaseException:
+            for task in running:
+                task.cancel()
+            raise
+
+    def _fill_repos(self, stats: ProfileStats) -> None:
+        """adds repos the listing didn't reach from the fallback snapshot"""
+        self.stale["repos"] = 0
+        if self.fallback is None:
+            return
+
+        for name, repo in self.fallback.repos.items():
+            if name in self._repos:
+                continue
+            self._repos.add(name)
+            self._repo_counts[name] = [repo.stars, repo.forks]
+            stats.stars += repo.stars
+            stats.forks += repo.forks
+
+        # language sizes aren't kept per repo, so take the previous totals
+        self._languages = {
+            lang.name: LanguageStats(name=lang.name, size=lang.size, color=lang.color)
+            for lang in self.fallback.stats.languages
+        }
+
+    def _fill_gaps(self, stats: ProfileStats, timed_out: Set[str]) -> None:
+        """fills figures the deadline cut short with the fallback snapshot's values"""
+        previous = self.fallback.repos if self.fallback else {}
+
+        if "contributions" in timed_out:
+            self.stale["contributions"] = 0
+            if self.fallback is not None:
+                stats.contributions = self.fallback.stats.contributions
+                stats.calendar = self.fallback.stats.calendar
+
+        per_repo = (
+            ("code_stats", "lines_changed", self._code_stats,
+             lambda repo: [repo.lines_added, repo.lines_deleted]),
+            ("traffic", "views", self._traffic, lambda repo: repo.views),
+        )
+        for phase, name, table, value in per_repo:
+            if phase not in self.plan.phases:
+                continue
+            missing = [repo for repo in self._repos if repo not in table]
+            if not missing:
+                continue
+            self.stale[name] = len(missing)
+            for repo in missing:
+                if repo in previous:
+                    table[repo] = value(previous[repo])
+
     async def _collect_repos(self, stats: ProfileStats) -> None:
         """fetches repository data including stars, forks, and languages"""
-        owned_cursor = None
-        contrib_cursor = None
-        languages_map = {}
+        owned_cursor = self._cursors["owned"]
+        contrib_cursor = self._cursors["contrib"]
+        languages_map = self._languages
 
         while True:
-            query = self._build_repos_query(owned_cursor, contrib_cursor)
-            result = await self.client.graphql(query)
+            result = await self.client.graphql(VIEWER_REPOS, {
+                "ownedCursor": owned_cursor,
+                "contribCursor": contrib_cursor,
+                "withLanguages": self.plan.include_languages,
+            })
             viewer = result.get("data", {}).get("viewer", {})
-
-            if not stats.display_name or stats.display_name == self.config.username:
-                stats.display_name = viewer.get("name") or viewer.get("login", self.config.username)
+            self._set_display_name(stats, viewer)
 
             owned = viewer.get("repositories", {})
             contrib = viewer.get("repositoriesContributedTo", {})
 
-            repos = owned.get("nodes", [])
+            # the response may be shared with coalesced callers, don't extend it in place
+            repos = list(owned.get("nodes", []))
             if not self.config.exclude_forks:
                 repos += contrib.get("nodes", [])
 
             for repo in repos:
-                if not repo:
-                    continue
-
-                name = repo.get("nameWithOwner")
-                if name in self._repos or name in self.config.exclude_repos:
-                    continue
-
-                self._repos.add(name)
-                stats.stars += repo.get("stargazerCount", 0)
-                stats.forks += repo.get("forkCount", 0)
-
-                for edge in repo.get("languages", {}).get("edges", []):
-                    lang_name = edge.get("node", {}).get("name", "Other")
-                    if lang_name.lower() in {l.lower() for l in self.config.exclude_languages}:
-                        continue
-
-                    size = edge.get("size", 0)
-                    api_color = edge.get("node", {}).get("color")
-                    color = get_color(lang_name, api_color or "#858585")
-
-                    if lang_name in languages_map:
-                        languages_map[lang_name].size += size
-                    else:
-                        languages_map[lang_name] = LanguageStats(
-                            name=lang_name,
-                            size=size,
-                            color=color
-                        )
+                self._add_repo(stats, repo, languages_map)
 
             has_more_owned = owned.get("pageInfo", {}).get("hasNextPage", False)
             has_more_contrib = contrib.get("pageInfo", {}).get("hasNextPage", False)
@@ -92,64 +226,240 @@ class StatsCollector:
             if has_more_owned or has_more_contrib:
                 owned_cursor = owned.get("pageInfo", {}).get("endCursor", owned_cursor)
                 contrib_cursor = contrib.get("pageInfo", {}).get("endCursor", contrib_cursor)
+                self._cursors = {"owned": owned_cursor, "contrib": contrib_cursor}
+                self._save_checkpoint(stats)
             else:
                 break
 
-        stats.repos_count = len(self._repos)
-        stats.languages = list(languages_map.values())
+    def _set_display_name(self, stats: ProfileStats, viewer: Dict) -> None:
+        """takes the profile name from whichever phase's viewer query runs first"""
+        if not stats.display_name or stats.display_name == self.config.username:
+            stats.display_name = viewer.get("name") or viewer.get("login", self.config.username)
+
+    def reuse(self, snapshot: Snapshot, fields: FrozenSet[str]) -> None:
+        """takes fields the plan won't collect from a previous snapshot"""
+        if "lines_changed" in fields:
+            self._code_stats = {
+                name: [repo.lines_added, repo.lines_deleted]
+                for name, repo in snapshot.repos.items()
+            }
+        if "views" in fields:
+            self._traffic = {name: repo.views for name, repo in snapshot.repos.items()}
+        if "contributions" in fields:
+            self._reused_contributions = snapshot.stats.contributions
+        if "calendar" in fields:
+            self._reused_calendar = snapshot.stats.calendar
+
+    def repo_stats(self) -> Dict[str, RepoStats]:
+        """per-repo breakdown of what the last collect() summed up"""
+        result = {}
+        for name in self._repos:
+            stars, forks = self._repo_counts.get(name, (0, 0))
+            added, deleted = self._code_stats.get(name, (0, 0))
+            result[name] = RepoStats(
+                name=name,
+                stars=stars,
+                forks=forks,
+                lines_added=added,
+                lines_deleted=deleted,
+                views=self._traffic.get(name, 0)
+            )
+        return result
+
+    def _add_repo(self, stats: ProfileStats, repo: Dict, languages_map: Dict) -> None:
+        """adds one repository node's stars, forks and languages to the totals"""
+        if not repo:
+            return
+
+        name = repo.get("nameWithOwner")
+        if name in self._repos or name in self.config.exclude_repos:
+            return
+
+        self._repos.add(name)
+        stars = repo.get("stargazerCount", 0)
+        forks = repo.get("forkCount", 0)
+        self._repo_counts[name] = [stars, forks]
+        stats.stars += stars
+        stats.forks += forks
+
+        for edge in repo.get("languages", {}).get("edges", []):
+            lang_name = edge.get("node", {}).get("name", "Other")
+            if lang_name.lower() in {l.lower() for l in self.config.exclude_languages}:
+                continue
+
+            size = edge.get("size", 0)
+            api_color = edge.get("node", {}).get("color")
+            color = get_color(lang_name, api_color or "#858585")
+
+            if lang_name in languages_map:
+                languages_map[lang_name].size += size
+            else:
+                languages_map[lang_name] = LanguageStats(
+                    name=lang_name,
+                    size=size,
+                    color=color
+                )
 
     async def _collect_contributions(self, stats: ProfileStats) -> None:
         """fetches contribution counts across all years"""
-        years_query = "{ viewer { contributionsCollection { contributionYears } } }"
-        result = await self.client.graphql(years_query)
-        years = (
-            result.get("data", {})
-            .get("viewer", {})
-            .get("contributionsCollection", {})
-            .get("contributionYears", [])
-        )
+        result = await self.client.graphql(CONTRIBUTION_YEARS)
+        viewer = result.get("data", {}).get("viewer", {})
+        # a contributions-only plan never runs the repos query
+        self._set_display_name(stats, viewer)
+        years = viewer.get("contributionsCollection", {}).get("contributionYears", [])
 
         if not years:
             return
 
-        yearly_query = self._build_yearly_query(years)
-        result = await self.client.graphql(yearly_query)
-        viewer = result.get("data", {}).get("viewer", {})
-
-        for key, value in viewer.items():
-            if key.startswith("y"):
-                stats.contributions += (
-                    value.get("contributionCalendar", {})
-                    .get("totalContributions", 0)
-                )
+        with_days = self.plan.needs("calendar")
+        results = await asyncio.gather(*(
+            self.client.graphql(YEARLY_CONTRIBUTIONS, {**batch, "withDays": with_days})
+            for batch in year_batches(years)
+        ))
+
+        days = []
+        for result in results:
+            viewer = result.get("data", {}).get("viewer") or {}
+            for slot in range(YEARS_PER_QUERY):
+                calendar = (viewer.get(f"y{slot}") or {}).get("contributionCalendar", {})
+                stats.contributions += calendar.get("totalContributions", 0)
+                for week in calendar.get("weeks", []):
+                    days.extend(
+                        (day["date"], day.get("contributionCount", 0))
+                        for day in week.get("contributionDays", [])
+                    )
+
+        if with_days:
+            stats.calendar = ContributionCalendar.from_days(days)
 
     async def _collect_code_stats(self, stats: ProfileStats) -> None:
         """fetches lines added/deleted from contributor stats"""
-        for repo in self._repos:
-            result = await self.client.rest(f"/repos/{repo}/stats/contributors")
-            if not isinstance(result, list):
-                continue
+        if self.config.lines_engine == "git":
+            await self._collect_code_stats_git(stats)
+
+        pending = [repo for repo in self._repos if repo not in self._code_stats]
+        await self._sweep(pending, lambda repo: self._collect_repo_code_stats(stats, repo))
+
+    async def _collect_repo_code_stats(self, stats: ProfileStats, repo: str) -> None:
+        """one repo's lines added/deleted by our user"""
+        # popular repos return hundreds of contributors with full weekly
+        # history, stream it and only decode the entry for our user
+        parser = ContributorStatsParser(self.config.username)
+        url = f"/repos/{repo}/stats/contributors"
+        if await self._request(self.client.rest_stream(url, parser)) is TIMED_OUT:
+            return
 
-            for contrib in result:
-                if not isinstance(contrib, dict):
-                    continue
-                author = contrib.get("author", {})
-                if not isinstance(author, dict):
-                    continue
-                if author.get("login") != self.config.username:
-                    continue
+        self._code_stats[repo] = [parser.additions, parser.deletions]
+        if len(self._code_stats) % CHECKPOINT_EVERY == 0:
+            self._save_checkpoint(stats)
+
+    async def _collect_code_stats_git(self, stats: ProfileStats) -> None:
+        """counts lines from local mirrors, repos that fail to sync fall back to the API
+
+        so do repos where none of the user's identities authored a commit,
+        that's usually an email the config doesn't list rather than no work
+        """
+        engine = MirrorEngine(
+            cache_dir=self.config.mirror_dir,
+            username=self.config.username,
+            emails=self.config.author_emails or await self._verified_emails(),
+            token=self.client.token,
+            # git must stop with the phase, a cancelled await can't stop its processes
+            timeout=self.deadline.phase_remaining() if self.deadline else None
+        )
+        pending = [repo for repo in self._repos if repo not in self._code_stats]
+        results = await engine.count_async(pending)
 
-                for week in contrib.get("weeks", []):
-                    stats.lines_added += week.get("a", 0)
-                    stats.lines_deleted += week.get("d", 0)
+        unmatched = 0
+        for repo, result in results.items():
+            if result.error:
+                print(f"  mirror failed for {repo}, using the API: {result.error}")
+                continue
+            if not result.commits:
+                unmatched += 1
+                continue
+            self._code_stats[repo] = [result.added, result.deleted]
+        if unmatched:
+            print(f"  no commits by {self.config.username} in {unmatched} mirrors, using the API for those")
+        self._save_checkpoint(stats)
+
+    async def _verified_emails(self) -> List[str]:
+        """the token owner's verified emails, empty without the user:email scope"""
+        result = await self.client.rest("/user/emails")
+        if not isinstance(result, list):
+            return []
+        return [
+            entry["email"] for entry in result
+            if isinstance(entry, dict) and entry.get("verified") and entry.get("email")
+        ]
 
     async def _collect_traffic(self, stats: ProfileStats) -> None:
         """fetches view counts from traffic API"""
-        for repo in self._repos:
-            result = await self.client.rest(f"/repos/{repo}/traffic/views")
-            if isinstance(result, dict):
-                for view in result.get("views", []):
-                    stats.views += view.get("count", 0)
+        pending = [repo for repo in self._repos if repo not in self._traffic]
+        await self._sweep(pending, lambda repo: self._collect_repo_traffic(stats, repo))
+
+    async def _collect_repo_traffic(self, stats: ProfileStats, repo: str) -> None:
+        """one repo's views over the last 14 days"""
+        result = await self._request(self.client.rest(f"/repos/{repo}/traffic/views"))
+        if result is TIMED_OUT:
+            return
+
+        views = 0
+        if isinstance(result, dict):
+            for view in result.get("views", []):
+                views += view.get("count", 0)
+
+        self._traffic[repo] = views
+        if len(self._traffic) % CHECKPOINT_EVERY == 0:
+            self._save_checkpoint(stats)
+
+    def _save_checkpoint(self, stats: ProfileStats) -> None:
+        """writes the collector's progress to the attached checkpoint"""
+        if self.checkpoint is None:
+            return
+
+        self.checkpoint.save(self.config.username, {
+            "phases_done": sorted(self._phases_done),
+            "cursors": self._cursors,
+            "display_name": stats.display_name,
+            "totals": {
+                "stars": stats.stars,
+                "forks": stats.forks,
+                "contributions": stats.contributions,
+            },
+            "calendar": stats.calendar.to_json() if stats.calendar else None,
+            "repos": sorted(self._repos),
+            "repo_counts": self._repo_counts,
+            "languages": {
+                name: [lang.size, lang.color] for name, lang in self._languages.items()
+            },
+            "code_stats": self._code_stats,
+            "traffic": self._traffic,
+        })
+
+    def _restore_checkpoint(self, stats: ProfileStats) -> None:
+        """seeds collector state and running totals from a loaded checkpoint"""
+        if self.checkpoint is None or not self.checkpoint.state:
+            return
+
+        state = self.checkpoint.state
+        self._phases_done = set(state.get("phases_done", []))
+        self._cursors = state.get("cursors", self._cursors)
+        self._repos = set(state.get("repos", []))
+        self._repo_counts = state.get("repo_counts", {})
+        self._languages = {
+            name: LanguageStats(name=name, size=size, color=color)
+            for name, (size, color) in state.get("languages", {}).items()
+        }
+        self._code_stats = state.get("code_stats", {})
+        self._traffic = state.get("traffic", {})
+
+        stats.display_name = state.get("display_name", stats.display_name)
+        totals = state.get("totals", {})
+        stats.stars = totals.get("stars", 0)
+        stats.forks = totals.get("forks", 0)
+        stats.contributions = totals.get("contributions", 0)
+        stats.calendar = ContributionCalendar.from_json(state.get("calendar"))
 
     def _calculate_percentages(self, stats: ProfileStats) -> None:
         """calculates language percentages based on size"""
@@ -157,51 +467,3 @@ class StatsCollector:
         if total > 0:
             for lang in stats.languages:
                 lang.percentage = (lang.size / total) * 100
-
-    def _build_repos_query(
-        self,
-        owned_cursor: Optional[str] = None,
-        contrib_cursor: Optional[str] = None
-    ) -> str:
-        """constructs GraphQL query for repositories"""
-        owned_after = f'"{owned_cursor}"' if owned_cursor else "null"
-        contrib_after = f'"{contrib_cursor}"' if contrib_cursor else "null"
-
-        return f"""{{
-  viewer {{
-    login
-    name
-    repositories(first: 100, orderBy: {{field: UPDATED_AT, direction: DESC}}, isFork: false, after: {owned_after}) {{
-      pageInfo {{ hasNextPage endCursor }}
-      nodes {{
-        nameWithOwner
-        stargazerCount
-        forkCount
-        languages(first: 10, orderBy: {{field: SIZE, direction: DESC}}) {{
-          edges {{ size node {{ name color }} }}
-        }}
-      }}
-    }}
-    repositoriesContributedTo(first: 100, includeUserRepositories: false, orderBy: {{field: UPDATED_AT, direction: DESC}}, contributionTypes: [COMMIT, PULL_REQUEST, REPOSITORY, PULL_REQUEST_REVIEW], after: {contrib_after}) {{
-      pageInfo {{ hasNextPage endCursor }}
-      nodes {{
-        nameWithOwner
-        stargazerCount
-        forkCount
-        languages(first: 10, orderBy: {{field: SIZE, direction: DESC}}) {{
-          edges {{ size node {{ name color }} }}
-        }}
-      }}
-    }}
-  }}
-}}"""
-
-    def _build_yearly_query(self, years: List[int]) -> str:
-        """constructs query for fetching contributions per year"""
-        parts = []
-        for year in years:
-            parts.append(f"""
-    y{year}: contributionsCollection(from: "{year}-01-01T00:00:00Z", to: "{year + 1}-01-01T00:00:00Z") {{
-      contributionCalendar {{ totalContributions }}
-    }}""")
-        return "{ viewer {" + "".join(parts) + " } }"
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+incremental JSON extraction for large REST payloads
+lets us pull one author's numbers out of stats/contributors
+without decoding every contributor in the response
+"""
+
+import json
+import re
+from typing import Optional
+
+# strings are matched whole so braces inside them (urls like
+# ".../following{/other_user}") never touch the depth counter,
+# an empty second group means the string is cut at the chunk boundary
+_TOKEN_RE = re.compile(rb'"((?:[^"\\]|\\.)*)("?)|[\[\]{}]')
+
+
+class ContributorStatsParser:
+    """streams a stats/contributors array and sums one author's weekly a/d fields
+
+    only elements whose raw bytes mention the wanted login are decoded,
+    everything else is skipped as soon as its closing brace is seen,
+    login=None sums every contributor (used for organization totals)
+    """
+
+    def __init__(self, login: Optional[str]):
+        self.login = login
+        self.additions = 0
+        self.deletions = 0
+        self.found = False
+        self._needle = None
+        if login is not None:
+            self._needle = re.compile(
+                rb'"login"\s*:\s*' + re.escape(json.dumps(login).encode("utf-8"))
+            )
+        # unconsumed bytes, and where the scan left off inside them, so a
+        # large element split over many chunks is scanned only once
+        self._buffer = bytearray()
+        self._pos = 0
+        self._depth = 0
+        self._element_start = 0
+        self._started = False
+        self._done = False
+
+    def feed(self, chunk: bytes) -> None:
+        """consumes the next chunk of the response body"""
+        if self._done or not chunk:
+            return
+        self._buffer += chunk
+        self._drain()
+
+    @property
+    def done(self) -> bool:
+        """true once the top-level array has been closed"""
+        return self._done
+
+    def _drain(self) -> None:
+        """extracts every complete element currently in the buffer"""
+        buf = self._buffer
+
+        if not self._started:
+            start = buf.find(b"[")
+            if start < 0:
+                buf.clear()
+                return
+            del buf[:start + 1]
+            self._started = True
+
+        pos = self._pos
+        depth = self._depth
+        element_start = self._element_start
+
+        for match in _TOKEN_RE.finditer(buf, pos):
+            token = match.group(0)
+
+            if token[:1] == b'"':
+                if match.group(2) == b"":
+                    # string runs past the end of the buffer, rescan it with more
+                    break
+                pos = match.end()
+                continue
+
+            pos = match.end()
+            if token in (b"{", b"["):
+                if depth == 0:
+                    element_start = match.start()
+                depth += 1
+                continue
+
+            if depth == 0:
+                # closing bracket of the top-level array
+                self._done = True
+                break
+
+            depth -= 1
+            if depth == 0:
+                self._handle_element(bytes(buf[element_start:pos]))
+
+        if self._done:
+            buf.clear()
+            return
+
+        # drop bytes no open element needs any more
+        keep = element_start if depth else pos
+        del buf[:keep]
+        self._pos = pos - keep
+        self._depth = depth
+        self._element_start = element_start - keep if depth else 0
+
+    def _handle_element(self, raw: bytes) -> None:
+        """decodes an element only when it can belong to our author"""
+        if self._needle is not None and not self._needle.search(raw):
+            return
+
+        try:
+            contrib = json.loads(raw)
+        except ValueError:
+            return
+
+        if not isinstance(contrib, dict):
+            return
+        if self.login is not None:
+            author = contrib.get("author", {})
+            if not isinstance(author, dict) or author.get("login") != self.login:
+                return
+
+        self.found = True
+        for week in contrib.get("weeks", []):
+            self.additions += week.get("a", 0)
+            self.deletions += week.get("d", 0)
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+HTTP transports for GitHubClient
+the live transport talks to GitHub through aiohttp, the recording one
+also writes every exchange (status, kept headers, body, latency) to a
+cassette, and the replay one serves a cassette back with no network
+
+a transport is opened with the client's session, and provides request()
+(an async context manager yielding a response), sleep() and close()
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+import aiohttp
+from multidict import CIMultiDict
+
+
+CASSETTE_VERSION = 1
+
+# everything the client reads off a response, auth and cookies never get recorded
+KEPT_HEADERS = (
+    "Content-Type", "Retry-After",
+    "X-RateLimit-Limit", "X-RateLimit-Remaining", "X-RateLimit-Reset", "X-RateLimit-Resource",
+)
+
+
+class CassetteError(Exception):
+    """raised when a replayed request has no recorded response"""
+    pass
+
+
+def request_key(
+    method: str,
+    url: str,
+    params: Optional[Dict] = None,
+    body: Any = None
+) -> Tuple[str, str, str, str]:
+    """identity of a request in a cassette, bodies are stored as digests"""
+    frozen_params = json.dumps(params or {}, sort_keys=True, default=str)
+    digest = ""
+    if body is not None:
+        digest = hashlib.sha256(
+            json.dumps(body, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()[:32]
+    return (method, url, frozen_params, digest)
+
+
+class CassetteResponse:
+    """a recorded response with the parts of aiohttp's interface the client uses"""
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status = status
+        self.headers = CIMultiDict(headers)
+        self._body = body
+
+    @property
+    def content(self) -> "CassetteResponse":
+        return self
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def json(self) -> Any:
+        return json.loads(self._body) if self._body else None
+
+    async def iter_chunked(self, size: int) -> AsyncIterator[bytes]:
+        for start in range(0, len(self._body), size):
+            yield self._body[start:start + size]
+
+
+@dataclass
+class Interaction:
+    """one request/response exchange"""
+    key: Tuple[str, str, str, str]
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    elapsed: float
+
+    def response(self) -> CassetteResponse:
+        return CassetteResponse(self.status, self.headers, self.body)
+
+
+@dataclass
+class Cassette:
+    """recorded exchanges in the order their responses arrived"""
+    interactions: List[Interaction] = field(default_factory=list)
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != CASSETTE_VERSION:
+            raise CassetteError(f"{path}: unsupported cassette version {data.get('version')}")
+        return cls([
+            Interaction(
+                key=tuple(item["request"]),
+                status=item["status"],
+                headers=item["headers"],
+                body=item["body"].encode("utf-8"),
+                elapsed=item["elapsed"]
+            )
+            for item in data.get("interactions", [])
+        ])
+
+    def save(self, path: str) -> None:
+        """writes the cassette gzipped, replacing any previous file atomically"""
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": CASSETTE_VERSION,
+            "interactions": [
+                {
+                    "request": list(item.key),
+                    "status": item.status,
+                    "headers": item.headers,
+                    "body": item.body.decode("utf-8", errors="replace"),
+                    "elapsed": round(item.elapsed, 4),
+                }
+                for item in self.interactions
+            ],
+        }
+
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{target.name}.", dir=str(target.parent))
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+
+class AiohttpTransport:
+    """live requests over an aiohttp session"""
+
+    def __init__(self):
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def open(self, session: aiohttp.ClientSession) -> None:
+        self.session = session
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        json: Any = None
+    ):
+        return self.session.request(method, url, headers=headers, params=params, json=json)
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+    async def close(self) -> None:
+        pass
+
+
+class RecordingTransport:
+    """forwards to another transport and records every exchange
+
+    bodies are read in full before they're handed on, so streaming
+    callers see the same bytes, just not incrementally
+    """
+
+    def __init__(self, path: str, inner: Optional[AiohttpTransport] = None):
+        self.inner = inner or AiohttpTransport()
+        self.path = path
+        self.cassette = Cassette()
+
+    async def open(self, session: aiohttp.ClientSession) -> None:
+        await self.inner.open(session)
+
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        json: Any = None
+    ) -> AsyncIterator[CassetteResponse]:
+        started = time.monotonic()
+        async with self.inner.request(method, url, headers=headers, params=params, json=json) as resp:
+            body = await resp.read()
+            kept = {name: resp.headers[name] for name in KEPT_HEADERS if name in resp.headers}
+            status = resp.status
+
+        interaction = Interaction(
+            key=request_key(method, url, params, json),
+            status=status,
+            headers=kept,
+            body=body,
+            elapsed=time.monotonic() - started
+        )
+        self.cassette.interactions.append(interaction)
+        yield interaction.response()
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+    async def close(self) -> None:
+        self.cassette.save(self.path)
+
+
+class ReplayTransport:
+    """serves a cassette, optionally at recorded speed
+
+    time_scale multiplies recorded latencies and the client's retry
+    waits: 1.0 replays in real time, 0 as fast as possible, repeated
+    requests get their responses in recorded order and the last one repeats
+    """
+
+    def __init__(self, cassette: Cassette, time_scale: float = 1.0):
+        self.time_scale = time_scale
+        self._queues: Dict[Tuple, Deque[Interaction]] = {}
+        for interaction in cassette.interactions:
+            self._queues.setdefault(interaction.key, deque()).append(interaction)
+
+    async def open(self, session: Optional[aiohttp.ClientSession]) -> None:
+        pass
+
+    @asynccontextmanager
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+        json: Any = None
+    ) -> AsyncIterator[CassetteResponse]:
+        queue = self._queues.get(request_key(method, url, params, json))
+        if not queue:
+            raise CassetteError(f"no recorded response for {method} {url}")
+
+        interaction = queue.popleft() if len(queue) > 1 else queue[0]
+        if self.time_scale:
+            await asyncio.sleep(interaction.elapsed * self.time_scale)
+        yield interaction.response()
+
+    async def sleep(self, seconds: float) -> None:
+        if self.time_scale:
+            await asyncio.sleep(seconds * self.time_scale)
+
+    async def close(self) -> None:
+        pass
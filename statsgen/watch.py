@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+long-running refresh daemon
+keeps one API client and one renderer warm and refreshes on a schedule
+instead of from cron: the profile is probed with the cheap fingerprint
+query, and every repo gets its own cadence, often for recently pushed
+repos and rarely for dormant ones, all within GitHub's rate budget
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .card_renderer import CardRenderer
+from .config_loader import ConfigError, ConfigLoader
+from .fetch_plan import FetchPlan
+from .fingerprint import Fingerprint, load_fingerprint, probe, save_fingerprint
+from .github_client import GitHubClient, RateLimitError
+from .history import HistoryStore
+from .models import ProfileConfig
+from .render_pool import card_jobs, render_card
+from .snapshot import Snapshot, load_snapshot, save_snapshot
+from .stats_collector import StatsCollector
+from .streaming import ContributorStatsParser
+
+
+# task priorities, lower runs first when several are due
+PRIORITY_PROFILE = 0
+PRIORITY_PUSHED = 1
+PRIORITY_ROUTINE = 2
+
+# (days since the last push, seconds between refreshes), first match wins
+REPO_CADENCE: List[Tuple[float, float]] = [
+    (1, 30 * 60),
+    (7, 3 * 3600),
+    (30, 12 * 3600),
+]
+DORMANT_INTERVAL = 3 * 86400
+
+# used when a rate limit is hit without a known reset time
+RATE_LIMIT_BACKOFF = 15 * 60
+
+# a failing task waits interval, then twice that, ... up to this long
+MAX_FAILURE_BACKOFF = 6 * 3600
+
+# counted-up-to time of a repo whose lines were never counted
+NEVER = datetime.min.replace(tzinfo=timezone.utc)
+
+
+def parse_time(value: str) -> Optional[datetime]:
+    """GitHub and snapshot timestamps, None when empty or malformed"""
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def repo_interval(pushed_at: str, now: datetime) -> float:
+    """seconds between refreshes of a repo last pushed at pushed_at"""
+    pushed = parse_time(pushed_at)
+    if pushed is None:
+        return DORMANT_INTERVAL
+    age = (now - pushed).total_seconds() / 86400
+    for days, interval in REPO_CADENCE:
+        if age < days:
+            return interval
+    return DORMANT_INTERVAL
+
+
+@dataclass(order=True)
+class Task:
+    """one scheduled refresh, keyed profile or repo:<owner/name>"""
+    due: float
+    priority: int
+    seq: int
+    key: str = field(compare=False)
+
+
+class RefreshScheduler:
+    """min-heap of tasks by due time
+
+    scheduling a key again replaces its earlier entry, stale heap entries
+    are skipped when they surface instead of being searched for
+    """
+
+    def __init__(self):
+        self._heap: List[Task] = []
+        self._current: Dict[str, Task] = {}
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._current)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._current
+
+    def schedule(self, key: str, due: float, priority: int = PRIORITY_ROUTINE) -> None:
+        task = Task(due, priority, next(self._seq), key)
+        self._current[key] = task
+        heapq.heappush(self._heap, task)
+
+    def remove(self, key: str) -> None:
+        self._current.pop(key, None)
+
+    def next_due(self) -> Optional[float]:
+        self._drop_stale()
+        return self._heap[0].due if self._heap else None
+
+    def pop_due(self, now: float) -> List[str]:
+        """removes and returns every due key, most urgent priority first"""
+        due = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0].due > now:
+                break
+            task = heapq.heappop(self._heap)
+            del self._current[task.key]
+            due.append(task)
+        due.sort(key=lambda task: (task.priority, task.due))
+        return [task.key for task in due]
+
+    def _drop_stale(self) -> None:
+        while self._heap and self._current.get(self._heap[0].key) is not self._heap[0]:
+            heapq.heappop(self._heap)
+
+
+class RateBudget:
+    """decides whether a task may spend requests now
+
+    a `reserve` share of every resource's hourly limit is never spent, so
+    the daemon can't starve other tools sharing the token
+    """
+
+    def __init__(self, client: GitHubClient, reserve: float = 0.2, clock: Callable[[], float] = time.time):
+        self.client = client
+        self.reserve = reserve
+        self._clock = clock
+
+    def wait(self, resource: str, cost: int) -> float:
+        """seconds until cost requests fit in the budget, 0 if they fit now"""
+        limit = self.client.rate_limits.get(resource)
+        now = self._clock()
+        if limit is None or now >= limit.reset:
+            return 0.0
+        if limit.remaining - cost >= limit.limit * self.reserve:
+            return 0.0
+        return limit.reset - now
+
+    def backoff(self, resource: str) -> float:
+        """seconds to wait after GitHub refused a request"""
+        limit = self.client.rate_limits.get(resource)
+        if limit is not None and limit.reset > self._clock():
+            return limit.reset - self._clock()
+        return RATE_LIMIT_BACKOFF
+
+
+class WatchDaemon:
+    """refreshes one profile's cards for as long as it runs"""
+
+    def __init__(
+        self,
+        config_path: str = ".github/config/profile.yml",
+        output_dir: str = "cards",
+        theme: str = "all",
+        interval: float = 600.0,
+        reserve: float = 0.2,
+        snapshot_path: str = ".statsgen/snapshot.json",
+        fingerprint_path: str = ".statsgen/fingerprint.json",
+        clock: Callable[[], float] = time.time
+    ):
+        self.config_path = config_path
+        self.theme = theme
+        self.interval = interval
+        self.reserve = reserve
+        self.snapshot_path = snapshot_path
+        self.fingerprint_path = fingerprint_path
+        self.renderer = CardRenderer(output_dir=output_dir)
+        self.scheduler = RefreshScheduler()
+        self._clock = clock
+
+        self.config: Optional[ProfileConfig] = None
+        self.snapshot: Optional[Snapshot] = load_snapshot(snapshot_path)
+        self.fingerprint: Optional[Fingerprint] = load_fingerprint(fingerprint_path)
+        # repo -> pushedAt from the latest probe
+        self.pushed: Dict[str, str] = {}
+        # repo -> point in time its lines changed were counted up to
+        self.counted: Dict[str, datetime] = {}
+        self._config_stamp: Optional[Tuple[int, int]] = None
+        # key -> failures in a row, for the retry backoff
+        self.failures: Dict[str, int] = {}
+        self._render_needed = False
+        self.refreshes = 0
+
+    def reload_config(self) -> bool:
+        """reads profile.yml again if it changed on disk, True when it did"""
+        try:
+            stat = os.stat(self.config_path)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stamp = None
+        if self.config is not None and stamp == self._config_stamp:
+            return False
+
+        try:
+            config = ConfigLoader(self.config_path).load()
+        except (ConfigError, OSError) as e:
+            if self.config is None:
+                raise
+            print(f"config: keeping the previous settings, the new file failed to load\n{e}")
+            self._config_stamp = stamp
+            return False
+
+        reloaded = self.config is not None
+        self.config = config
+        self._config_stamp = stamp
+        if reloaded:
+            print(f"config: reloaded {self.config_path}")
+        # the fingerprint covers the config, so the probe sees what changed
+        self.scheduler.schedule("profile", self._clock(), PRIORITY_PROFILE)
+        self._render_needed = True
+        return True
+
+    @property
+    def themes(self) -> List[str]:
+        return self.config.themes if self.theme == "all" else [self.theme]
+
+    async def run(self, client: Optional[GitHubClient] = None) -> None:
+        """runs until cancelled"""
+        self.reload_config()
+        if client is None:
+            async with GitHubClient() as client:
+                await self._loop(client)
+        else:
+            await self._loop(client)
+
+    async def _loop(self, client: GitHubClient) -> None:
+        budget = RateBudget(client, self.reserve, self._clock)
+        print(f"watching {self.config.username}, probing every {self.interval:.0f}s")
+
+        while True:
+            self.reload_config()
+            for key in self.scheduler.pop_due(self._clock()):
+                await self._run_task(client, budget, key)
+
+            if self._render_needed:
+                self.render()
+
+            next_due = self.scheduler.next_due()
+            # wake up at least every few seconds to notice config edits
+            pause = 5.0 if next_due is None else min(5.0, next_due - self._clock())
+            await asyncio.sleep(max(0.0, pause))
+
+    async def _run_task(self, client: GitHubClient, budget: RateBudget, key: str) -> None:
+        """runs one task, or puts it back when the budget or the API says wait"""
+        priority = PRIORITY_PROFILE if key == "profile" else PRIORITY_ROUTINE
+        resource, cost = self._cost(key)
+        wait = budget.wait(resource, cost)
+        if wait:
+            self.scheduler.schedule(key, self._clock() + wait, priority)
+            return
+
+        try:
+            if key == "profile":
+                await self.refresh_profile(client)
+            else:
+                await self.refresh_repo(client, key.split(":", 1)[1])
+            self.refreshes += 1
+            self.failures.pop(key, None)
+        except RateLimitError:
+            wait = budget.backoff(resource)
+            print(f"rate limited during {key}, retrying in {wait:.0f}s")
+            self.scheduler.schedule(key, self._clock() + wait, priority)
+        except Exception as e:
+            # one bad repo or payload must not stop the daemon, and a task
+            # that keeps failing shouldn't hammer the API either
+            failures = self.failures.get(key, 0) + 1
+            self.failures[key] = failures
+            wait = min(self.interval * 2 ** (failures - 1), MAX_FAILURE_BACKOFF)
+            print(f"{key} failed, retrying in {wait:.0f}s: {type(e).__name__}: {e}")
+            self.scheduler.schedule(key, self._clock() + wait, priority)
+
+    def _cost(self, key: str) -> Tuple[str, int]:
+        """(rate limit resource, requests) a task is expected to spend"""
+        if key == "profile":
+            repos = len(self.snapshot.repos) if self.snapshot else 0
+            # the probe, and a collection when it finds changes, one page per 100 repos
+            return "graphql", 2 * (repos // 100 + 1) + 1
+        return "core", 2
+
+    async def refresh_profile(self, client: GitHubClient) -> None:
+        """probes for changes and collects whatever moved, except per-repo figures
+
+        lines changed and views are refreshed by the repo tasks instead,
+        unless the config changed, then everything is collected again
+        """
+        config = self.config
+        pushed: Dict[str, str] = {}
+        fingerprint = await probe(client, config, pushed)
+        plan = FetchPlan.from_config(config)
+
+        previous = self.fingerprint
+        if self.snapshot is None or previous is None:
+            stale = plan.fields
+        else:
+            stale = fingerprint.stale_fields(previous) & plan.fields
+
+        if stale:
+            narrowed = plan.narrow(stale)
+            if self.snapshot is not None and previous is not None and previous.config == fingerprint.config:
+                narrowed = FetchPlan(fields=narrowed.fields - {"lines_changed", "views"})
+
+            collector = StatsCollector(client, config, plan=narrowed, fallback=self.snapshot)
+            if self.snapshot is not None:
+                collector.reuse(self.snapshot, plan.fields - narrowed.fields)
+            stats = await collector.collect()
+
+            fresh = narrowed.needs("lines_changed")
+            self.snapshot = Snapshot(stats, collector.repo_stats())
+            save_snapshot(self.snapshot_path, self.snapshot)
+            self._record_history()
+            self._render_needed = True
+            print(f"profile: refreshed {', '.join(sorted(stale))} ({', '.join(narrowed.phases) or 'no phases'})")
+        else:
+            fresh = False
+
+        self.fingerprint = fingerprint
+        save_fingerprint(self.fingerprint_path, fingerprint)
+        if self.snapshot is not None:
+            self._schedule_repos(pushed, fresh)
+        self.scheduler.schedule("profile", self._clock() + self.interval, PRIORITY_PROFILE)
+
+    def _schedule_repos(self, pushed: Dict[str, str], fresh: bool) -> None:
+        """(re)schedules repo tasks from the latest push times
+
+        repos pushed since their lines were counted are due now, the rest
+        keep their slot or get one spread over their interval
+        """
+        now = datetime.fromtimestamp(self._clock(), timezone.utc)
+        if fresh:
+            counted_at = now
+        elif self.counted:
+            # repos that appeared since the last probe have no lines yet
+            counted_at = NEVER
+        else:
+            # on start-up, lines are as recent as the snapshot they came from
+            counted_at = parse_time(self.snapshot.taken_at) or NEVER
+        tracked = set(self.snapshot.repos)
+
+        for name in tracked:
+            self.counted.setdefault(name, counted_at)
+            if fresh:
+                self.counted[name] = counted_at
+
+            key = f"repo:{name}"
+            pushed_at = parse_time(pushed.get(name, ""))
+            if pushed_at is not None and pushed_at > self.counted[name]:
+                self.scheduler.schedule(key, self._clock(), PRIORITY_PUSHED)
+            elif key not in self.scheduler or pushed.get(name) != self.pushed.get(name):
+                interval = repo_interval(pushed.get(name, ""), now)
+                # a stable offset per repo keeps them from all coming due together
+                offset = interval * (zlib.crc32(name.encode("utf-8")) % 1000) / 1000
+                self.scheduler.schedule(key, self._clock() + offset, PRIORITY_ROUTINE)
+
+        for name in set(self.counted) - tracked:
+            del self.counted[name]
+            self.scheduler.remove(f"repo:{name}")
+        self.pushed = {name: value for name, value in pushed.items() if name in tracked}
+
+    async def refresh_repo(self, client: GitHubClient, name: str) -> None:
+        """refreshes one repo's views, and its lines changed if it was pushed"""
+        repo = self.snapshot.repos.get(name) if self.snapshot else None
+        if repo is None:
+            return
+
+        stats = self.snapshot.stats
+        plan = FetchPlan.from_config(self.config)
+        before = (repo.lines_added, repo.lines_deleted, repo.views)
+        retry = False
+        pushed_at = parse_time(self.pushed.get(name, ""))
+
+        if plan.needs("views"):
+            result = await client.rest(f"/repos/{name}/traffic/views")
+            views = sum(view.get("count", 0) for view in result.get("views", [])) if isinstance(result, dict) else 0
+            stats.views += views - repo.views
+            repo.views = views
+
+        counted = self.counted.get(name)
+        if plan.needs("lines_changed") and pushed_at is not None and (counted is None or pushed_at > counted):
+            parser = ContributorStatsParser(self.config.username)
+            if await client.rest_stream(f"/repos/{name}/stats/contributors", parser):
+                stats.lines_added += parser.additions - repo.lines_added
+                stats.lines_deleted += parser.deletions - repo.lines_deleted
+                repo.lines_added = parser.additions
+                repo.lines_deleted = parser.deletions
+                self.counted[name] = pushed_at
+            else:
+                # stats still computing or the request failed, the old numbers
+                # stay and the repo is asked again after the next probe interval
+                retry = True
+
+        if (repo.lines_added, repo.lines_deleted, repo.views) != before:
+            save_snapshot(self.snapshot_path, self.snapshot)
+            self._render_needed = True
+
+        interval = repo_interval(self.pushed.get(name, ""), datetime.fromtimestamp(self._clock(), timezone.utc))
+        if retry:
+            interval = min(interval, self.interval)
+        self.scheduler.schedule(f"repo:{name}", self._clock() + interval, PRIORITY_ROUTINE)
+
+    def render(self) -> List[Path]:
+        """renders every enabled card with the warm renderer, writing only changed files"""
+        self._render_needed = False
+        if self.snapshot is None:
+            return []
+
+        written = []
+        for job in card_jobs(self.config, self.snapshot.stats, self._series(), self.themes):
+            content = render_card(self.renderer, job)
+            path = self.renderer.output_dir / job.filename
+            if path.exists() and path.read_text(encoding="utf-8") == content:
+                continue
+            written.append(self.renderer.save(content, job.filename))
+            print(f"  updated: {path}")
+        return written
+
+    def _record_history(self) -> None:
+        with HistoryStore(self.config.history_path) as history:
+            history.record(self.snapshot.stats, fields=FetchPlan.from_config(self.config).fields)
+            history.compact(self.snapshot.stats.username, self.config.history_keep_days)
+
+    def _series(self) -> List[Tuple[str, int]]:
+        """trend card series from the history store"""
+        if not self.config.trend_card.enabled:
+            return []
+        metric = self.config.trend_card.options.get("metric", "stars")
+        days = self.config.trend_card.options.get("days", 90)
+        with HistoryStore(self.config.history_path) as history:
+            return history.series(
+                self.snapshot.stats.username,
+                metric,
+                start=date.today() - timedelta(days=days)
+            )
+
+
+async def watch(
+    config_path: str = ".github/config/profile.yml",
+    output_dir: str = "cards",
+    theme: str = "all",
+    interval: float = 600.0,
+    reserve: float = 0.2
+) -> bool:
+    """runs the refresh daemon until interrupted"""
+    daemon = WatchDaemon(config_path, output_dir, theme, interval, reserve)
+    try:
+        daemon.reload_config()
+    except ConfigError as e:
+        print(f"error: invalid configuration\n{e}")
+        return False
+    if not daemon.config.username:
+        print("error: no username found in config or environment")
+        return False
+    if daemon.config.organization:
+        print("error: watch mode refreshes a single profile, run organizations with the one-shot CLI")
+        return False
+
+    if daemon.snapshot is not None:
+        print(f"starting from snapshot taken {daemon.snapshot.taken_at} ({len(daemon.snapshot.repos)} repos)")
+    try:
+        await daemon.run()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        print(f"stopped after {daemon.refreshes} refreshes")
+    return True
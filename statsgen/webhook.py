@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+webhook receiver for incremental refreshes
+applies GitHub push, star, fork and repository events to the last
+snapshot as deltas, so each event costs at most one API call instead of
+a full collection, and cards are rewritten only when their output changes
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from aiohttp import web
+
+from .card_renderer import CardRenderer
+from .config_loader import ConfigError, ConfigLoader
+from .fetch_plan import overview_visibility
+from .github_client import GitHubClient
+from .models import ProfileConfig, RepoStats
+from .snapshot import Snapshot, load_snapshot, save_snapshot
+from .streaming import ContributorStatsParser
+
+
+@dataclass
+class EventResult:
+    """what an event did to the snapshot"""
+    changed: bool = False
+    dirty: Optional[str] = None
+    ignored: str = ""
+
+
+class WebhookProcessor:
+    """turns webhook payloads into O(1) updates of a Snapshot"""
+
+    def __init__(self, config: ProfileConfig, snapshot: Snapshot):
+        self.config = config
+        self.snapshot = snapshot
+        self.dirty: Set[str] = set()
+
+    def apply(self, event: str, payload: Dict) -> EventResult:
+        """applies one event, returns whether totals changed or a repo went dirty"""
+        handler = getattr(self, f"_on_{event}", None)
+        if handler is None:
+            return EventResult(ignored=f"unsupported event: {event}")
+        return handler(payload)
+
+    async def refresh_dirty(self, client: GitHubClient) -> bool:
+        """recomputes lines changed for dirty repos only, one request each"""
+        changed = False
+        stats = self.snapshot.stats
+        retry = set()
+
+        while self.dirty:
+            name = self.dirty.pop()
+            repo = self.snapshot.repos.get(name)
+            if repo is None:
+                continue
+
+            parser = ContributorStatsParser(self.config.username)
+            if not await client.rest_stream(f"/repos/{name}/stats/contributors", parser):
+                # stats still computing or the request failed, keep the old
+                # numbers and try again with the next flush
+                retry.add(name)
+                continue
+
+            stats.lines_added += parser.additions - repo.lines_added
+            stats.lines_deleted += parser.deletions - repo.lines_deleted
+            changed |= (parser.additions, parser.deletions) != (repo.lines_added, repo.lines_deleted)
+            repo.lines_added = parser.additions
+            repo.lines_deleted = parser.deletions
+
+        self.dirty |= retry
+        return changed
+
+    def _tracked(self, payload: Dict) -> Optional[RepoStats]:
+        name = payload.get("repository", {}).get("full_name")
+        return self.snapshot.repos.get(name)
+
+    def _on_ping(self, payload: Dict) -> EventResult:
+        return EventResult(ignored="ping")
+
+    def _on_star(self, payload: Dict) -> EventResult:
+        repo = self._tracked(payload)
+        if repo is None:
+            return EventResult(ignored="repository not tracked")
+
+        # the payload carries the new absolute count, so replays are harmless
+        count = payload.get("repository", {}).get("stargazers_count", repo.stars)
+        delta = count - repo.stars
+        repo.stars = count
+        self.snapshot.stats.stars += delta
+        return EventResult(changed=delta != 0)
+
+    def _on_fork(self, payload: Dict) -> EventResult:
+        repo = self._tracked(payload)
+        if repo is None:
+            return EventResult(ignored="repository not tracked")
+
+        count = payload.get("repository", {}).get("forks_count", repo.forks + 1)
+        delta = count - repo.forks
+        repo.forks = count
+        self.snapshot.stats.forks += delta
+        return EventResult(changed=delta != 0)
+
+    def _on_push(self, payload: Dict) -> EventResult:
+        repo = self._tracked(payload)
+        if repo is None:
+            return EventResult(ignored="repository not tracked")
+
+        username = self.config.username
+        authors = {
+            commit.get("author", {}).get("username")
+            for commit in payload.get("commits", [])
+        }
+        if payload.get("sender", {}).get("login") != username and username not in authors:
+            return EventResult(ignored="push has no commits by the user")
+
+        self.dirty.add(repo.name)
+        return EventResult(dirty=repo.name)
+
+    def _on_repository(self, payload: Dict) -> EventResult:
+        action = payload.get("action")
+        info = payload.get("repository", {})
+        name = info.get("full_name")
+        stats = self.snapshot.stats
+
+        if action == "created":
+            owner = info.get("owner", {}).get("login")
+            if (
+                owner != self.config.username
+                or info.get("fork")
+                or name in self.config.exclude_repos
+                or name in self.snapshot.repos
+            ):
+                return EventResult(ignored="repository not counted")
+            repo = RepoStats(
+                name=name,
+                stars=info.get("stargazers_count", 0),
+                forks=info.get("forks_count", 0)
+            )
+            self.snapshot.repos[name] = repo
+            stats.repos_count += 1
+            stats.stars += repo.stars
+            stats.forks += repo.forks
+            return EventResult(changed=True)
+
+        if action == "deleted":
+            repo = self.snapshot.repos.pop(name, None)
+            if repo is None:
+                return EventResult(ignored="repository not tracked")
+            self.dirty.discard(name)
+            stats.repos_count -= 1
+            stats.stars -= repo.stars
+            stats.forks -= repo.forks
+            stats.lines_added -= repo.lines_added
+            stats.lines_deleted -= repo.lines_deleted
+            stats.views -= repo.views
+            return EventResult(changed=True)
+
+        if action == "renamed":
+            old = payload.get("changes", {}).get("repository", {}).get("name", {}).get("from")
+            owner = info.get("owner", {}).get("login")
+            old_name = f"{owner}/{old}"
+            repo = self.snapshot.repos.pop(old_name, None)
+            if repo is None:
+                return EventResult(ignored="repository not tracked")
+            repo.name = name
+            self.snapshot.repos[name] = repo
+            if old_name in self.dirty:
+                self.dirty.discard(old_name)
+                self.dirty.add(name)
+            return EventResult()
+
+        return EventResult(ignored=f"repository action {action} not handled")
+
+
+class WebhookServer:
+    """HTTP endpoint that feeds events to a WebhookProcessor and re-renders"""
+
+    def __init__(
+        self,
+        config: ProfileConfig,
+        snapshot: Snapshot,
+        snapshot_path: str,
+        output_dir: str = "cards",
+        themes: Optional[List[str]] = None,
+        secret: Optional[str] = None,
+        debounce: float = 5.0,
+        insecure: bool = False
+    ):
+        self.config = config
+        self.processor = WebhookProcessor(config, snapshot)
+        self.snapshot_path = snapshot_path
+        self.renderer = CardRenderer(output_dir=output_dir)
+        self.themes = themes or config.themes
+        self.secret = secret if secret is not None else os.getenv("WEBHOOK_SECRET", "")
+        self.insecure = insecure
+        self.debounce = debounce
+        self._pending = asyncio.Event()
+        self._visible_changed = False
+        self.events = 0
+        self.api_calls = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/webhook", self.handle)
+        app.on_startup.append(self._start_worker)
+        app.on_cleanup.append(self._stop_worker)
+        return app
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        """runs the receiver until cancelled"""
+        runner = web.AppRunner(self.app())
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        print(f"listening for GitHub webhooks on http://{host}:{port}/webhook")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        if not self._verify(body, request.headers.get("X-Hub-Signature-256", "")):
+            return web.json_response({"error": "bad signature"}, status=401)
+
+        event = request.headers.get("X-GitHub-Event", "")
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            return web.json_response({"error": "invalid JSON"}, status=400)
+
+        self.events += 1
+        result = self.processor.apply(event, payload)
+        if result.changed or result.dirty:
+            self._visible_changed |= result.changed
+            self._pending.set()
+
+        return web.json_response({
+            "changed": result.changed,
+            "dirty": result.dirty,
+            "ignored": result.ignored,
+        }, status=202)
+
+    def _verify(self, body: bytes, signature: str) -> bool:
+        """checks GitHub's HMAC signature, unsigned deliveries need insecure mode"""
+        if not self.secret:
+            return self.insecure
+        expected = "sha256=" + hmac.new(
+            self.secret.encode("utf-8"), body, hashlib.sha256
+        ).hexdigest()
+        return hmac.compare_digest(expected, signature)
+
+    async def _start_worker(self, app: web.Application) -> None:
+        self._client = GitHubClient()
+        await self._client.__aenter__()
+        self._worker = asyncio.create_task(self._run_worker())
+
+    async def _stop_worker(self, app: web.Application) -> None:
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        await self._client.__aexit__(None, None, None)
+
+    async def _run_worker(self) -> None:
+        """batches events for `debounce` seconds, then refreshes and renders"""
+        while True:
+            await self._pending.wait()
+            await asyncio.sleep(self.debounce)
+            self._pending.clear()
+            await self.flush(self._client)
+
+    async def flush(self, client: GitHubClient) -> List[Path]:
+        """refreshes dirty repos, saves the snapshot and rewrites changed cards"""
+        dirty = len(self.processor.dirty)
+        changed = await self.processor.refresh_dirty(client) | self._visible_changed
+        self.api_calls += dirty
+        self._visible_changed = False
+
+        save_snapshot(self.snapshot_path, self.processor.snapshot)
+        if not changed:
+            return []
+
+        written = self.render()
+        for path in written:
+            print(f"  updated: {path}")
+        return written
+
+    def render(self) -> List[Path]:
+        """renders the overview card, writing only files whose content changed"""
+        if not self.config.overview_card.enabled:
+            return []
+
+        stats = self.processor.snapshot.stats
+        show = overview_visibility(self.config)
+        written = []
+        for theme in self.themes:
+            suffix = f"-{theme}" if theme != "dark" else ""
+            filename = f"overview{suffix}.svg"
+            content = self.renderer.render_overview(stats, theme, show)
+
+            path = self.renderer.output_dir / filename
+            if path.exists() and path.read_text(encoding="utf-8") == content:
+                continue
+            written.append(self.renderer.save(content, filename))
+        return written
+
+
+async def serve(
+    config_path: str = ".github/config/profile.yml",
+    output_dir: str = "cards",
+    theme: str = "all",
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    secret: Optional[str] = None,
+    snapshot_path: str = ".statsgen/snapshot.json",
+    insecure: bool = False
+) -> bool:
+    """loads the last snapshot and serves the webhook endpoint"""
+    try:
+        config = ConfigLoader(config_path).load()
+    except ConfigError as e:
+        print(f"error: invalid configuration\n{e}")
+        return False
+    snapshot = load_snapshot(snapshot_path)
+    if snapshot is None:
+        print(f"error: no snapshot at {snapshot_path}, run a full collection first")
+        return False
+
+    themes = config.themes if theme == "all" else [theme]
+    server = WebhookServer(
+        config, snapshot, snapshot_path, output_dir, themes, secret, insecure=insecure
+    )
+    if not server.secret:
+        if not insecure:
+            print("error: no webhook secret, set WEBHOOK_SECRET or pass --insecure to accept unsigned deliveries")
+            return False
+        print("warning: no webhook secret, accepting unsigned deliveries (--insecure)")
+
+    print(f"tracking {len(snapshot.repos)} repos from snapshot taken {snapshot.taken_at}")
+    await server.serve(host, port)
+    return True
@@ -0,0 +1,98 @@
+"""
+tests for the adaptive concurrency limiter
+"""
+
+import asyncio
+
+from statsgen.concurrency import AdaptiveLimiter
+
+
+async def _run(limiter: AdaptiveLimiter, concurrent: int, rounds: int) -> None:
+    async def request():
+        async with limiter.slot():
+            await asyncio.sleep(0)
+
+    for _ in range(rounds):
+        await asyncio.gather(*(request() for _ in range(concurrent)))
+
+
+def test_limit_stays_put_while_under_used():
+    async def main():
+        limiter = AdaptiveLimiter(initial=10)
+        await _run(limiter, concurrent=2, rounds=50)
+        return limiter
+
+    limiter = asyncio.run(main())
+    assert limiter.limit == 10
+    assert limiter.increases == 0
+
+
+def test_limit_grows_when_saturated():
+    async def main():
+        limiter = AdaptiveLimiter(initial=4, max_limit=8)
+        await _run(limiter, concurrent=16, rounds=20)
+        return limiter
+
+    limiter = asyncio.run(main())
+    assert 4 < limiter.limit <= 8
+    assert limiter.increases > 0
+
+
+def test_waiters_are_served_in_order():
+    async def main():
+        limiter = AdaptiveLimiter(initial=2, max_limit=2)
+        order = []
+
+        async def request(index):
+            async with limiter.slot():
+                order.append(index)
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*(request(i) for i in range(20)))
+        return limiter, order
+
+    limiter, order = asyncio.run(main())
+    assert order == list(range(20))
+    assert limiter.in_flight == 0
+
+
+def test_cancelled_waiters_give_up_their_place():
+    async def main():
+        limiter = AdaptiveLimiter(initial=1, max_limit=1)
+        held = await limiter.acquire()
+        waiting = [asyncio.ensure_future(limiter.acquire()) for _ in range(3)]
+        await asyncio.sleep(0)
+
+        waiting[0].cancel()
+        await limiter.release(held)
+        await asyncio.sleep(0)
+        assert waiting[0].cancelled()
+        assert waiting[1].done() and not waiting[2].done()
+        assert limiter.in_flight == 1
+
+        # woken and cancelled before it ran, the slot passes on
+        await limiter.release(waiting[1].result())
+        waiting[2].cancel()
+        await asyncio.gather(waiting[2], return_exceptions=True)
+        assert limiter.in_flight == 0
+        assert (await limiter.acquire()) is not None
+
+    asyncio.run(main())
+
+
+def test_a_raised_limit_wakes_waiters():
+    async def main():
+        limiter = AdaptiveLimiter(initial=1, max_limit=2, increase=1.0)
+        held = await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        # the saturated slot's healthy release raises the limit to 2
+        limiter._record(held, 0.01, 0.0)
+        assert limiter.limit == 2
+        await asyncio.sleep(0)
+        assert waiter.done()
+        assert limiter.in_flight == 2
+
+    asyncio.run(main())
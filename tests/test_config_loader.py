@@ -0,0 +1,50 @@
+"""
+tests for the config loader's caches
+"""
+
+from statsgen import config_loader
+from statsgen.config_loader import ConfigLoader
+
+PROFILE = """\
+profile:
+  username: ${STATSGEN_TEST_USER}
+  organization: ${STATSGEN_TEST_ORG}
+display:
+  themes: [dark]
+"""
+
+
+def _load(tmp_path):
+    config_loader._memory.clear()
+    return ConfigLoader(str(tmp_path / "profile.yml"), cache_dir=str(tmp_path / "cache")).load()
+
+
+def test_disk_cache_never_holds_env_values(tmp_path, monkeypatch):
+    (tmp_path / "profile.yml").write_text(PROFILE)
+    monkeypatch.setenv("STATSGEN_TEST_USER", "secret-user")
+    monkeypatch.setenv("STATSGEN_TEST_ORG", "secret-org")
+
+    config = _load(tmp_path)
+    assert (config.username, config.organization, config.themes) == ("secret-user", "secret-org", ["dark"])
+
+    entries = list((tmp_path / "cache").iterdir())
+    assert len(entries) == 1
+    text = entries[0].read_text()
+    assert "secret-user" not in text and "secret-org" not in text
+
+    # served from the disk cache with the values read again
+    monkeypatch.setattr(ConfigLoader, "_load_from_file", None)
+    assert _load(tmp_path) == config
+
+
+def test_changed_env_recompiles(tmp_path, monkeypatch):
+    (tmp_path / "profile.yml").write_text(PROFILE)
+    monkeypatch.setenv("STATSGEN_TEST_USER", "first")
+    monkeypatch.delenv("STATSGEN_TEST_ORG", raising=False)
+    assert _load(tmp_path).username == "first"
+
+    monkeypatch.setenv("STATSGEN_TEST_USER", "second")
+    assert _load(tmp_path).username == "second"
+    # the memory cache checks the environment too
+    monkeypatch.setenv("STATSGEN_TEST_USER", "third")
+    assert ConfigLoader(str(tmp_path / "profile.yml"), cache_dir=None).load().username == "third"
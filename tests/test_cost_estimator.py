@@ -0,0 +1,64 @@
+"""
+tests for the dry-run cost estimate
+"""
+
+import asyncio
+
+from statsgen.concurrency import AdaptiveLimiter
+from statsgen.cost_estimator import CostEstimator
+from statsgen.models import ProfileConfig
+from statsgen.org_collector import ORG_CONCURRENCY
+
+
+class PlanClient:
+    """answers the planning queries with fixed repo counts"""
+
+    token = "t"
+
+    def __init__(self, repos: int = 250, limit: int = 10):
+        self.repos = repos
+        self.limiter = AdaptiveLimiter(initial=limit)
+
+    async def graphql(self, query, variables=None):
+        counts = {"totalCount": self.repos}
+        if query.name == "OrgPlan":
+            return {"data": {"organization": {"repositories": counts}}}
+        return {"data": {"viewer": {
+            "repositories": counts,
+            "repositoriesContributedTo": {"totalCount": 0},
+            "contributionsCollection": {"contributionYears": [2024, 2023]},
+        }}}
+
+
+def _estimate(client, **config):
+    return asyncio.run(CostEstimator(client, ProfileConfig(username="octocat", **config)).estimate())
+
+
+def test_viewer_sweeps_run_at_the_client_limit():
+    estimate = _estimate(PlanClient(limit=10))
+    assert estimate.concurrency == 10
+    assert estimate.rest_requests == 2 * 250
+
+    narrow = _estimate(PlanClient(limit=2))
+    assert narrow.wall_seconds > estimate.wall_seconds
+
+
+def test_org_shards_split_one_budget():
+    for shards in (1, 2, 8, 32):
+        estimate = _estimate(PlanClient(), organization="octo-org", shards=shards)
+        assert estimate.concurrency <= ORG_CONCURRENCY
+
+    # more shards than repos leave the extra ones idle
+    estimate = _estimate(PlanClient(repos=3), organization="octo-org", shards=8)
+    assert estimate.concurrency == 3 * (ORG_CONCURRENCY // 3)
+
+
+def test_git_engine_skips_contributor_requests():
+    api = _estimate(PlanClient(), lines_engine="api")
+    git = _estimate(PlanClient(), lines_engine="git")
+    listed = _estimate(PlanClient(), lines_engine="git", author_emails=["me@example.com"])
+
+    # traffic stays, stats/contributors and its 202 retries go, /user/emails is added
+    assert git.rest_requests == api.rest_requests - 250 + 1
+    assert git.expected_retries == 0
+    assert listed.rest_requests == git.rest_requests - 1
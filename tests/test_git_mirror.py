@@ -0,0 +1,120 @@
+"""
+tests for the git mirror engine against throwaway fixture repositories
+"""
+
+import os
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from statsgen.git_mirror import MirrorEngine, count_numstat
+
+pytestmark = pytest.mark.skipif(
+    subprocess.run(["git", "--version"], capture_output=True).returncode != 0,
+    reason="git is not installed"
+)
+
+
+def _git(cwd: Path, *args: str, email: str = "octocat@users.noreply.github.com") -> None:
+    env = dict(
+        os.environ,
+        GIT_AUTHOR_NAME="author", GIT_AUTHOR_EMAIL=email,
+        GIT_COMMITTER_NAME="author", GIT_COMMITTER_EMAIL=email,
+    )
+    subprocess.run(["git", *args], cwd=cwd, env=env, check=True, capture_output=True)
+
+
+def _commit(work: Path, name: str, lines: int, email: str = "octocat@users.noreply.github.com") -> None:
+    path = work / name
+    existing = path.read_text() if path.exists() else ""
+    path.write_text(existing + "".join(f"line {i}\n" for i in range(lines)))
+    _git(work, "add", name, email=email)
+    _git(work, "commit", "-q", "-m", f"add {name}", email=email)
+
+
+@pytest.fixture
+def remote(tmp_path):
+    """a work tree and the bare 'remote' the engine mirrors from, as octocat/hello"""
+    work = tmp_path / "work"
+    work.mkdir()
+    _git(work, "init", "-q", "-b", "main")
+    _commit(work, "a.txt", 10)
+    _commit(work, "b.txt", 5, email="someone@example.com")
+    _commit(work, "c.txt", 3, email="octo@example.com")
+
+    base = tmp_path / "remote"
+    (base / "octocat").mkdir(parents=True)
+    _git(tmp_path, "clone", "-q", "--bare", str(work), str(base / "octocat" / "hello.git"))
+
+    def push():
+        _git(work, "push", "-q", str(base / "octocat" / "hello.git"), "main")
+
+    return work, base, push
+
+
+def _engine(tmp_path, base, emails=()) -> MirrorEngine:
+    return MirrorEngine(
+        cache_dir=str(tmp_path / "mirrors"),
+        username="octocat",
+        emails=emails,
+        workers=1,
+        base_url=str(base)
+    )
+
+
+def test_counts_only_the_users_commits(tmp_path, remote):
+    _, base, _ = remote
+
+    result = _engine(tmp_path, base).count(["octocat/hello"])["octocat/hello"]
+    assert (result.added, result.deleted, result.commits, result.error) == (10, 0, 1, "")
+
+    result = _engine(tmp_path, base, ["octo@example.com"]).count(["octocat/hello"])["octocat/hello"]
+    assert (result.added, result.commits) == (13, 2)
+
+
+def test_unknown_identity_matches_no_commits(tmp_path, remote):
+    _, base, _ = remote
+    engine = MirrorEngine(
+        cache_dir=str(tmp_path / "mirrors"), username="ghost", workers=1, base_url=str(base)
+    )
+    result = engine.count(["octocat/hello"])["octocat/hello"]
+    assert (result.added, result.commits, result.error) == (0, 0, "")
+
+
+def test_later_runs_only_walk_new_commits(tmp_path, remote):
+    work, base, push = remote
+    engine = _engine(tmp_path, base)
+    first = engine.count(["octocat/hello"])["octocat/hello"]
+
+    _commit(work, "a.txt", 4)
+    push()
+    engine = _engine(tmp_path, base)
+    second = engine.count(["octocat/hello"])["octocat/hello"]
+
+    assert second.head != first.head
+    assert (second.added, second.commits) == (14, 2)
+    assert engine.state["octocat/hello"] == [second.head, 14, 0, 2, engine.authors_key]
+
+
+def test_failures_report_gits_stderr(tmp_path, remote):
+    _, base, _ = remote
+    result = _engine(tmp_path, base).count(["octocat/missing"])["octocat/missing"]
+    assert result.error
+    assert "missing" in result.error or "not" in result.error
+
+    with pytest.raises(subprocess.CalledProcessError) as caught:
+        count_numstat(str(base / "octocat" / "hello.git"), "no-such-rev", [])
+    assert "no-such-rev" in caught.value.stderr
+
+
+def test_nothing_runs_past_the_timeout(tmp_path, remote):
+    _, base, _ = remote
+    engine = MirrorEngine(
+        cache_dir=str(tmp_path / "mirrors"), username="octocat", workers=1,
+        base_url=str(base), timeout=0
+    )
+    result = engine.count(["octocat/hello"])["octocat/hello"]
+    assert result.error == "out of time"
+    assert not engine.path("octocat/hello").exists()
+    assert "octocat/hello" not in engine.state
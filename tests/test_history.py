@@ -0,0 +1,103 @@
+"""
+tests for the SQLite history store
+"""
+
+import sqlite3
+from datetime import date, timedelta
+
+from statsgen.history import HistoryStore
+from statsgen.models import LanguageStats, ProfileStats
+
+
+def _stats(stars: int = 10, contributions: int = 5) -> ProfileStats:
+    stats = ProfileStats(username="octocat", display_name="Octocat")
+    stats.stars = stars
+    stats.contributions = contributions
+    stats.languages.append(LanguageStats(name="Python", size=100, color="#3572A5"))
+    return stats
+
+
+def test_skipped_metrics_are_null_and_left_out_of_series(tmp_path):
+    with HistoryStore(str(tmp_path / "history.db")) as history:
+        history.record(_stats(contributions=7), day=date(2026, 1, 1))
+        history.record(_stats(stars=12), day=date(2026, 1, 2), fields={"stars"})
+
+        assert history.series("octocat", "stars") == [("2026-01-01", 10), ("2026-01-02", 12)]
+        assert history.series("octocat", "contributions") == [("2026-01-01", 7)]
+        assert list(history.language_series("octocat")) == ["Python"]
+        assert history.language_series("octocat")["Python"] == [("2026-01-01", 100)]
+
+
+def test_unknown_metric_has_an_empty_series(tmp_path):
+    with HistoryStore(str(tmp_path / "history.db")) as history:
+        history.record(_stats())
+        assert history.series("octocat", "followers") == []
+
+
+def test_compact_keeps_one_row_per_week(tmp_path):
+    today = date(2026, 6, 1)
+    with HistoryStore(str(tmp_path / "history.db")) as history:
+        for offset in range(200):
+            history.record(_stats(stars=offset), day=today - timedelta(days=offset))
+
+        removed = history.compact("octocat", keep_daily_days=90, today=today)
+
+        old = [today - timedelta(days=offset) for offset in range(91, 200)]
+        assert removed == len(old) - len({day.isocalendar()[:2] for day in old})
+        assert len(history.series("octocat", "stars")) == 200 - removed
+
+        history.record(_stats(), day=today)
+        assert history.compact("octocat", keep_daily_days=90, today=today) == 1
+
+
+def test_vacuums_only_when_many_pages_are_free(tmp_path):
+    today = date(2026, 6, 1)
+    with HistoryStore(str(tmp_path / "history.db")) as history:
+        for offset in range(200):
+            stats = _stats()
+            stats.languages.extend(
+                LanguageStats(name=f"lang-{i}", size=i, color="#000000") for i in range(50)
+            )
+            history.record(stats, day=today - timedelta(days=offset))
+
+        assert not history._vacuum_if_sparse()
+        history.compact("octocat", keep_daily_days=0, today=today)
+        assert history._conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+
+        history.record(_stats(), day=today)
+        history.compact("octocat", keep_daily_days=0, today=today)
+        assert not history._vacuum_if_sparse()
+
+
+def test_migrates_not_null_columns(tmp_path):
+    path = tmp_path / "history.db"
+    conn = sqlite3.connect(str(path))
+    conn.executescript("""
+        CREATE TABLE snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL,
+            day TEXT NOT NULL,
+            stars INTEGER NOT NULL DEFAULT 0,
+            forks INTEGER NOT NULL DEFAULT 0,
+            contributions INTEGER NOT NULL DEFAULT 0,
+            repos_count INTEGER NOT NULL DEFAULT 0,
+            lines_added INTEGER NOT NULL DEFAULT 0,
+            lines_deleted INTEGER NOT NULL DEFAULT 0,
+            views INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE language_sizes (
+            snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+            name TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            PRIMARY KEY (snapshot_id, name)
+        ) WITHOUT ROWID;
+        INSERT INTO snapshots (username, day, stars) VALUES ('octocat', '2026-01-01', 3);
+        INSERT INTO language_sizes VALUES (1, 'Go', 50);
+    """)
+    conn.close()
+
+    with HistoryStore(str(path)) as history:
+        history.record(_stats(), day=date(2026, 1, 2), fields={"stars"})
+        assert history.series("octocat", "stars") == [("2026-01-01", 3), ("2026-01-02", 10)]
+        assert history.series("octocat", "views") == [("2026-01-01", 0)]
+        assert history.language_series("octocat") == {"Go": [("2026-01-01", 50)]}
@@ -0,0 +1,44 @@
+"""
+tests for the stats models
+"""
+
+import pickle
+
+from statsgen.models import LanguageList, LanguageStats, ProfileStats
+
+
+def _lang(name: str, size: int) -> LanguageStats:
+    return LanguageStats(name=name, size=size, color="#000000")
+
+
+def test_top_languages_follow_their_own_list():
+    stats = ProfileStats(username="a", display_name="a")
+    stats.languages = [_lang(f"l{i}", i) for i in range(10)]
+    other = ProfileStats(username="b", display_name="b")
+    other.languages = [_lang("x", 1)]
+
+    assert [lang.size for lang in stats.top_languages] == [9, 8, 7, 6, 5, 4, 3, 2]
+    assert isinstance(stats.languages, LanguageList)
+    cached = stats._top_cache
+
+    # other profiles don't invalidate this one
+    other.languages.append(_lang("y", 100))
+    other.top_languages
+    stats.top_languages
+    assert stats._top_cache is cached
+
+    stats.languages[0] = _lang("l0", 50)
+    assert stats.top_languages[0].size == 50
+
+    stats.languages = [_lang("z", 3)]
+    assert [lang.name for lang in stats.top_languages] == ["z"]
+
+
+def test_pickle_drops_the_ranking_cache():
+    stats = ProfileStats(username="a", display_name="a")
+    stats.languages = [_lang("Go", 5), _lang("C", 7)]
+    stats.top_languages
+
+    copy = pickle.loads(pickle.dumps(stats))
+    assert copy._top_source is None
+    assert [lang.name for lang in copy.top_languages] == ["C", "Go"]
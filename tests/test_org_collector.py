@@ -0,0 +1,42 @@
+"""
+tests for organization mode planning and sharding
+"""
+
+from statsgen.fetch_plan import FetchPlan, overview_visibility
+from statsgen.github_client import GitHubClient
+from statsgen.models import ProfileConfig
+from statsgen.org_collector import OrgStatsCollector
+
+
+def _config(**kwargs) -> ProfileConfig:
+    config = ProfileConfig(username="octocat", **kwargs)
+    config.heatmap_card.enabled = True
+    return config
+
+
+def test_org_plan_skips_contributions():
+    assert "contributions" in FetchPlan.from_config(_config()).fields
+
+    config = _config(organization="github")
+    plan = FetchPlan.from_config(config)
+    assert not plan.fields & {"contributions", "calendar"}
+    assert "contributions" not in plan.phases
+    assert overview_visibility(config)["contributions"] is False
+    assert overview_visibility(config)["stars"] is True
+
+
+def test_shards_split_one_concurrency_budget():
+    config = _config(organization="github")
+    collector = OrgStatsCollector(GitHubClient(token="t"), config, "github", shards=32, concurrency=8)
+    assert collector.shards == 8
+
+    collector = OrgStatsCollector(
+        GitHubClient(token="t"), config, "github", shards=3, concurrency=10, max_concurrency=30
+    )
+    collector._repos = {f"github/repo-{i}": None for i in range(30)}
+    jobs = collector._shard_jobs()
+
+    assert len(jobs) == 3
+    assert sum(len(job.repos) for job in jobs) == 30
+    assert sum(job.max_concurrent for job in jobs) <= 10
+    assert sum(job.max_limit for job in jobs) <= 30
@@ -0,0 +1,62 @@
+"""
+tests for the render pool
+"""
+
+import asyncio
+from pathlib import Path
+
+from statsgen.card_renderer import CardRenderer
+from statsgen.models import LanguageStats, ProfileStats
+from statsgen.processes import pool_context
+from statsgen.render_pool import RenderJob, RenderPool, render_card
+
+TEMPLATES = str(Path(__file__).parent.parent / "assets" / "templates")
+
+
+def _jobs(count: int):
+    stats = ProfileStats(username="a", display_name="a")
+    return [RenderJob("overview", "dark", f"card{i}.svg", stats, {}) for i in range(count)]
+
+
+def test_small_runs_never_start_a_pool(tmp_path):
+    pool = RenderPool(output_dir=str(tmp_path), workers=4, expected_jobs=3)
+    with pool:
+        assert pool._pool is None
+        report = asyncio.run(pool.render(_jobs(3)))
+
+    assert report.workers == 1
+    assert sorted(path.name for path in report.paths) == ["card0.svg", "card1.svg", "card2.svg"]
+
+
+def test_small_batches_render_inline_on_a_started_pool(tmp_path):
+    pool = RenderPool(output_dir=str(tmp_path), workers=2)
+    with pool:
+        assert pool._pool is not None
+        report = asyncio.run(pool.render(_jobs(2)))
+
+    assert report.workers == 1
+    assert len(report.paths) == 2
+
+
+def test_pooled_cards_match_inline_rendering(tmp_path):
+    jobs = []
+    for i in range(RenderPool.INLINE_BELOW + 44):
+        stats = ProfileStats(username=f"user{i}", display_name=f"User {i}", stars=i, forks=i // 3)
+        stats.languages.append(LanguageStats("Python", 100 + i, "#3572A5"))
+        stats.languages.append(LanguageStats("Go", 50, "#00ADD8"))
+        card = "overview" if i % 2 else "languages"
+        jobs.append(RenderJob(card, "light" if i % 3 else "dark", f"card{i}.svg", stats, {}))
+
+    pool = RenderPool(output_dir=str(tmp_path), templates_dir=TEMPLATES, workers=2)
+    with pool:
+        report = asyncio.run(pool.render(jobs))
+
+    assert report.workers == 2
+    assert len(report.paths) == len(jobs)
+    inline = CardRenderer(templates_dir=TEMPLATES)
+    for job in jobs:
+        assert (tmp_path / job.filename).read_text() == render_card(inline, job)
+
+
+def test_workers_do_not_fork():
+    assert pool_context().get_start_method() in ("forkserver", "spawn")
@@ -0,0 +1,179 @@
+"""
+tests for record/replay runs against a committed cassette
+
+the cassette was recorded from FakeGitHub below, run this file directly
+(python tests/test_replay.py) to record it again after a query changes
+"""
+
+import asyncio
+import contextlib
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from statsgen import transport as transport_module  # noqa: E402
+from statsgen.__main__ import parse_args  # noqa: E402
+from statsgen.runner import ProfileCardsRunner  # noqa: E402
+from statsgen.transport import CassetteResponse  # noqa: E402
+
+CASSETTE = Path(__file__).parent / "fixtures" / "profile.json.gz"
+
+CONFIG = """
+profile:
+  username: octocat
+display:
+  themes: [dark]
+cards:
+  overview:
+    enabled: true
+  languages:
+    enabled: true
+history:
+  path: {state}/history.db
+"""
+
+REPOS = {
+    "octocat/hello-world": {"stars": 80, "forks": 9, "language": "Python", "a": 100, "d": 40, "views": 12},
+    "octocat/spoon-knife": {"stars": 12, "forks": 3, "language": "HTML", "a": 7, "d": 2, "views": 5},
+}
+
+
+class FakeGitHub:
+    """transport that answers the requests of a profile run from REPOS"""
+
+    def __init__(self):
+        self.requests: List[str] = []
+
+    async def open(self, session) -> None:
+        pass
+
+    @contextlib.asynccontextmanager
+    async def request(self, method, url, headers=None, params=None, json=None):
+        self.requests.append(url)
+        if url.endswith("/graphql"):
+            name = re.match(r"query (\w+)", json["query"]).group(1)
+            body = getattr(self, f"_{name}")(json.get("variables") or {})
+        else:
+            repo = url.split("/repos/", 1)[1].rsplit("/", 2)[0]
+            info = REPOS[repo]
+            if url.endswith("/stats/contributors"):
+                body = [{"author": {"login": "octocat"}, "weeks": [{"w": 0, "a": info["a"], "d": info["d"]}]}]
+            else:
+                body = {"count": info["views"], "views": [{"count": info["views"]}]}
+        yield CassetteResponse(200, {"Content-Type": "application/json"}, _dumps(body))
+
+    async def sleep(self, seconds: float) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def _ContributionYears(self, variables: Dict) -> Dict:
+        return {"data": {"viewer": {
+            "login": "octocat",
+            "name": "The Octocat",
+            "contributionsCollection": {"contributionYears": [2024, 2023]},
+        }}}
+
+    def _YearlyContributions(self, variables: Dict) -> Dict:
+        viewer = {}
+        for slot in range(4):
+            if variables.get(f"has{slot}"):
+                year = int(variables[f"from{slot}"][:4])
+                viewer[f"y{slot}"] = {"contributionCalendar": {"totalContributions": year - 2000, "weeks": []}}
+        return {"data": {"viewer": viewer}}
+
+    def _ViewerRepos(self, variables: Dict) -> Dict:
+        nodes = [
+            {
+                "nameWithOwner": name,
+                "stargazerCount": info["stars"],
+                "forkCount": info["forks"],
+                "languages": {"edges": [{"size": 1000, "node": {"name": info["language"], "color": None}}]},
+            }
+            for name, info in REPOS.items()
+        ]
+        last = {"hasNextPage": False, "endCursor": None}
+        return {"data": {"viewer": {
+            "login": "octocat",
+            "name": "The Octocat",
+            "repositories": {"pageInfo": last, "nodes": nodes},
+            "repositoriesContributedTo": {"pageInfo": last, "nodes": []},
+        }}}
+
+
+def _dumps(body) -> bytes:
+    return json.dumps(body).encode("utf-8")
+
+
+def _runner(tmp_path, **cassette) -> ProfileCardsRunner:
+    state = tmp_path / "state"
+    config = tmp_path / "profile.yml"
+    config.write_text(CONFIG.format(state=state))
+    return ProfileCardsRunner(
+        config_path=str(config),
+        output_dir=str(tmp_path / "cards"),
+        checkpoint_dir=str(state / "checkpoints"),
+        snapshot_path=str(state / "snapshot.json"),
+        fingerprint_path=str(state / "fingerprint.json"),
+        time_scale=0,
+        **cassette
+    )
+
+
+def record(path: Path, tmp_path: Path) -> None:
+    """records a profile run served by FakeGitHub to path"""
+    original = transport_module.AiohttpTransport
+    transport_module.AiohttpTransport = FakeGitHub
+    try:
+        assert asyncio.run(_runner(tmp_path, record=str(path)).run())
+    finally:
+        transport_module.AiohttpTransport = original
+
+
+def test_replay_renders_the_recorded_profile(tmp_path, capsys):
+    assert asyncio.run(_runner(tmp_path, replay=str(CASSETTE)).run())
+
+    out = capsys.readouterr().out
+    assert "stars: 92" in out
+    assert "forks: 12" in out
+    assert "contributions: 47" in out
+    assert "lines changed: 149" in out
+    assert "views (14 days): 17" in out
+
+    assert sorted(path.name for path in (tmp_path / "cards").iterdir()) == ["languages.svg", "overview.svg"]
+    # the run's own state is neither read nor written
+    assert not (tmp_path / "state").exists()
+
+
+def test_replay_matches_a_fresh_recording(tmp_path):
+    record(tmp_path / "fresh.json.gz", tmp_path)
+    fresh = transport_module.Cassette.load(str(tmp_path / "fresh.json.gz"))
+    committed = transport_module.Cassette.load(str(CASSETTE))
+
+    # a mismatch means the requests changed, record the cassette again
+    assert sorted(item.key for item in fresh.interactions) == sorted(item.key for item in committed.interactions)
+    assert not (tmp_path / "state").exists()
+
+
+def test_record_and_replay_exclude_each_other(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        parse_args(["--record", "a.json.gz", "--replay", "b.json.gz"])
+
+    runner = _runner(tmp_path, record="a.json.gz", replay=str(CASSETTE))
+    assert not asyncio.run(runner.run())
+    assert "can't be used together" in capsys.readouterr().out
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as scratch:
+        record(CASSETTE, Path(scratch))
+    print(f"recorded {CASSETTE}")
@@ -0,0 +1,119 @@
+"""
+tests for the runner's change detection and history bookkeeping
+"""
+
+import asyncio
+import contextlib
+from datetime import date
+
+import pytest
+
+from statsgen import runner as runner_module
+from statsgen.deadline import Deadline
+from statsgen.fetch_plan import FetchPlan
+from statsgen.fingerprint import Fingerprint, save_fingerprint
+from statsgen.history import HistoryStore
+from statsgen.models import ProfileConfig, ProfileStats
+from statsgen.runner import ProfileCardsRunner
+from statsgen.snapshot import Snapshot, save_snapshot
+
+CONFIG = """
+profile:
+  username: octocat
+display:
+  themes: [dark]
+cards:
+  overview:
+    enabled: true
+    show_views: {views}
+  languages:
+    enabled: false
+history:
+  path: {history}
+"""
+
+
+class Stop(Exception):
+    """ends a run right after the step under test"""
+
+
+class NoClient:
+    """fails the test if the runner goes past the early exit"""
+
+    token = "t"
+
+    async def graphql(self, query, variables=None):
+        raise AssertionError(f"unexpected query {query.name}")
+
+
+def _runner(tmp_path, monkeypatch, views: bool) -> ProfileCardsRunner:
+    history = tmp_path / "history.db"
+    config = tmp_path / "profile.yml"
+    config.write_text(CONFIG.format(views=str(views).lower(), history=history))
+
+    fingerprint = Fingerprint(repos=1, stars=5, config="same")
+    save_fingerprint(str(tmp_path / "fingerprint.json"), fingerprint)
+
+    async def probe(client, config, pushed=None):
+        return fingerprint
+
+    monkeypatch.setattr(runner_module, "probe", probe)
+    monkeypatch.setattr(
+        ProfileCardsRunner, "_client", lambda self: contextlib.nullcontext(NoClient())
+    )
+
+    stats = ProfileStats(username="octocat", display_name="Octocat", stars=5, views=12)
+    save_snapshot(str(tmp_path / "snapshot.json"), Snapshot(stats))
+    (tmp_path / "cards").mkdir()
+    (tmp_path / "cards" / "overview.svg").write_text("<svg/>")
+
+    return ProfileCardsRunner(
+        config_path=str(config),
+        output_dir=str(tmp_path / "cards"),
+        checkpoint_dir=str(tmp_path / "checkpoints"),
+        snapshot_path=str(tmp_path / "snapshot.json"),
+        fingerprint_path=str(tmp_path / "fingerprint.json")
+    )
+
+
+def test_unchanged_run_still_records_history(tmp_path, monkeypatch):
+    runner = _runner(tmp_path, monkeypatch, views=False)
+
+    assert asyncio.run(runner.run())
+
+    with HistoryStore(str(tmp_path / "history.db")) as history:
+        assert history.series("octocat", "stars") == [(date.today().isoformat(), 5)]
+
+
+def test_views_refresh_even_when_nothing_else_changed(tmp_path, monkeypatch):
+    runner = _runner(tmp_path, monkeypatch, views=True)
+
+    narrowed = []
+    original = ProfileCardsRunner._narrow
+
+    def spy(self, collector, fingerprint, snapshot):
+        result = original(self, collector, fingerprint, snapshot)
+        narrowed.append((result, collector.plan.fields))
+        raise Stop
+
+    monkeypatch.setattr(ProfileCardsRunner, "_narrow", spy)
+    with pytest.raises(Stop):
+        asyncio.run(runner.run())
+
+    (went_on, fields), = narrowed
+    assert went_on
+    assert "views" in fields
+    assert "lines_changed" not in fields
+
+
+def test_probe_is_bounded_by_the_deadline(monkeypatch):
+    async def slow_probe(client, config, pushed=None):
+        await asyncio.sleep(30)
+
+    monkeypatch.setattr(runner_module, "probe", slow_probe)
+    runner = ProfileCardsRunner()
+    plan = FetchPlan(fields=frozenset({"stars"}))
+    deadline = Deadline(seconds=6.0, reserve=5.0)
+
+    fingerprint = asyncio.run(runner._probe(None, ProfileConfig(username="octocat"), plan, deadline))
+    assert fingerprint is None
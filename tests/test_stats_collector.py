@@ -0,0 +1,177 @@
+"""
+tests for the profile stats collector against a scripted client
+"""
+
+import asyncio
+from typing import Dict, List
+
+from statsgen.concurrency import AdaptiveLimiter
+from statsgen.deadline import Deadline
+from statsgen.fetch_plan import FetchPlan
+from statsgen.models import ProfileConfig, ProfileStats
+from statsgen.queries import YEARS_PER_QUERY
+from statsgen.stats_collector import StatsCollector
+
+
+class FakeClient:
+    """answers queries by name from a dict of canned responses"""
+
+    token = None
+
+    def __init__(self, responses: Dict):
+        self.responses = responses
+        self.calls: List = []
+
+    async def graphql(self, query, variables=None) -> Dict:
+        self.calls.append((query.name, variables))
+        response = self.responses[query.name]
+        return response(variables) if callable(response) else response
+
+
+def _yearly(variables: Dict) -> Dict:
+    """one aliased calendar per requested year, each year contributes year - 2000"""
+    viewer = {}
+    for slot in range(YEARS_PER_QUERY):
+        if variables.get(f"has{slot}"):
+            year = int(variables[f"from{slot}"][:4])
+            weeks = [{"contributionDays": [{"date": f"{year}-06-01", "contributionCount": year - 2000}]}]
+            viewer[f"y{slot}"] = {"contributionCalendar": {
+                "totalContributions": year - 2000,
+                "weeks": weeks if variables.get("withDays") else [],
+            }}
+    return {"data": {"viewer": viewer}}
+
+
+def test_contributions_only_plan_still_fetches_the_name():
+    client = FakeClient({
+        "ContributionYears": {"data": {"viewer": {
+            "login": "octocat",
+            "name": "The Octocat",
+            "contributionsCollection": {"contributionYears": [2025, 2024]},
+        }}},
+        "YearlyContributions": _yearly,
+    })
+    collector = StatsCollector(
+        client,
+        ProfileConfig(username="octocat"),
+        plan=FetchPlan(fields=frozenset({"contributions"}))
+    )
+
+    stats = asyncio.run(collector.collect())
+
+    assert stats.display_name == "The Octocat"
+    assert stats.contributions == 25 + 24
+    assert "ViewerRepos" not in [name for name, _ in client.calls]
+
+
+def test_contribution_years_are_batched():
+    years = list(range(2026, 2015, -1))
+    client = FakeClient({
+        "ContributionYears": {"data": {"viewer": {
+            "login": "octocat",
+            "contributionsCollection": {"contributionYears": years},
+        }}},
+        "YearlyContributions": _yearly,
+    })
+    collector = StatsCollector(
+        client,
+        ProfileConfig(username="octocat"),
+        plan=FetchPlan(fields=frozenset({"contributions", "calendar"}))
+    )
+
+    stats = asyncio.run(collector.collect())
+
+    batches = [variables for name, variables in client.calls if name == "YearlyContributions"]
+    assert len(batches) == -(-len(years) // YEARS_PER_QUERY)
+    assert stats.contributions == sum(year - 2000 for year in years)
+    assert stats.calendar.total() == stats.contributions
+
+
+class SweepClient:
+    """REST client that tracks how many requests overlap, each holds a limiter slot"""
+
+    token = None
+
+    def __init__(self, limit: int = 10, latency: float = 0.01):
+        self.limiter = AdaptiveLimiter(initial=limit, max_limit=limit)
+        self.latency = latency
+        self.active = 0
+        self.peak = 0
+        self.started = 0
+
+    async def _call(self):
+        self.started += 1
+        async with self.limiter.slot():
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            await asyncio.sleep(self.latency)
+            self.active -= 1
+
+    async def rest_stream(self, path, parser, params=None) -> bool:
+        await self._call()
+        parser.feed(b'[{"author": {"login": "octocat"}, "weeks": [{"a": 2, "d": 1}]}]')
+        return True
+
+    async def rest(self, path, params=None):
+        await self._call()
+        return {"views": [{"count": 3}]}
+
+
+def test_per_repo_sweeps_overlap():
+    client = SweepClient()
+    collector = StatsCollector(
+        client,
+        ProfileConfig(username="octocat"),
+        plan=FetchPlan(fields=frozenset({"lines_changed", "views"}))
+    )
+    collector._repos = {f"octocat/repo-{i}" for i in range(20)}
+    stats = ProfileStats(username="octocat", display_name="octocat")
+
+    asyncio.run(collector._collect_code_stats(stats))
+    asyncio.run(collector._collect_traffic(stats))
+
+    assert client.peak > 1
+    assert sum(added for added, _ in collector._code_stats.values()) == 40
+    assert sum(collector._traffic.values()) == 60
+
+
+def test_repos_phase_leaves_the_shared_response_alone():
+    owned = [{"nameWithOwner": "octocat/a", "stargazerCount": 1, "forkCount": 0}]
+    page = {"data": {"viewer": {
+        "login": "octocat",
+        "repositories": {"nodes": owned, "pageInfo": {"hasNextPage": False}},
+        "repositoriesContributedTo": {
+            "nodes": [{"nameWithOwner": "other/b", "stargazerCount": 2, "forkCount": 0}],
+            "pageInfo": {"hasNextPage": False},
+        },
+    }}}
+    client = FakeClient({"ViewerRepos": page})
+    collector = StatsCollector(
+        client,
+        ProfileConfig(username="octocat"),
+        plan=FetchPlan(fields=frozenset({"stars"}))
+    )
+
+    stats = asyncio.run(collector.collect())
+
+    assert stats.stars == 3
+    assert [repo["nameWithOwner"] for repo in owned] == ["octocat/a"]
+
+
+def test_queued_repos_dont_spend_their_deadline_waiting():
+    client = SweepClient(limit=2, latency=0.02)
+    collector = StatsCollector(
+        client,
+        ProfileConfig(username="octocat"),
+        plan=FetchPlan(fields=frozenset({"lines_changed"})),
+        deadline=Deadline(1000, request_timeout=0.2, reserve=0)
+    )
+    collector._repos = {f"octocat/repo-{i}" for i in range(40)}
+    stats = ProfileStats(username="octocat", display_name="octocat")
+
+    asyncio.run(collector._collect_code_stats(stats))
+
+    # 40 requests through 2 slots take 0.4s, far past one request's 0.2s
+    assert len(collector._code_stats) == 40
+    assert collector.deadline.timeouts == 0
+    assert client.peak == 2
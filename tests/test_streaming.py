@@ -0,0 +1,60 @@
+"""
+tests for the streaming contributor stats parser
+"""
+
+import json
+
+from statsgen.streaming import ContributorStatsParser
+
+
+def _payload() -> bytes:
+    contributors = [
+        {
+            "author": {"login": login, "url": "https://api.github.com/users/{/other_user}"},
+            "total": 3,
+            "weeks": [{"w": 1, "a": a, "d": d, "c": 1} for a, d in weeks],
+        }
+        for login, weeks in (
+            ("someone", [(5, 1), (7, 2)]),
+            ("octocat", [(10, 4), (3, 0), (1, 1)]),
+            ("brace\"}[", [(100, 100)]),
+        )
+    ]
+    return json.dumps(contributors).encode("utf-8")
+
+
+def _feed(parser: ContributorStatsParser, data: bytes, size: int) -> None:
+    for i in range(0, len(data), size):
+        parser.feed(data[i:i + size])
+
+
+def test_sums_one_author_whatever_the_chunking():
+    data = _payload()
+    for size in (1, 2, 7, 64, len(data)):
+        parser = ContributorStatsParser("octocat")
+        _feed(parser, data, size)
+        assert parser.found
+        assert (parser.additions, parser.deletions) == (14, 5)
+
+
+def test_sums_everyone_without_login():
+    parser = ContributorStatsParser(None)
+    _feed(parser, _payload(), 3)
+    assert (parser.additions, parser.deletions) == (126, 108)
+
+
+def test_missing_author_is_not_found():
+    parser = ContributorStatsParser("ghost")
+    _feed(parser, _payload(), 5)
+    assert not parser.found
+    assert parser.additions == 0
+
+
+def test_keeps_only_the_open_element_buffered():
+    parser = ContributorStatsParser("octocat")
+    _feed(parser, _payload(), 1)
+    assert len(parser._buffer) == 0
+
+    parser = ContributorStatsParser("octocat")
+    parser.feed(b'[{"author": {"login": "a"}, "weeks": []}, {"author": ')
+    assert bytes(parser._buffer) == b'{"author": '
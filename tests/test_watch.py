@@ -0,0 +1,205 @@
+"""
+tests for the watch daemon's scheduling, driven by an injected clock
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+from statsgen.github_client import RateLimit
+from statsgen.models import ProfileConfig, ProfileStats, RepoStats
+from statsgen.snapshot import Snapshot
+from statsgen.watch import (
+    DORMANT_INTERVAL,
+    PRIORITY_PROFILE,
+    PRIORITY_PUSHED,
+    PRIORITY_ROUTINE,
+    RATE_LIMIT_BACKOFF,
+    RateBudget,
+    RefreshScheduler,
+    WatchDaemon,
+)
+
+# 2024-06-01T00:00:00Z
+NOW = 1717200000.0
+
+
+class Clock:
+    def __init__(self, now: float = NOW):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+class LimitsClient:
+    def __init__(self, **rate_limits: RateLimit):
+        self.rate_limits = rate_limits
+
+
+class StatsClient:
+    """answers traffic with no views and stats/contributors from a canned body"""
+
+    def __init__(self, body: bytes = b"", ok: bool = True, error: Exception = None):
+        self.body = body
+        self.ok = ok
+        self.error = error
+        self.rate_limits = {}
+
+    async def rest(self, path, params=None):
+        if self.error is not None:
+            raise self.error
+        return {"views": []}
+
+    async def rest_stream(self, path, parser, params=None) -> bool:
+        if not self.ok:
+            return False
+        parser.feed(self.body)
+        return True
+
+
+def _daemon(tmp_path, clock: Clock, repos=("octocat/a", "octocat/b")) -> WatchDaemon:
+    daemon = WatchDaemon(
+        output_dir=str(tmp_path / "cards"),
+        snapshot_path=str(tmp_path / "snapshot.json"),
+        fingerprint_path=str(tmp_path / "fingerprint.json"),
+        clock=clock
+    )
+    daemon.config = ProfileConfig(username="octocat")
+    stats = ProfileStats(username="octocat", display_name="octocat", lines_added=10, lines_deleted=4)
+    daemon.snapshot = Snapshot(
+        stats=stats,
+        repos={name: RepoStats(name=name, lines_added=5, lines_deleted=2) for name in repos},
+        taken_at=_iso(clock() - 3600)
+    )
+    return daemon
+
+
+def test_scheduler_pops_due_keys_by_priority():
+    scheduler = RefreshScheduler()
+    scheduler.schedule("repo:a", 10, PRIORITY_ROUTINE)
+    scheduler.schedule("repo:b", 5, PRIORITY_PUSHED)
+    scheduler.schedule("profile", 8, PRIORITY_PROFILE)
+    scheduler.schedule("repo:c", 50)
+
+    assert len(scheduler) == 4
+    assert scheduler.next_due() == 5
+    assert scheduler.pop_due(20) == ["profile", "repo:b", "repo:a"]
+    assert scheduler.pop_due(20) == []
+    assert list(scheduler._current) == ["repo:c"]
+
+
+def test_rescheduling_replaces_the_earlier_entry():
+    scheduler = RefreshScheduler()
+    scheduler.schedule("repo:a", 10)
+    scheduler.schedule("repo:a", 30)
+    scheduler.schedule("repo:b", 20)
+    scheduler.remove("repo:b")
+
+    assert len(scheduler) == 1
+    assert "repo:b" not in scheduler
+    assert scheduler.next_due() == 30
+    assert scheduler.pop_due(25) == []
+    assert scheduler.pop_due(30) == ["repo:a"]
+    assert scheduler.next_due() is None
+
+
+def test_budget_keeps_the_reserve():
+    clock = Clock()
+    client = LimitsClient(core=RateLimit(limit=5000, remaining=1100, reset=NOW + 600))
+    budget = RateBudget(client, reserve=0.2, clock=clock)
+
+    assert budget.wait("core", 100) == 0.0
+    assert budget.wait("core", 101) == 600
+    # unknown resources and passed resets never wait
+    assert budget.wait("graphql", 10_000) == 0.0
+    clock.now = NOW + 600
+    assert budget.wait("core", 5000) == 0.0
+
+
+def test_budget_backoff_waits_for_the_reset():
+    clock = Clock()
+    budget = RateBudget(LimitsClient(core=RateLimit(5000, 0, NOW + 120)), clock=clock)
+
+    assert budget.backoff("core") == 120
+    assert budget.backoff("graphql") == RATE_LIMIT_BACKOFF
+    clock.now = NOW + 200
+    assert budget.backoff("core") == RATE_LIMIT_BACKOFF
+
+
+def test_schedule_repos_on_start_up(tmp_path):
+    clock = Clock()
+    daemon = _daemon(tmp_path, clock)
+    pushed = {
+        # pushed after the snapshot was taken, due now
+        "octocat/a": _iso(NOW - 60),
+        # pushed long before, gets a slot within its dormant interval
+        "octocat/b": _iso(NOW - 90 * 86400),
+    }
+    daemon._schedule_repos(pushed, fresh=False)
+
+    taken_at = datetime.fromtimestamp(NOW - 3600, timezone.utc)
+    assert daemon.counted == {"octocat/a": taken_at, "octocat/b": taken_at}
+    current = daemon.scheduler._current
+    assert (current["repo:octocat/a"].due, current["repo:octocat/a"].priority) == (NOW, PRIORITY_PUSHED)
+    assert current["repo:octocat/b"].priority == PRIORITY_ROUTINE
+    assert NOW <= current["repo:octocat/b"].due < NOW + DORMANT_INTERVAL
+
+
+def test_schedule_repos_follows_pushes_and_removals(tmp_path):
+    clock = Clock()
+    daemon = _daemon(tmp_path, clock)
+    pushed = {"octocat/a": _iso(NOW - 90 * 86400), "octocat/b": _iso(NOW - 90 * 86400)}
+    daemon._schedule_repos(pushed, fresh=True)
+    slot = daemon.scheduler._current["repo:octocat/b"]
+
+    clock.now = NOW + 600
+    del daemon.snapshot.repos["octocat/a"]
+    daemon._schedule_repos(dict(pushed, **{"octocat/b": _iso(NOW + 300)}), fresh=False)
+
+    assert "repo:octocat/a" not in daemon.scheduler
+    assert "octocat/a" not in daemon.counted
+    task = daemon.scheduler._current["repo:octocat/b"]
+    assert task is not slot
+    assert (task.due, task.priority) == (NOW + 600, PRIORITY_PUSHED)
+
+
+def test_unfinished_stats_keep_the_old_lines(tmp_path):
+    clock = Clock()
+    daemon = _daemon(tmp_path, clock, repos=("octocat/a",))
+    daemon._schedule_repos({"octocat/a": _iso(NOW - 60)}, fresh=False)
+    counted = daemon.counted["octocat/a"]
+
+    asyncio.run(daemon.refresh_repo(StatsClient(ok=False), "octocat/a"))
+
+    assert daemon.counted["octocat/a"] == counted
+    assert (daemon.snapshot.stats.lines_added, daemon.snapshot.stats.lines_deleted) == (10, 4)
+    # retried after the next probe instead of a day later
+    assert daemon.scheduler._current["repo:octocat/a"].due == NOW + daemon.interval
+
+    body = b'[{"author": {"login": "octocat"}, "weeks": [{"a": 7, "d": 3}]}]'
+    asyncio.run(daemon.refresh_repo(StatsClient(body), "octocat/a"))
+
+    assert daemon.counted["octocat/a"] == datetime.fromtimestamp(NOW - 60, timezone.utc)
+    assert (daemon.snapshot.stats.lines_added, daemon.snapshot.stats.lines_deleted) == (12, 5)
+
+
+def test_failing_tasks_back_off_and_recover(tmp_path):
+    clock = Clock()
+    daemon = _daemon(tmp_path, clock, repos=("octocat/a",))
+    client = StatsClient(error=KeyError("views"))
+    budget = RateBudget(client, clock=clock)
+
+    asyncio.run(daemon._run_task(client, budget, "repo:octocat/a"))
+    assert daemon.scheduler._current["repo:octocat/a"].due == NOW + daemon.interval
+    asyncio.run(daemon._run_task(client, budget, "repo:octocat/a"))
+    assert daemon.scheduler._current["repo:octocat/a"].due == NOW + 2 * daemon.interval
+    assert daemon.refreshes == 0
+
+    client.error = None
+    asyncio.run(daemon._run_task(client, budget, "repo:octocat/a"))
+    assert daemon.refreshes == 1
+    assert "repo:octocat/a" not in daemon.failures
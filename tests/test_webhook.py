@@ -0,0 +1,121 @@
+"""
+tests for the webhook receiver, driven by recorded event payloads
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+from pathlib import Path
+
+from aiohttp.test_utils import TestClient, TestServer
+
+from statsgen.models import ProfileConfig, ProfileStats, RepoStats
+from statsgen.snapshot import Snapshot
+from statsgen.webhook import WebhookProcessor, WebhookServer
+
+FIXTURES = Path(__file__).parent / "fixtures" / "webhook"
+
+
+def _payload(name: str) -> bytes:
+    return (FIXTURES / f"{name}.json").read_bytes()
+
+
+def _snapshot() -> Snapshot:
+    stats = ProfileStats(
+        username="octocat", display_name="The Octocat",
+        stars=80, forks=9, repos_count=1, lines_added=100, lines_deleted=40
+    )
+    repo = RepoStats(name="octocat/hello-world", stars=80, forks=9, lines_added=100, lines_deleted=40)
+    return Snapshot(stats=stats, repos={repo.name: repo})
+
+
+def _sign(secret: str, body: bytes) -> str:
+    return "sha256=" + hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+
+
+class StatsClient:
+    """answers stats/contributors from a canned body, or fails like a 202 that never settles"""
+
+    def __init__(self, body: bytes = b"", ok: bool = True):
+        self.body = body
+        self.ok = ok
+        self.calls = 0
+
+    async def rest_stream(self, path, parser, params=None) -> bool:
+        self.calls += 1
+        if not self.ok:
+            return False
+        parser.feed(self.body)
+        return True
+
+
+def test_events_update_the_snapshot():
+    processor = WebhookProcessor(ProfileConfig(username="octocat"), _snapshot())
+    stats = processor.snapshot.stats
+
+    assert processor.apply("ping", json.loads(_payload("ping"))).ignored == "ping"
+    assert processor.apply("star", json.loads(_payload("star"))).changed
+    assert processor.apply("fork", json.loads(_payload("fork"))).changed
+    assert processor.apply("repository", json.loads(_payload("repository_created"))).changed
+    assert processor.apply("push", json.loads(_payload("push"))).dirty == "octocat/hello-world"
+
+    # replaying a star delivery carries the same absolute count
+    assert not processor.apply("star", json.loads(_payload("star"))).changed
+    assert (stats.stars, stats.forks, stats.repos_count) == (81, 10, 2)
+
+
+def test_refresh_keeps_lines_when_stats_are_unavailable():
+    processor = WebhookProcessor(ProfileConfig(username="octocat"), _snapshot())
+    processor.apply("push", json.loads(_payload("push")))
+
+    assert not asyncio.run(processor.refresh_dirty(StatsClient(ok=False)))
+    assert processor.snapshot.stats.lines_added == 100
+    assert processor.dirty == {"octocat/hello-world"}
+
+    body = b'[{"author": {"login": "octocat"}, "weeks": [{"a": 120, "d": 50}]}]'
+    assert asyncio.run(processor.refresh_dirty(StatsClient(body)))
+    assert (processor.snapshot.stats.lines_added, processor.snapshot.stats.lines_deleted) == (120, 50)
+    assert not processor.dirty
+
+
+async def _deliver(server: WebhookServer, event: str, body: bytes, signature: str = ""):
+    app = server.app()
+    app.on_startup.clear()
+    app.on_cleanup.clear()
+    async with TestClient(TestServer(app)) as client:
+        headers = {"X-GitHub-Event": event, "Content-Type": "application/json"}
+        if signature:
+            headers["X-Hub-Signature-256"] = signature
+        response = await client.post("/webhook", data=body, headers=headers)
+        return response.status, await response.json()
+
+
+def _server(tmp_path, secret: str, insecure: bool = False) -> WebhookServer:
+    return WebhookServer(
+        ProfileConfig(username="octocat"), _snapshot(), str(tmp_path / "snapshot.json"),
+        output_dir=str(tmp_path), secret=secret, insecure=insecure
+    )
+
+
+def test_signed_deliveries_are_checked(tmp_path):
+    server = _server(tmp_path, "s3cret")
+    body = _payload("star")
+
+    status, _ = asyncio.run(_deliver(server, "star", body, _sign("wrong", body)))
+    assert status == 401
+    assert server.processor.snapshot.stats.stars == 80
+
+    status, result = asyncio.run(_deliver(server, "star", body, _sign("s3cret", body)))
+    assert status == 202
+    assert result["changed"]
+
+
+def test_unsigned_deliveries_need_insecure_mode(tmp_path):
+    body = _payload("star")
+
+    status, _ = asyncio.run(_deliver(_server(tmp_path, ""), "star", body))
+    assert status == 401
+
+    status, _ = asyncio.run(_deliver(_server(tmp_path, "", insecure=True), "star", body))
+    assert status == 202